@@ -1,7 +1,10 @@
 from vpltools.basic_tests import *
 from vpltools.make_vpl_evaluate_cases import make_cases_file_from_list, GradeReduction
 from vpltools.supported_languages import SupportedLanguages, UnsupportedFeatureError
-from vpltools.vpl_test_case import VPLTestCase, main
+from vpltools.vpl_test_case import VPLTestCase
+from vpltools.runner import main, serial
 from vpltools.sql_test_case import TestSQLSelectQuery, InMemoryTestingDatabase, SupportedSQLBackends
 from vpltools.historysearcher import HistorySearcher
-from vpltools.regextest import RegexTestCase, MatchTarget
\ No newline at end of file
+from vpltools.multipattern import RegexCommand, WhitespaceInsensitiveCommand
+from vpltools.history import HistoryCommand, HistoryEntry, parse_history
+from vpltools.regextest import RegexTestCase, MatchTarget, MatchTable
\ No newline at end of file
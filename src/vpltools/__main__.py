@@ -1,12 +1,34 @@
 import sys
 import os
+import importlib
+import contextlib
 import vpltools.vpl_test_case
 
+# Subcommands, e.g. python3 -m vpltools grade <tests_dir> <submissions_root>,
+# and the module and function which handle each.
+SUBCOMMANDS = {
+    "grade" : ("vpltools.grader", "main"),
+    "watch" : ("vpltools.watch", "main"),
+    "test"  : ("vpltools.runner", "test_command"),
+    "serve" : ("vpltools.server", "main"),
+    "lint"  : ("vpltools.lint", "main"),
+    "evaluate": ("vpltools.records", "evaluate_command"),
+}
+
+if len(sys.argv) > 1 and sys.argv[1] in SUBCOMMANDS:
+    module_name, function_name = SUBCOMMANDS[sys.argv[1]]
+    getattr(importlib.import_module(module_name), function_name)(sys.argv[2:])
+    sys.exit()
+
 try:
     cwd = sys.argv[1]       # pre_vpl_run.sh should provide this
 except:
     cwd = os.getenv("HOME") # if not, fall back to envionment
 
+# Each evaluation starts afresh, even if the last one stopped at a failure (see VPLTestCase.fail_fast).
+with contextlib.suppress(FileNotFoundError):
+    os.remove(os.path.join(cwd, vpltools.vpl_test_case.FAILED_CASE_MARKER))
+
 vpltools.vpl_test_case.VPLTestCase.key_source_files = []    # silences warning about unspecified key souce files.
 vpltools.vpl_test_case.VPLTestCase.this_dir_name_override = cwd
 vpltools.vpl_test_case.VPLTestCase.setUpClass()
@@ -0,0 +1,149 @@
+'''
+adversarial_inputs.py -- inputs which make backtracking regular expressions slow.
+
+A backtracking regular expression engine is slowest on inputs which almost
+match: long runs of text which a repetition in the pattern can consume in many
+different ways, followed by a character which makes the match fail. These
+functions parse a pattern, find its repetitions, and build such "near miss"
+inputs of any requested length:
+
+    prefix + pump * repetitions + MISMATCH
+
+where prefix is text which leads the pattern up to the repetition, and pump is
+text which the repeated item matches.
+'''
+from dataclasses import dataclass
+
+try:
+    from re import _parser as sre_parse, _constants as sre_constants # Python 3.11+
+except ImportError:
+    import sre_parse        # type: ignore
+    import sre_constants    # type: ignore
+
+__unittest = True
+
+MISMATCH = "\x00"
+MAX_FAMILIES = 8
+
+REPEAT_OPCODES = { sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT }
+if hasattr(sre_constants, "POSSESSIVE_REPEAT"):
+    REPEAT_OPCODES.add(sre_constants.POSSESSIVE_REPEAT)
+
+CATEGORY_SAMPLES = {
+    sre_constants.CATEGORY_DIGIT    : "1",
+    sre_constants.CATEGORY_NOT_DIGIT: "a",
+    sre_constants.CATEGORY_WORD     : "a",
+    sre_constants.CATEGORY_NOT_WORD : "!",
+    sre_constants.CATEGORY_SPACE    : " ",
+    sre_constants.CATEGORY_NOT_SPACE: "a",
+}
+
+
+@dataclass(frozen=True)
+class InputFamily:
+    '''
+    A family of near miss inputs: prefix + pump * repetitions + MISMATCH.
+    '''
+    prefix: str
+    pump: str
+
+    def make_input(self, length: int) -> str:
+        '''
+        Returns the member of this family which is about length characters long.
+        '''
+        repetitions = max(1, (length - len(self.prefix) - len(MISMATCH)) // len(self.pump))
+        return self.prefix + self.pump * repetitions + MISMATCH
+
+
+    def __str__(self):
+        return repr(self.prefix + self.pump * 3 + "..." + MISMATCH)
+
+
+def sample_character_set(items) -> str:
+    '''
+    Returns a character matched by the items of an IN node (a character set).
+    '''
+    if items and items[0][0] == sre_constants.NEGATE:
+        excluded = set()
+        for op, av in items[1:]:
+            if op == sre_constants.LITERAL:
+                excluded.add(chr(av))
+            elif op == sre_constants.RANGE:
+                excluded.update(chr(c) for c in range(av[0], min(av[1], 0x7f) + 1))
+        return next((c for c in "a1 !_xZ" if c not in excluded), "~")
+
+    for op, av in items:
+        if op == sre_constants.LITERAL:
+            return chr(av)
+        if op == sre_constants.RANGE:
+            return chr(av[0])
+        if op == sre_constants.CATEGORY and av in CATEGORY_SAMPLES:
+            return CATEGORY_SAMPLES[av]
+    return "a"
+
+
+def sample(subpattern) -> str:
+    '''
+    Returns a short string which (approximately) matches the parsed subpattern.
+    Assertions, anchors and back references are ignored.
+    '''
+    text = ""
+    for op, av in subpattern:
+        if op == sre_constants.LITERAL:
+            text += chr(av)
+        elif op == sre_constants.NOT_LITERAL:
+            text += "a" if chr(av) != "a" else "b"
+        elif op == sre_constants.ANY:
+            text += "a"
+        elif op == sre_constants.IN:
+            text += sample_character_set(av)
+        elif op in REPEAT_OPCODES:
+            minimum, _, item = av
+            text += sample(item) * minimum
+        elif op == sre_constants.SUBPATTERN:
+            text += sample(av[-1])
+        elif op == sre_constants.BRANCH:
+            text += sample(av[1][0])
+        elif hasattr(sre_constants, "ATOMIC_GROUP") and op == sre_constants.ATOMIC_GROUP:
+            text += sample(av)
+    return text
+
+
+def find_families(subpattern, prefix: str = ""):
+    '''
+    Generates an InputFamily for each repetition in the parsed subpattern,
+    including repetitions nested in groups, alternatives and other repetitions.
+    '''
+    for i, (op, av) in enumerate(subpattern):
+        before = prefix + sample(list(subpattern)[:i])
+        if op in REPEAT_OPCODES:
+            item = av[2]
+            pump = sample(item)
+            if pump:
+                yield InputFamily(before, pump)
+            yield from find_families(item, before)
+        elif op == sre_constants.SUBPATTERN:
+            yield from find_families(av[-1], before)
+        elif op == sre_constants.BRANCH:
+            for branch in av[1]:
+                yield from find_families(branch, before)
+        elif hasattr(sre_constants, "ATOMIC_GROUP") and op == sre_constants.ATOMIC_GROUP:
+            yield from find_families(av, before)
+
+
+def adversarial_families(pattern: str, flags: int = 0) -> list[InputFamily]:
+    '''
+    Returns up to MAX_FAMILIES distinct families of near miss inputs for pattern.
+    As well as one for each repetition, there is one which repeats a sample
+    of the whole pattern, which catches patterns like (\\w+\\s?)*$.
+    '''
+    parsed = sre_parse.parse(pattern, flags)
+    families = list(find_families(parsed))
+    if whole := sample(parsed):
+        families.append(InputFamily("", whole))
+
+    distinct = []
+    for family in families:
+        if family not in distinct:
+            distinct.append(family)
+    return distinct[:MAX_FAMILIES]
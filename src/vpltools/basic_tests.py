@@ -6,11 +6,18 @@ A set of checks for adherence to common programming practices, such as:
 - use of a main function. 
 These are specifically for Python programs.
 
+Static basic tests read the program's syntax tree (see source_analysis.py), and are
+run before it is imported, so that they never run student code. The others are
+given the imported module.
+
 To add another basic test, perform the following steps:
 1. Define a function which performs the test. The function should return True
-   if the test passes, and raise BasicTestFailedError if the test fails.
+   if the test passes, and raise BasicTestFailedError if the test fails. If it
+   needs only the source, decorate it with @static_basic_test, and it is given
+   a source_analysis.ParsedSource instead of the module.
 2. Include the function in the list basic_tests.BASIC_TESTS, at the end of this file.
 '''
+from vpltools.source_analysis import ParsedSource, parse_source
 
 __unittest = True
 
@@ -58,16 +65,106 @@ def has_main_function(module) -> bool:
     
     raise BasicTestFailedError(f"This assignment requires a main function!")
 
+# ---------------------------------------------------------------------------------------
+# Static basic tests
+
+def static_basic_test(test_function):
+    '''
+    Marks test_function as one to give a ParsedSource, rather than an imported module.
+    '''
+    test_function.static = True
+    return test_function
+
+
+def is_static_basic_test(test_function) -> bool:
+    return getattr(test_function, "static", False)
+
+
+@static_basic_test
+def has_no_global_variables(source: ParsedSource) -> bool:
+    if not source.global_variables:
+        return True
+
+    name = source.global_variables[0]
+    raise BasicTestFailedError("Global variables are forbidden in this assignment! "
+                            + f"Global variable '{name.id}' assigned on line {name.lineno}!")
+
+
+@static_basic_test
+def defines_main_function(source: ParsedSource) -> bool:
+    if "main" in source.module_level_functions:
+        return True
+
+    raise BasicTestFailedError(f"This assignment requires a main function!")
+
+
+@static_basic_test
+def has_recursion(source: ParsedSource) -> bool:
+    if source.recursive_functions:
+        return True
+
+    raise BasicTestFailedError("This assignment requires a recursive function, but no function calls itself!")
+
+
+def forbids_imports(*module_names: str):
+    '''
+    Returns a basic test which fails if any of module_names, or any module inside
+    them (e.g. os.path, for os), is imported.
+    '''
+    @static_basic_test
+    def has_no_forbidden_imports(source: ParsedSource) -> bool:
+        for imported, line in source.imports:
+            if any(imported == name or imported.startswith(name + ".") for name in module_names):
+                raise BasicTestFailedError(f"Importing '{imported}' is forbidden in this assignment! Found on line {line}.")
+        return True
+
+    return has_no_forbidden_imports
+
+
+def limits_loop_nesting(max_depth: int):
+    '''
+    Returns a basic test which fails if loops are nested more than max_depth deep.
+    Comprehensions count as loops, but a function defined in a loop starts again from 0.
+    '''
+    @static_basic_test
+    def has_shallow_loops(source: ParsedSource) -> bool:
+        depth, line = source.deepest_loop
+        if depth <= max_depth:
+            return True
+        raise BasicTestFailedError(f"Loops may be nested at most {max_depth} deep in this assignment! "
+                                + f"Found {depth} nested loops, the innermost on line {line}.")
+
+    return has_shallow_loops
+
 # ---------------------------------------------------------------------------------------
 
 BASIC_TESTS = [
-    has_no_globals,
-    has_main_function,
+    has_no_global_variables,
+    defines_main_function,
 ]
 
+def run_static_basic_tests(source_path: str, run_basic_tests):
+    '''
+    Runs the static tests among run_basic_tests on the file at source_path,
+    ignoring the others. The file is not imported.
+    '''
+    static_tests = [ test_function for test_function in run_basic_tests if is_static_basic_test(test_function) ]
+    if not static_tests:
+        return
+    try:
+        source = parse_source(source_path)
+    except SyntaxError as error:
+        raise BasicTestFailedError(f"Your program could not be read: {error}") from None
+    for test_function in static_tests:
+        test_function(source)
+
+
 def run_basic_tests(module, run_basic_tests):
     for test_function in run_basic_tests:
         try:
-            test_function(module)
+            if is_static_basic_test(test_function):
+                run_static_basic_tests(module.__file__, [ test_function ])
+            else:
+                test_function(module)
         except NameError:
             print(f"Unable to skip unknown test '{test_function}'")
@@ -0,0 +1,163 @@
+'''
+calls.py -- calling a student's (or the key's) Python function with limits, and
+measuring what the call cost.
+
+VPLTestCase.call_student and call_key use measure_call, in the test process, or in
+the child of a sandboxed module (see sandbox.py). Each call's wall time, CPU time
+and peak memory are kept with the test's outcome, and the costliest calls are
+shown in the run report (see outcomes.RunReport). tracemalloc slows allocation
+several times over, which would distort the times, so only a call with a memory
+limit is traced; for any other, peak memory is how far the call raised the
+process's peak resident size.
+
+In the test process, timeouts are enforced with SIGALRM, which only the main thread
+receives. The CallTimeoutError it raises is a BaseException, which a function that
+catches Exception can't swallow, though a bare except can. Memory is measured while
+the call runs, but only checked once it returns. A sandboxed module enforces both
+limits in its child, where a runaway call can be stopped.
+'''
+import sys
+import time
+import reprlib
+import signal
+import resource
+import threading
+import tracemalloc
+from dataclasses import dataclass
+from contextlib import contextmanager
+
+__unittest = True
+
+
+class CallTimeoutError(BaseException):
+    '''
+    A call took longer than it was allowed. Raised inside the call, so, like
+    KeyboardInterrupt, not an Exception, which the call could catch and carry
+    on. VPLTestCase.call_student and call_key fail the test with its message.
+    '''
+
+
+class CallMemoryError(AssertionError):
+    '''
+    A call used more memory than it was allowed.
+    '''
+
+
+@dataclass
+class CallUsage:
+    '''
+    What one call cost. peak_memory is the most memory, in bytes, allocated by
+    Python at once during a call with a memory limit, or, for any other call, how
+    far it raised the process's peak resident size. cpu_seconds and peak_memory
+    are None if the call was stopped before they could be measured.
+    '''
+    call: str
+    wall_seconds: float = 0.0
+    cpu_seconds: float | None = None
+    peak_memory: int | None = None
+
+
+def describe_call(function_name: str, args: tuple, kwargs: dict) -> str:
+    '''
+    Returns e.g. "fib(30)", with long arguments abbreviated.
+    '''
+    arguments = [ reprlib.repr(arg) for arg in args ] + [ f"{name}={reprlib.repr(value)}" for name, value in kwargs.items() ]
+    return f"{function_name}({', '.join(arguments)})"
+
+
+def peak_resident_size() -> int:
+    '''
+    Returns the most memory this process has had resident at once, in bytes.
+    '''
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024 # Bytes on macOS, KiB elsewhere.
+
+
+def address_space_in_use() -> int | None:
+    '''
+    Returns the size of this process's address space, in bytes, where Linux reports it.
+    '''
+    try:
+        with open("/proc/self/statm") as statm_fo:
+            return int(statm_fo.read().split()[0]) * resource.getpagesize()
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+@contextmanager
+def time_limit(timeout: float | None, name: str):
+    '''
+    Raises CallTimeoutError in the body if it runs past timeout seconds. Only in the
+    main thread, which receives SIGALRM; elsewhere, or without a timeout, there is no limit.
+    '''
+    if timeout is None or threading.current_thread() is not threading.main_thread():
+        yield
+        return
+
+    def stop_call(signal_number, frame):
+        raise CallTimeoutError(f"{name} took longer than {timeout:g} seconds.")
+    previous_handler = signal.signal(signal.SIGALRM, stop_call)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous_handler)
+
+
+def measure_call(function, args: tuple, kwargs: dict, timeout: float | None = None, max_memory: int | None = None,
+                 limit_address_space: bool = False) -> tuple[bool, object, CallUsage]:
+    '''
+    Calls function(*args, **kwargs), returning whether it raised, what it returned
+    or raised, and what it cost. A call which runs past timeout seconds raises
+    CallTimeoutError, and one which uses more than max_memory bytes raises
+    CallMemoryError. Memory is traced by tracemalloc only with max_memory, or
+    if it was already being traced. With limit_address_space, the process's address space may
+    only grow by max_memory during the call, so that a runaway call is stopped
+    as it allocates, rather than afterwards; only for a process of its own.
+    '''
+    name = getattr(function, "__name__", "function")
+    usage = CallUsage(describe_call(name, args, kwargs))
+
+    previous_limits = None
+    if limit_address_space and max_memory is not None and (in_use := address_space_in_use()) is not None:
+        previous_limits = resource.getrlimit(resource.RLIMIT_AS)
+        limit = in_use + max_memory
+        if previous_limits[1] != resource.RLIM_INFINITY:
+            limit = min(limit, previous_limits[1])
+        resource.setrlimit(resource.RLIMIT_AS, (limit, previous_limits[1]))
+
+    already_tracing = tracemalloc.is_tracing()
+    tracing = already_tracing or max_memory is not None
+    if already_tracing:
+        tracemalloc.reset_peak()
+    elif tracing:
+        tracemalloc.start()
+    memory_before = tracemalloc.get_traced_memory()[0] if tracing else peak_resident_size()
+    cpu_started = time.process_time()
+    started = time.perf_counter()
+    try:
+        try:
+            with time_limit(timeout, name):
+                value, raised = function(*args, **kwargs), False
+        finally:
+            usage.wall_seconds = time.perf_counter() - started
+            usage.cpu_seconds = time.process_time() - cpu_started
+            if tracing:
+                usage.peak_memory = max(0, tracemalloc.get_traced_memory()[1] - memory_before)
+            else:
+                usage.peak_memory = peak_resident_size() - memory_before
+            if tracing and not already_tracing:
+                tracemalloc.stop()
+            if previous_limits is not None:
+                resource.setrlimit(resource.RLIMIT_AS, previous_limits)
+    except MemoryError:
+        if max_memory is None:
+            raise
+        value, raised = CallMemoryError(f"{name} ran out of memory, with {max_memory} bytes allowed."), True
+    except BaseException as error:
+        value, raised = error, True
+
+    if not raised and max_memory is not None and usage.peak_memory > max_memory:
+        value, raised = CallMemoryError(f"{name} used {usage.peak_memory} bytes at once, more than the {max_memory} allowed."), True
+    return raised, value, usage
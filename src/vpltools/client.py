@@ -0,0 +1,85 @@
+'''
+client.py -- running tests through a vpltools evaluation server (see server.py).
+
+    python3 -m vpltools.client --socket PATH module.Class.method [...]
+
+vpl_evaluate.cases runs this instead of python3 -m unittest when the test class
+sets evaluation_server_socket. The server runs the tests in this directory, with
+this environment, and their outcomes are reported as they arrive, as unittest
+would report them. If no server is listening, unittest runs the tests here instead.
+'''
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+
+from vpltools.outcomes import TestOutcome, RunReport, PROGRESS_MARKS
+
+__unittest = True
+
+
+def request_evaluation(socket_path: str, test_ids: list[str]):
+    '''
+    Sends the request to the server at socket_path, and returns a stream of its
+    replies, or None if no server is listening there.
+    '''
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(socket_path)
+    except OSError:
+        connection.close()
+        return None
+    stream = connection.makefile("rw")
+    connection.close() # The stream keeps the connection open.
+    stream.write(json.dumps({
+        "directory"  : os.getcwd(),
+        "tests"      : test_ids,
+        "environment": dict(os.environ),
+    }) + "\n")
+    stream.flush()
+    return stream
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python3 -m vpltools.client",
+        description="Run tests through a vpltools evaluation server, or with unittest if there isn't one.")
+    parser.add_argument("--socket", required=True, help="path of the server's Unix socket")
+    parser.add_argument("tests", nargs="+", help="tests to run, as module.Class.method")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    stream = request_evaluation(args.socket, args.tests)
+    if stream is None:
+        os.execv(sys.executable, [ sys.executable, "-m", "unittest", *args.tests ])
+
+    outcomes = []
+    done = False
+    with stream:
+        for line in stream:
+            reply = json.loads(line)
+            if reply.pop("event") == "done":
+                done = True
+                break
+            outcome = TestOutcome(**reply)
+            outcomes.append(outcome)
+            sys.stdout.write(outcome.output)
+            sys.stderr.write(PROGRESS_MARKS.get(outcome.status, ("?",))[0])
+            sys.stderr.flush()
+
+    if not done:
+        if not outcomes:
+            os.execv(sys.executable, [ sys.executable, "-m", "unittest", *args.tests ])
+        reported = { outcome.test_id for outcome in outcomes }
+        unfinished = [ test_id for test_id in args.tests if test_id not in reported ] or args.tests[-1:]
+        outcomes.append(TestOutcome(unfinished[0], "error", "The evaluation server stopped before the tests finished.\n"))
+
+    sys.stderr.write("\n")
+    report = RunReport(outcomes, time.perf_counter() - started, jobs=1)
+    report.write_summary(sys.stderr)
+    sys.exit(not report.wasSuccessful())
+
+
+if __name__ == "__main__":
+    main()
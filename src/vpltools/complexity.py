@@ -0,0 +1,94 @@
+'''
+complexity.py -- estimating how the cost of a computation grows with the size of its input.
+
+If the time taken on inputs of size n grows like c * n^k, then
+log(time) = log(c) + k * log(n), so k is the slope of log(time) against log(n).
+'''
+import math
+
+__unittest = True
+
+
+def log_points(sizes: list[int], costs: list[float]) -> list[tuple[float, float]] | None:
+    '''
+    Returns (log(size), log(cost)) for each pair of sizes and costs, or None if any cost
+    is math.inf. Raises ValueError unless there are at least two pairs.
+    '''
+    if len(sizes) != len(costs) or len(sizes) < 2:
+        raise ValueError(f"Need at least two (size, cost) pairs to fit a growth rate. Got {len(sizes)} sizes and {len(costs)} costs.")
+    if any(math.isinf(cost) for cost in costs):
+        return None
+
+    # Timers can report 0 for very fast computations; the logarithm needs a positive number.
+    smallest_cost = min((cost for cost in costs if cost > 0), default=1e-9)
+    return [ (math.log(size), math.log(max(cost, smallest_cost))) for size, cost in zip(sizes, costs) ]
+
+
+def fit_growth_exponent(sizes: list[int], costs: list[float]) -> float:
+    '''
+    Returns k, the least squares estimate of the exponent in cost = c * size^k.
+    A cost of math.inf (e.g. a timeout) makes the exponent infinite.
+    '''
+    if (points := log_points(sizes, costs)) is None:
+        return math.inf
+
+    mean_log_size = sum(x for x, _ in points) / len(points)
+    mean_log_cost = sum(y for _, y in points) / len(points)
+    covariance = sum((x - mean_log_size) * (y - mean_log_cost) for x, y in points)
+    variance = sum((x - mean_log_size) ** 2 for x, _ in points)
+    return covariance / variance
+
+
+def describe_growth(exponent: float) -> str:
+    '''
+    Returns a short, human readable description of a growth exponent, e.g. "like n^2.0".
+    '''
+    if math.isinf(exponent):
+        return "faster than any polynomial (it timed out)"
+    return f"like n^{max(exponent, 0.0):.1f}"
+
+
+def fit_growth_exponent_robust(sizes: list[int], costs: list[float]) -> float:
+    '''
+    Like fit_growth_exponent, but returns the median of the slopes between every
+    pair of points (the Theil-Sen estimator), so that a single timing disturbed
+    by other work on the machine can't swing the estimate.
+    '''
+    if (points := log_points(sizes, costs)) is None:
+        return math.inf
+
+    slopes = sorted((y2 - y1) / (x2 - x1) for index, (x1, y1) in enumerate(points)
+                    for x2, y2 in points[index + 1:] if x2 != x1)
+    if not slopes:
+        raise ValueError("Need at least two different sizes to fit a growth rate.")
+    middle = len(slopes) // 2
+    return slopes[middle] if len(slopes) % 2 else (slopes[middle - 1] + slopes[middle]) / 2
+
+
+def best_times(runs: list, inputs: list, repeats: int, warmup: int = 1) -> list[list[float]]:
+    '''
+    Times each of runs on each of inputs, in order, returning the best time of each
+    run on each input. A run is called with an input, and returns the time it took,
+    or math.inf if it had to be stopped, after which it isn't run on later inputs.
+    Each run is first run warmup times, untimed. Runs then take turns, so that each
+    sees the same load on the machine; the best of repeats times is kept, since
+    other work can only ever add time.
+    '''
+    times: list[list[float]] = [ [] for _ in runs ]
+    for generated in inputs:
+        # A run which has to be stopped once isn't tried again on this input, or any longer one.
+        running = [ index for index in range(len(runs)) if math.inf not in times[index] ]
+        best = [ math.inf ] * len(runs)
+        for index in list(running):
+            for _ in range(warmup):
+                if math.isinf(runs[index](generated)):
+                    running.remove(index)
+                    break
+        for _ in range(repeats):
+            for index in list(running):
+                best[index] = min(best[index], elapsed := runs[index](generated))
+                if math.isinf(elapsed):
+                    running.remove(index)
+        for index in range(len(runs)):
+            times[index].append(best[index])
+    return times
@@ -0,0 +1,88 @@
+'''
+differential.py -- generating inputs on which to compare a student's program with
+the key's, and shrinking an input on which they differ.
+
+VPLTestCase.differential_test draws each input from a random.Random of its own,
+seeded from the test's seed and the input's number, so that the same inputs are
+tried in the same order on every run, however they are batched. Once the programs
+differ, the input is shrunk: parts of it are removed or made smaller for as long
+as the programs still differ, so that the student is shown a small example.
+'''
+import random
+from typing import Callable, Iterator
+
+__unittest = True
+
+
+def input_random(seed: int | str, index: int) -> random.Random:
+    '''
+    Returns the random number generator from which input number index is drawn.
+    '''
+    return random.Random(f"{seed}:{index}")
+
+
+def shorter(sequence) -> Iterator:
+    '''
+    Yields copies of sequence with parts removed: all of it, then each half, each
+    quarter, and so on down to single items, trying the largest removals first.
+    '''
+    chunk = len(sequence)
+    while chunk >= 1:
+        for start in range(0, len(sequence), chunk):
+            yield sequence[:start] + sequence[start + chunk:]
+        chunk //= 2
+
+
+def shrink_candidates(value) -> Iterator:
+    '''
+    Yields values like value, but smaller, the smallest first. Strings lose lines,
+    then characters; lists lose items, then have each item shrunk; tuples (e.g.
+    arguments) have each item shrunk; numbers move towards 0.
+    '''
+    if isinstance(value, bool):
+        if value:
+            yield False
+    elif isinstance(value, int):
+        sign = 1 if value > 0 else -1
+        for smaller in dict.fromkeys((0, sign * (abs(value) // 2), value - sign)):
+            if abs(smaller) < abs(value):
+                yield smaller
+    elif isinstance(value, float):
+        for smaller in dict.fromkeys((0.0, float(int(value)), value / 2)):
+            if abs(smaller) < abs(value):
+                yield smaller
+    elif isinstance(value, str):
+        lines = value.splitlines(keepends=True)
+        if len(lines) > 1:
+            yield from ("".join(fewer) for fewer in shorter(lines))
+        yield from shorter(value)
+    elif isinstance(value, list):
+        yield from shorter(value)
+        for index, item in enumerate(value):
+            for smaller in shrink_candidates(item):
+                yield value[:index] + [ smaller ] + value[index + 1:]
+    elif isinstance(value, tuple):
+        for index, item in enumerate(value):
+            for smaller in shrink_candidates(item):
+                yield value[:index] + (smaller,) + value[index + 1:]
+
+
+def shrink(value, still_differs: Callable[[object], bool], max_attempts: int) -> tuple[object, int]:
+    '''
+    Returns the smallest value found, starting from value, for which still_differs
+    is true, and the number of candidates tried. Each smaller value which still
+    differs is kept, and shrunk in turn, until no candidate differs, or
+    max_attempts candidates have been tried.
+    '''
+    attempts = 0
+    shrunk = True
+    while shrunk and attempts < max_attempts:
+        shrunk = False
+        for candidate in shrink_candidates(value):
+            if attempts >= max_attempts:
+                break
+            attempts += 1
+            if still_differs(candidate):
+                value, shrunk = candidate, True
+                break
+    return value, attempts
@@ -0,0 +1,61 @@
+'''
+directory_index.py -- a cached listing of the files in a directory.
+
+Test classes, HistorySearcher, the grader and __main__ all need to know which
+files are in the same directory, often several times per run. The listing is
+read once with os.scandir, and read again only when the directory's own
+modification time shows that files have been added, removed or renamed.
+'''
+import os
+import time
+from dataclasses import dataclass
+
+from vpltools.supported_languages import SupportedLanguages, LANGUAGE_FOR_EXTENSION
+
+__unittest = True
+
+# A directory modified this recently (in nanoseconds) before it was listed might be
+# modified again within the same tick of a coarse file system clock, unnoticed.
+RACY_MODIFICATION_NS = 2 * 10**9
+
+# For str.endswith, which is much quicker than looking up each file's extension.
+SUPPORTED_EXTENSIONS = tuple(LANGUAGE_FOR_EXTENSION)
+
+
+@dataclass
+class DirectoryIndex:
+    '''
+    The names of the entries in a directory, in the order os.scandir lists them.
+    '''
+    directory: str
+    files: tuple[str, ...]
+    stamp: tuple[int, int]
+    trustworthy: bool
+
+
+def language_of(file_name: str) -> SupportedLanguages | None:
+    '''
+    Returns the language indicated by the extension of file_name, or None.
+    '''
+    return LANGUAGE_FOR_EXTENSION.get(os.path.splitext(file_name)[1])
+
+
+_indexes: dict[str, DirectoryIndex] = {}
+
+
+def get_directory_index(directory: str) -> DirectoryIndex:
+    '''
+    Returns the index of directory, listing it again only if it has changed.
+    '''
+    directory_stat = os.stat(directory)
+    stamp = (directory_stat.st_ino, directory_stat.st_mtime_ns)
+    index = _indexes.get(directory)
+    if index is not None and index.stamp == stamp and index.trustworthy:
+        return index
+
+    listed_at = time.time_ns()
+    with os.scandir(directory) as entries:
+        files = tuple(entry.name for entry in entries)
+    index = DirectoryIndex(directory, files, stamp, trustworthy=listed_at - stamp[1] > RACY_MODIFICATION_NS)
+    _indexes[directory] = index
+    return index
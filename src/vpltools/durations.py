@@ -0,0 +1,137 @@
+'''
+durations.py -- remembering how long tests and submissions took, so that runs
+shared between several workers can start the longest first.
+
+A long job started last keeps the other workers idle while it finishes. Started
+first, it runs alongside the short ones instead (the "longest processing time"
+rule). Durations are kept in a small JSON file, as averages which favour recent runs.
+'''
+import os
+import json
+import time
+import tempfile
+
+from vpltools.resultstore import cache_dir
+
+__unittest = True
+
+DEFAULT_MAX_ENTRIES = 5000
+# How much each new duration counts, against the average of those before it.
+NEWEST_WEIGHT = 0.5
+
+
+def default_history_path() -> str:
+    return os.path.join(cache_dir(), "durations.json")
+
+
+class DurationHistory:
+    '''
+    Expected durations, in seconds, keyed by test id (or any other string). Durations
+    recorded are only written to the file by save(), which merges them with any
+    recorded meanwhile by other processes, keeping at most max_entries, those most
+    recently recorded.
+    '''
+    def __init__(self, path: str | None = None, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path or default_history_path()
+        self.max_entries = max_entries
+        self.entries: dict[str, tuple[float, float]] = self.load() # key: (seconds, when recorded)
+        self.recorded: dict[str, tuple[float, float]] = {}
+
+
+    def load(self) -> dict[str, tuple[float, float]]:
+        try:
+            with open(self.path, "r") as history_fo:
+                return { key: tuple(entry) for key, entry in json.load(history_fo).items() }
+        except (OSError, ValueError, TypeError, AttributeError):
+            return {}
+
+
+    def expected(self, key: str) -> float | None:
+        entry = self.entries.get(key)
+        return None if entry is None else entry[0]
+
+
+    def expected_for_test(self, test_id: str) -> float | None:
+        '''
+        Like expected, but also finds the test under a longer id, as when it was
+        discovered from a directory further up (e.g. assignment.test_x.TestX.test_y
+        for test_x.TestX.test_y). The most recently recorded match is returned.
+        '''
+        if test_id in self.entries:
+            return self.expected(test_id)
+        matches = [ entry for key, entry in self.entries.items() if key.endswith("." + test_id) ]
+        return max(matches, key=lambda entry: entry[1])[0] if matches else None
+
+
+    def record(self, key: str, seconds: float) -> None:
+        previous = self.expected(key)
+        if previous is not None:
+            seconds = NEWEST_WEIGHT * seconds + (1 - NEWEST_WEIGHT) * previous
+        self.entries[key] = self.recorded[key] = (seconds, time.time())
+
+
+    def save(self) -> None:
+        if not self.recorded:
+            return
+        entries = self.load()
+        entries.update(self.recorded)
+        if len(entries) > self.max_entries:
+            entries = dict(sorted(entries.items(), key=lambda item: item[1][1])[-self.max_entries:])
+
+        directory = os.path.dirname(self.path) or "."
+        try:
+            os.makedirs(directory, exist_ok=True)
+            file_descriptor, temporary_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+        except OSError:
+            return # e.g. a read-only home directory. The history is only a hint.
+        try:
+            with os.fdopen(file_descriptor, "w") as history_fo:
+                json.dump(entries, history_fo)
+            os.replace(temporary_path, self.path)
+        except:
+            os.unlink(temporary_path)
+            raise
+        self.entries = entries
+        self.recorded = {}
+
+
+def assume_average(estimates: list[float | None]) -> list[float] | None:
+    '''
+    Returns estimates, with those missing replaced by the average of the rest,
+    or None if all are missing.
+    '''
+    known = [ estimate for estimate in estimates if estimate is not None ]
+    if not known:
+        return None
+    average = sum(known) / len(known)
+    return [ average if estimate is None else estimate for estimate in estimates ]
+
+
+def order_longest_first(estimates: list[float | None], noun: str) -> tuple[list[int], str]:
+    '''
+    Returns the indices of estimates, longest first, and a sentence describing the
+    order, for reports. Jobs without an estimate are assumed to take the average of
+    those with one. Jobs expected to take as long as each other keep their order.
+    '''
+    filled_in = assume_average(estimates)
+    if filled_in is None:
+        return list(range(len(estimates))), f"{len(estimates)} {noun} in load order, as none has run before."
+
+    known = [ estimate for estimate in estimates if estimate is not None ]
+    order = sorted(range(len(estimates)), key=lambda index: -filled_in[index])
+    description = f"{len(estimates)} {noun} longest expected first: {len(known)} timed before, the longest at {max(known):.2f}s"
+    if len(known) < len(estimates):
+        description += f"; {len(estimates) - len(known)} new, assumed to take {filled_in[estimates.index(None)]:.2f}s"
+    return order, description + "."
+
+
+def order_shortest_first(estimates: list[float | None]) -> list[int]:
+    '''
+    Returns the indices of estimates, shortest first, so that when a run stops at its
+    first failure, as little as possible runs before it. Missing estimates are
+    treated as in order_longest_first.
+    '''
+    filled_in = assume_average(estimates)
+    if filled_in is None:
+        return list(range(len(estimates)))
+    return sorted(range(len(estimates)), key=lambda index: filled_in[index])
@@ -0,0 +1,378 @@
+'''
+grader.py -- grading a whole roster of submissions offline, the way VPL would.
+
+    python3 -m vpltools grade <tests_dir> <submissions_root> [--jobs N] [--timeout SECONDS] [--output FILE]
+
+tests_dir is a directory of VPLTestCase tests, with its vpl_evaluate.cases, and
+each subdirectory of submissions_root holds one student's submitted files. Each
+submission is copied, with the execution files from tests_dir, into a workspace
+of its own, and its whole suite is run there in a single subprocess. Grades are
+computed from the cases in vpl_evaluate.cases, and written to a CSV or JSON
+gradebook.
+
+Key programs are compiled once, before any submission is graded, and SQLite
+fixture databases are built once and then copied into each run.
+'''
+import os
+import sys
+import csv
+import json
+import time
+import shlex
+import signal
+import argparse
+import dataclasses
+import tempfile
+import unittest
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import vpltools
+from vpltools.vpl_test_case import VPLTestCase
+from vpltools.make_vpl_evaluate_cases import VPLCase, read_cases_file, grade_from_cases, get_vpl_eval_path
+from vpltools.outcomes import RecordingTestResult, run_tests, write_outcomes, read_outcomes
+from vpltools.workspace import make_workspace, copy_into_workspace, remove_workspace
+from vpltools.directory_index import get_directory_index
+from vpltools.resultstore import ResultStore, make_result_key, default_store_dir
+from vpltools.durations import DurationHistory, order_longest_first, default_history_path
+from vpltools.lint import command_report, LintError
+
+__unittest = True
+
+OUTCOMES_FILE_NAME = ".vpltools_outcomes.json"
+DEFAULT_TIMEOUT = 120.0
+
+
+class GraderError(RuntimeError):
+    pass
+
+
+@dataclasses.dataclass
+class SubmissionGrade:
+    '''
+    The grade for one submission, with the result of each case in vpl_evaluate.cases.
+    error describes anything which stopped the tests from running to completion.
+    reused is True if the result was copied from an identical submission.
+    duration is how long its tests took to run, in seconds.
+    '''
+    submission: str
+    grade: float
+    cases_passed: list[bool]
+    case_messages: list[str]
+    error: str = ""
+    reused: bool = False
+    duration: float = 0.0
+
+
+def find_test_classes(test_suite: unittest.TestSuite) -> list[type[VPLTestCase]]:
+    '''
+    Returns each distinct VPLTestCase subclass with tests in test_suite.
+    '''
+    test_classes = []
+    for test_item in test_suite:
+        if isinstance(test_item, unittest.TestSuite):
+            found_classes = find_test_classes(test_item)
+        elif isinstance(test_item, VPLTestCase):
+            found_classes = [ type(test_item) ]
+        else:
+            found_classes = []
+        test_classes.extend(tc for tc in found_classes if tc not in test_classes)
+    return test_classes
+
+
+def prepare_key_programs(test_classes: list[type[VPLTestCase]]) -> None:
+    '''
+    Compiles each key program in its tests directory, so that every workspace
+    receives a copy of the executable, instead of compiling it again.
+    '''
+    for test_class in test_classes:
+        if not test_class.key_source_files:
+            continue
+
+        test_class.set_this_dir_name()
+        test_class.production_environment = True
+        test_class.files_renamed = []
+        try:
+            test_class.compile_key_program()
+        except (RuntimeError, OSError):
+            pass # The run for each submission reports the problem.
+        finally:
+            test_class.remask_hidden_files()
+
+
+def find_execution_files(tests_dir: str, test_classes: list[type[VPLTestCase]]) -> list[str]:
+    '''
+    Returns the names of the files in tests_dir which belong in every workspace:
+    everything except the example submission which the tests are developed against.
+    '''
+    example_submission = set()
+    for test_class in test_classes:
+        test_class.set_this_dir_name()
+        if test_class.key_source_files is None:
+            test_class.key_source_files = []
+        key_files = set(test_class.key_source_files)
+        key_files.update(key_file + test_class.mask_extension for key_file in test_class.key_source_files)
+        example_submission.update(
+            file for file in test_class.find_student_files()
+            if file not in key_files and not file.startswith(test_class.key_program_name + "_"))
+
+    return [ name for name in get_directory_index(tests_dir).files
+            if name not in example_submission and name not in ("__pycache__", OUTCOMES_FILE_NAME) ]
+
+
+def run_in_workspace(command: list[str], workspace: str, env: dict[str, str], timeout: float) -> subprocess.CompletedProcess:
+    '''
+    Runs command in workspace. If it is still running after timeout seconds, it is
+    killed, along with any programs it started, and subprocess.TimeoutExpired is raised.
+    '''
+    process = subprocess.Popen(command, cwd=workspace, env=env, text=True,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, start_new_session=True)
+    try:
+        stdout, stderr = process.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.communicate()
+        raise
+    return subprocess.CompletedProcess(command, process.returncode, stdout, stderr)
+
+
+def run_case_program(case: VPLCase, workspace: str, env: dict[str, str], timeout: float) -> tuple[bool, str]:
+    '''
+    Runs a case which is not a single unittest test (e.g. the PyLint case) just as
+    VPL would, returning whether it passed, and its output.
+    '''
+    program = case.program_to_run
+    if os.path.basename(program).startswith("python3"):
+        program = sys.executable
+    try:
+        process = run_in_workspace([ program, *shlex.split(case.program_arguments) ], workspace, env, timeout)
+    except subprocess.TimeoutExpired:
+        return False, f"Timed out after {timeout:g} seconds."
+
+    output = process.stdout + process.stderr
+    exit_code_ok = case.expected_exit_code is None or process.returncode == case.expected_exit_code
+    return exit_code_ok and case.output_matches(output), output
+
+
+def run_lint_case(case: VPLCase, workspace: str) -> tuple[bool, str]:
+    '''
+    Runs a PyLint case (see lint.py) in this process, rather than starting PyLint
+    afresh for each submission, returning whether it passed, and its report.
+    '''
+    try:
+        report = command_report(case.lint_arguments, workspace)
+    except LintError as error:
+        return False, str(error)
+    return case.output_matches(report), report
+
+
+def grade_submission(submission_dir: str, tests_dir: str, execution_files: list[str], cases: list[VPLCase],
+                     env: dict[str, str], timeout: float, keep_workspace: bool = False) -> SubmissionGrade:
+    '''
+    Runs the tests against one submission, in a workspace of its own, and grades it.
+    '''
+    submission = os.path.basename(submission_dir)
+    started = time.perf_counter()
+    workspace = make_workspace(prefix=f"vpltools_{submission}_")
+    try:
+        # Execution files are copied last, so that they replace any submitted file with the same name, as in VPL.
+        copy_into_workspace(workspace, submission_dir)
+        copy_into_workspace(workspace, tests_dir, execution_files)
+
+        error = ""
+        result = RecordingTestResult()
+        try:
+            process = run_in_workspace([ sys.executable, "-m", "vpltools.grader", workspace ], workspace, env, timeout)
+        except subprocess.TimeoutExpired:
+            error = f"Timed out after {timeout:g} seconds."
+        else:
+            try:
+                result = read_outcomes(os.path.join(workspace, OUTCOMES_FILE_NAME))
+            except FileNotFoundError:
+                error = "The tests did not finish:\n" + process.stderr
+
+        cases_passed = []
+        case_messages = []
+        for case in cases:
+            if error:
+                passed, message = False, error
+            elif (test_id := case.unittest_id) is not None:
+                outcome = result.outcome_of(test_id)
+                passed, message = outcome.passed, outcome.message
+            elif case.lint_arguments is not None:
+                passed, message = run_lint_case(case, workspace)
+            else:
+                passed, message = run_case_program(case, workspace, env, timeout)
+            cases_passed.append(passed)
+            case_messages.append(message)
+
+        return SubmissionGrade(submission, grade_from_cases(cases, cases_passed), cases_passed, case_messages, error,
+                               duration=time.perf_counter() - started)
+
+    finally:
+        if not keep_workspace:
+            remove_workspace(workspace)
+
+
+def student_files_in(submission_dir: str, test_classes: list[type[VPLTestCase]]) -> list[str]:
+    '''
+    Returns the names of the files in submission_dir which any of the test classes would test.
+    '''
+    return sorted(set().union(*(test_class.find_student_files(submission_dir) for test_class in test_classes)))
+
+
+def duration_key(tests_dir: str, submission_dir: str) -> str:
+    return f"submission {tests_dir} {os.path.basename(submission_dir)}"
+
+
+def grade_roster(tests_dir: str, submissions_root: str, jobs: int | None = None,
+                 timeout: float = DEFAULT_TIMEOUT, keep_workspaces: bool = False,
+                 results_store: ResultStore | None = None,
+                 history: DurationHistory | None = None) -> tuple[list[VPLCase], list[SubmissionGrade]]:
+    '''
+    Grades every submission in submissions_root against the tests in tests_dir,
+    running up to jobs submissions at once. Returns the cases, and a grade for
+    each submission, in order of submission name.
+
+    Submissions whose files are byte-identical are only run once. With a
+    results_store, results are also reused from earlier gradings, as long as
+    neither the tests nor vpltools have changed since. With a history, the
+    submissions which took longest last time are started first.
+    '''
+    tests_dir = os.path.abspath(tests_dir)
+    cases_path = get_vpl_eval_path(tests_dir)
+    if not os.path.exists(cases_path):
+        raise GraderError(f"{cases_path} not found. Run the tests once to generate it.")
+    cases = read_cases_file(cases_path)
+
+    test_classes = find_test_classes(unittest.TestLoader().discover(tests_dir))
+    if not test_classes:
+        raise GraderError(f"No VPLTestCase tests found in {tests_dir}.")
+    prepare_key_programs(test_classes)
+    execution_files = find_execution_files(tests_dir, test_classes)
+    # Compiled key programs are left out of the key: they are rebuilt from the key's source.
+    test_files = [ name for name in execution_files
+                  if not any(name.startswith(test_class.key_program_name + "_") for test_class in test_classes) ]
+
+    submission_dirs = sorted(entry.path for entry in os.scandir(submissions_root)
+                             if entry.is_dir() and not entry.name.startswith("."))
+    result_keys = { submission_dir: make_result_key(submission_dir, student_files_in(submission_dir, test_classes), tests_dir, test_files)
+                    for submission_dir in submission_dirs }
+
+    # Only the first submission with each key is graded. The rest reuse its result.
+    graded_by_key: dict[str, SubmissionGrade] = {}
+    dirs_to_run = {}
+    for submission_dir, key in result_keys.items():
+        if key in graded_by_key or key in dirs_to_run:
+            continue
+        stored = results_store.get(key) if results_store is not None else None
+        if stored is not None:
+            graded_by_key[key] = SubmissionGrade(os.path.basename(submission_dir), grade_from_cases(cases, stored["cases_passed"]),
+                                                 stored["cases_passed"], stored["case_messages"], reused=True)
+        else:
+            dirs_to_run[key] = submission_dir
+
+    with tempfile.TemporaryDirectory(prefix="vpltools_fixtures_") as fixture_cache:
+        env = dict(os.environ)
+        env["VPLTOOLS_PRODUCTION"] = "1"
+        env["VPLTOOLS_FIXTURE_CACHE"] = fixture_cache
+        # Run the tests with the same vpltools as the grader.
+        vpltools_parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(vpltools.__file__)))
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [ vpltools_parent_dir, env.get("PYTHONPATH") ]))
+
+        keys_to_run = list(dirs_to_run)
+        if history is not None:
+            order, schedule = order_longest_first([ history.expected(duration_key(tests_dir, dirs_to_run[key])) for key in keys_to_run ],
+                                                  "submissions")
+            keys_to_run = [ keys_to_run[index] for index in order ]
+            print(f"Scheduled {schedule}")
+
+        # Each job spends its time waiting on a subprocess, so threads are enough to keep them all busy.
+        with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as executor:
+            futures = { executor.submit(grade_submission, dirs_to_run[key], tests_dir, execution_files,
+                                        cases, env, timeout, keep_workspaces): key
+                        for key in keys_to_run }
+            for future in as_completed(futures):
+                graded = future.result()
+                graded_by_key[futures[future]] = graded
+                if history is not None:
+                    history.record(duration_key(tests_dir, dirs_to_run[futures[future]]), graded.duration)
+                # Timeouts and crashes may not happen next time, so only complete runs are kept.
+                if results_store is not None and not graded.error:
+                    results_store.put(futures[future], { "cases_passed": graded.cases_passed, "case_messages": graded.case_messages })
+                print(f"{graded.submission}: {graded.grade:g}", graded.error.splitlines()[0] if graded.error else "")
+
+    if results_store is not None:
+        results_store.evict()
+    if history is not None:
+        history.save()
+
+    grades = []
+    for submission_dir, key in result_keys.items():
+        graded = graded_by_key[key]
+        if graded.submission != os.path.basename(submission_dir):
+            graded = dataclasses.replace(graded, submission=os.path.basename(submission_dir), reused=True)
+        if graded.reused:
+            print(f"{graded.submission}: {graded.grade:g} (reused)")
+        grades.append(graded)
+    return cases, grades
+
+
+def write_gradebook(file_path: str, cases: list[VPLCase], grades: list[SubmissionGrade]) -> None:
+    '''
+    Writes the grades as JSON if file_path ends with .json, or as CSV otherwise.
+    The CSV file has a column for each case, holding 1 if it passed, and 0 if not.
+    '''
+    if file_path.endswith(".json"):
+        with open(file_path, "w") as gradebook_fo:
+            json.dump([ {
+                "submission": graded.submission,
+                "grade"     : graded.grade,
+                "error"     : graded.error,
+                "reused"    : graded.reused,
+                "cases"     : [ { "case": case.name, "passed": passed, "message": message }
+                                for case, passed, message in zip(cases, graded.cases_passed, graded.case_messages) ],
+            } for graded in grades ], gradebook_fo, indent=2)
+        return
+
+    with open(file_path, "w", newline="") as gradebook_fo:
+        writer = csv.writer(gradebook_fo)
+        writer.writerow([ "submission", "grade", *(case.name for case in cases), "error" ])
+        for graded in grades:
+            writer.writerow([ graded.submission, f"{graded.grade:g}",
+                              *(int(passed) for passed in graded.cases_passed),
+                              graded.error.splitlines()[0] if graded.error else "" ])
+
+
+def main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(prog="python3 -m vpltools grade",
+        description="Grade every submission in a directory against a directory of VPL tests.")
+    parser.add_argument("tests_dir", help="directory containing the tests and vpl_evaluate.cases")
+    parser.add_argument("submissions_root", help="directory containing one subdirectory per submission")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="submissions to grade at once (default: one per CPU)")
+    parser.add_argument("-t", "--timeout", type=float, default=DEFAULT_TIMEOUT, help="seconds allowed for each submission's tests")
+    parser.add_argument("-o", "--output", default="gradebook.csv", help="gradebook to write, .csv or .json")
+    parser.add_argument("--keep-workspaces", action="store_true", help="don't delete each submission's workspace")
+    parser.add_argument("--results-store", default=default_store_dir(), help="directory of results to reuse for unchanged submissions")
+    parser.add_argument("--no-results-store", action="store_true", help="grade every submission, even if unchanged")
+    parser.add_argument("--durations", default=default_history_path(), help="file of past durations, used to start the slowest submissions first")
+    args = parser.parse_args(argv)
+
+    results_store = None if args.no_results_store else ResultStore(args.results_store)
+    history = DurationHistory(args.durations)
+    cases, grades = grade_roster(args.tests_dir, args.submissions_root, args.jobs, args.timeout, args.keep_workspaces, results_store, history)
+    write_gradebook(args.output, cases, grades)
+    print(f"Graded {len(grades)} submissions. Wrote {args.output}")
+
+
+def run_suite_in_workspace(workspace: str) -> None:
+    '''
+    Runs every test in workspace, in this process, and saves their outcomes for the grader.
+    '''
+    os.chdir(workspace)
+    test_suite = unittest.TestLoader().discover(workspace, top_level_dir=workspace)
+    write_outcomes(run_tests(test_suite), os.path.join(workspace, OUTCOMES_FILE_NAME))
+
+
+if __name__ == "__main__":
+    run_suite_in_workspace(sys.argv[1])
@@ -0,0 +1,329 @@
+'''
+history.py -- streaming, structure-aware parsing of bash and zsh history files.
+
+parse_history() turns the lines of a history file into HistoryEntry objects
+without reading the whole file into memory. It understands:
+- plain bash history, one command per line,
+- bash history written with HISTTIMEFORMAT set, where "#<seconds>" lines
+  precede the commands they timestamp,
+- zsh extended history, ": <seconds>:<duration>;<command>", where commands
+  spanning several lines end each line but the last with a backslash.
+
+Each entry is tokenized (once, on demand) into its simple commands, so that
+HistoryCommand requirements can match the program which was actually run,
+rather than any occurrence of its name, as in 'echo "cd"'.
+'''
+import re
+import shlex
+from dataclasses import dataclass, field
+from functools import cached_property
+
+from vpltools.multipattern import MultiPatternMatcher, RegexCommand, batches
+
+__unittest = True
+
+BASH_TIMESTAMP_LINE = re.compile(r"^#(\d+)\s*$")
+ZSH_EXTENDED_LINE = re.compile(r"^: *(\d+):\d+;(.*)$", re.DOTALL)
+ENVIRONMENT_ASSIGNMENT = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*=")
+
+CONTROL_OPERATORS = { "|", "||", "|&", "&", "&&", ";", ";;", "(", ")" }
+REDIRECTION_OPERATORS = { ">", ">>", ">|", "<", "<<", "<<<", ">&", "<&", "&>", "&>>", "<>" }
+# Commands without quotes or escapes (most of them) are tokenized with this, which is much faster than shlex.
+UNQUOTED_TOKEN = re.compile(r"\|\||\|&|&&|;;|&>>|&>|>>|>\||>&|<<<|<<|<&|<>|[|&;()<>]|[^\s|&;()<>]+")
+QUOTING_CHARACTERS = re.compile(r"[\"'\\]")
+# Reserved words which may precede the program name of a simple command, e.g. "do wc -l".
+LEADING_RESERVED_WORDS = { "if", "then", "else", "elif", "fi", "do", "done", "while", "until", "esac", "{", "}", "!", "time" }
+
+
+def split_simple_commands(command: str) -> list[list[str]]:
+    '''
+    Tokenizes a command line the way a shell would (approximately), and splits
+    it into the argument vectors of its simple commands. Redirections, their
+    targets, comments, leading reserved words (as in "do wc -l"), and leading
+    environment assignments are dropped.
+    E.g. 'cd lab && FOO=1 ls -l > out.txt' gives [["cd", "lab"], ["ls", "-l"]].
+    '''
+    if QUOTING_CHARACTERS.search(command) is None:
+        tokens = UNQUOTED_TOKEN.findall(command)
+    else:
+        lexer = shlex.shlex(command, posix=True, punctuation_chars=True)
+        lexer.whitespace_split = True
+        lexer.commenters = ""
+        try:
+            tokens = list(lexer)
+        except ValueError: # Unbalanced quotes. Fall back to splitting on whitespace.
+            tokens = command.split()
+
+    simple_commands = []
+    argv = []
+    skip_next = False
+    for i, token in enumerate(tokens):
+        if skip_next:
+            skip_next = False
+        elif token in CONTROL_OPERATORS:
+            if argv:
+                simple_commands.append(argv)
+            argv = []
+        elif token in REDIRECTION_OPERATORS:
+            skip_next = True
+        elif token.isdigit() and i + 1 < len(tokens) and tokens[i + 1] in REDIRECTION_OPERATORS:
+            continue # File descriptor number, as in 2> errors.txt
+        elif token.startswith("#") and not argv:
+            break
+        elif not argv and (token in LEADING_RESERVED_WORDS or ENVIRONMENT_ASSIGNMENT.match(token)):
+            continue
+        else:
+            argv.append(token)
+
+    if argv:
+        simple_commands.append(argv)
+    return simple_commands
+
+
+@dataclass
+class HistoryEntry:
+    '''
+    A single command from a history file. timestamp is in seconds since the
+    epoch, or None when the history file does not record it.
+    '''
+    command: str
+    line_number: int
+    timestamp: int | None = None
+
+    @cached_property
+    def simple_commands(self) -> list[list[str]]:
+        return split_simple_commands(self.command)
+
+
+def parse_history(lines):
+    '''
+    Generates a HistoryEntry for each command in lines, an iterable of lines
+    such as an open history file. Only one command is held in memory at a time.
+    '''
+    pending_timestamp = None
+    continued_command = None
+    continued_timestamp = None
+    continued_line_number = 0
+
+    for line_number, line in enumerate(lines, start=1):
+        line = line.rstrip("\n")
+
+        if continued_command is not None:
+            if line.endswith("\\"):
+                continued_command += "\n" + line[:-1]
+                continue
+            yield HistoryEntry(continued_command + "\n" + line, continued_line_number, continued_timestamp)
+            continued_command = None
+            continue
+
+        if (timestamp_match := BASH_TIMESTAMP_LINE.match(line)) is not None:
+            pending_timestamp = int(timestamp_match.group(1))
+            continue
+
+        timestamp = pending_timestamp
+        pending_timestamp = None
+        if (zsh_match := ZSH_EXTENDED_LINE.match(line)) is not None:
+            timestamp = int(zsh_match.group(1))
+            line = zsh_match.group(2)
+            if line.endswith("\\"):
+                continued_command = line[:-1]
+                continued_timestamp = timestamp
+                continued_line_number = line_number
+                continue
+
+        if line.strip():
+            yield HistoryEntry(line, line_number, timestamp)
+
+    if continued_command is not None: # The file ended part way through a command.
+        yield HistoryEntry(continued_command, continued_line_number, continued_timestamp)
+
+
+@dataclass(frozen=True)
+class HistoryCommand:
+    '''
+    A required command, matched against the tokenized simple commands in each
+    history entry, rather than against raw text.
+    - program   : the name of the program run, e.g. "cd". Must be the first word.
+    - args      : arguments which must all be present, in any order. Use
+                  RegexCommand for an argument to match any argument it searches.
+    - exact_args: when True, the arguments must be exactly args, in order.
+    - after     : another requirement (of any type) which must have been
+                  satisfied by an earlier entry, e.g. "ran mkdir lab before cd lab".
+    '''
+    program: str
+    args: tuple = ()
+    exact_args: bool = False
+    after: object = field(default=None, compare=False)
+
+    def __post_init__(self):
+        object.__setattr__(self, "args", tuple(self.args))
+
+
+    def __str__(self):
+        description = " ".join([self.program, *(str(arg) for arg in self.args)])
+        if self.after is not None:
+            description += f" (after {self.after})"
+        return description
+
+
+    @staticmethod
+    def argument_matches(expected, argument: str) -> bool:
+        if isinstance(expected, RegexCommand):
+            return re.search(expected.pattern, argument, expected.flags) is not None
+        return expected == argument
+
+
+    def matches(self, argv: list[str]) -> bool:
+        if not argv or argv[0] != self.program:
+            return False
+
+        arguments = argv[1:]
+        if self.exact_args:
+            return (len(arguments) == len(self.args)
+                    and all(self.argument_matches(e, a) for e, a in zip(self.args, arguments)))
+
+        return all(any(self.argument_matches(expected, argument) for argument in arguments)
+                   for expected in self.args)
+
+
+class HistoryMatcher:
+    '''
+    Matches a list of requirements against a stream of HistoryEntry objects.
+    Text requirements (str, RegexCommand, WhitespaceInsensitiveCommand) are
+    matched by a MultiPatternMatcher, fed one line per command, in batches. HistoryCommand
+    requirements are looked up by program name, for each simple command.
+    Memory use depends only on the number of requirements.
+
+    Entries timestamped outside [earliest_timestamp, latest_timestamp] are
+    ignored. Entries with no timestamp are never ignored.
+    '''
+    def __init__(self, requirements: list, earliest_timestamp: int | None = None, latest_timestamp: int | None = None):
+        self.requirements = list(requirements)
+        self.earliest_timestamp = earliest_timestamp
+        self.latest_timestamp = latest_timestamp
+
+        # Prerequisites named with "after" are matched too, even when they are not requirements.
+        self.patterns = []
+        self.ids_by_identity: dict[int, int] = {}
+        for requirement in self.requirements:
+            self.add_pattern(requirement)
+
+        self.found_at: list[HistoryEntry | None] = [None] * len(self.patterns)
+        # Positions in the stream of entries read (whether or not in the time window).
+        self.found_index: list[int | None] = [None] * len(self.patterns)
+        self.entries_read = 0
+        self.prerequisite_ids: dict[int, int] = {}
+        self.commands_by_program: dict[str, list[int]] = {}
+        self.text_pattern_ids: list[int] = []
+
+        for pattern_id, pattern in enumerate(self.patterns):
+            if isinstance(pattern, HistoryCommand):
+                self.commands_by_program.setdefault(pattern.program, []).append(pattern_id)
+                if pattern.after is not None:
+                    self.prerequisite_ids[pattern_id] = self.pattern_id(pattern.after)
+            else:
+                self.text_pattern_ids.append(pattern_id)
+
+        self.text_matcher = MultiPatternMatcher([self.patterns[i] for i in self.text_pattern_ids])
+
+
+    def add_pattern(self, pattern) -> None:
+        if isinstance(pattern, HistoryCommand) and pattern.after is not None:
+            self.add_pattern(pattern.after)
+        if id(pattern) not in self.ids_by_identity:
+            self.ids_by_identity[id(pattern)] = len(self.patterns)
+            self.patterns.append(pattern)
+
+
+    def pattern_id(self, pattern) -> int:
+        return self.ids_by_identity[id(pattern)]
+
+
+    def is_in_time_window(self, entry: HistoryEntry) -> bool:
+        if entry.timestamp is None:
+            return True
+        if self.earliest_timestamp is not None and entry.timestamp < self.earliest_timestamp:
+            return False
+        if self.latest_timestamp is not None and entry.timestamp > self.latest_timestamp:
+            return False
+        return True
+
+
+    def feed_entry(self, entry: HistoryEntry) -> None:
+        self.feed_batch([entry])
+
+
+    def feed_batch(self, entries: list[HistoryEntry]) -> None:
+        '''
+        Feeds consecutive entries to the matcher, the text of each run of them
+        inside the time window in one MultiPatternMatcher batch.
+        '''
+        run_start = 0
+        for index, entry in enumerate(entries):
+            if not self.is_in_time_window(entry):
+                self.feed_run(entries[run_start:index])
+                self.text_matcher.break_stream()
+                self.entries_read += 1
+                run_start = index + 1
+        self.feed_run(entries[run_start:])
+
+
+    def record(self, pattern_id: int, entry: HistoryEntry, index: int) -> None:
+        if self.found_at[pattern_id] is None:
+            self.found_at[pattern_id] = entry
+            self.found_index[pattern_id] = index
+            if isinstance(pattern := self.patterns[pattern_id], HistoryCommand):
+                self.stop_looking_for(pattern_id, pattern.program)
+
+
+    def feed_run(self, entries: list[HistoryEntry]) -> None:
+        first_index = self.entries_read
+        self.entries_read += len(entries)
+        if not entries:
+            return
+
+        first_entries = self.text_matcher.feed_batch([ entry.command for entry in entries ])
+        for text_id, entry_index in first_entries.items():
+            self.record(self.text_pattern_ids[text_id], entries[entry_index], first_index + entry_index)
+
+        for index, entry in enumerate(entries, start=first_index):
+            if not self.commands_by_program:
+                break
+            matched_ids = []
+            for argv in entry.simple_commands:
+                for pattern_id in self.commands_by_program.get(argv[0], ()):
+                    if self.found_at[pattern_id] is None and self.prerequisite_met(pattern_id, index) and self.patterns[pattern_id].matches(argv):
+                        matched_ids.append(pattern_id)
+            # Record matches only after checking prerequisites, so that an entry can't satisfy its own prerequisite.
+            for pattern_id in matched_ids:
+                self.record(pattern_id, entry, index)
+
+
+    def stop_looking_for(self, pattern_id: int, program: str) -> None:
+        '''
+        Once every HistoryCommand has been found, entries no longer need tokenizing.
+        '''
+        self.commands_by_program[program].remove(pattern_id)
+        if not self.commands_by_program[program]:
+            del self.commands_by_program[program]
+
+
+    def prerequisite_met(self, pattern_id: int, index: int) -> bool:
+        '''
+        Whether pattern_id's prerequisite was found before the index'th entry.
+        '''
+        prerequisite_id = self.prerequisite_ids.get(pattern_id)
+        if prerequisite_id is None:
+            return True
+        found_index = self.found_index[prerequisite_id]
+        return found_index is not None and found_index < index
+
+
+    def feed_entries(self, entries) -> list[HistoryEntry | None]:
+        '''
+        Feeds each entry to the matcher. Returns, for each requirement in order,
+        the first entry which satisfied it, or None.
+        '''
+        for batch in batches(entries):
+            self.feed_batch(batch)
+        return [ self.found_at[self.pattern_id(requirement)] for requirement in self.requirements ]
@@ -1,12 +1,28 @@
 import os
+import time
 import vpltools
+from vpltools.history import HistoryMatcher, parse_history
 
 __unittest = True
 
 class HistorySearcher(vpltools.VPLTestCase):
+    '''
+    Checks that a student's submitted command history contains each of
+    commands_to_find. Elements of commands_to_find may be plain strings
+    (matched as substrings of each command), vpltools.RegexCommand,
+    vpltools.WhitespaceInsensitiveCommand, or vpltools.HistoryCommand (matched
+    against the tokenized commands, optionally in order). All of them are
+    matched in a single, streaming pass over the history file, which may be in
+    bash or zsh format, with or without timestamps.
+
+    Set earliest_timestamp and latest_timestamp (seconds since the epoch) to
+    ignore timestamped commands run outside of the lab.
+    '''
     # __test__ = False
     key_source_files = []
     commands_to_find = []
+    earliest_timestamp: int | None = None
+    latest_timestamp: int | None = None
     ignore_files = [
         "assignment_description.html",
         "tux.png",
@@ -35,21 +51,24 @@ class HistorySearcher(vpltools.VPLTestCase):
         # return
         if len(self.commands_to_find) == 0:
             self.fail(f"Empty list! Please define commands_to_find (list[str])!")
-            
 
-        max_command_len = max(len(command) for command in self.commands_to_find)
-        
+
+        max_command_len = max(len(str(command)) for command in self.commands_to_find)
+
         # cwd = os.getcwd()
         hist_file_path = os.path.join(self.THIS_DIR_NAME, self.student_history_file)
-        with open(hist_file_path, "r") as hist_fo:
-            hist_file_contents = hist_fo.read()
+        matcher = HistoryMatcher(self.commands_to_find, self.earliest_timestamp, self.latest_timestamp)
+        with open(hist_file_path, "r", errors="replace") as hist_fo:
+            first_entries_found = matcher.feed_entries(parse_history(hist_fo))
 
         num_commands_found = 0
-        for command in self.commands_to_find:
-            command_was_found = command in hist_file_contents
+        for command, first_entry in zip(self.commands_to_find, first_entries_found):
+            command_was_found = first_entry is not None
             num_commands_found += 1 if command_was_found else 0
             summary_emoji = self.command_found_emoji[command_was_found]
             summary_line = f"{summary_emoji}  {command}"
+            if command_was_found and first_entry.timestamp is not None:
+                summary_line += time.strftime("  (%Y-%m-%d %H:%M:%S)", time.localtime(first_entry.timestamp))
             print(summary_line)
 
         padding = 5
@@ -60,4 +79,4 @@ class HistorySearcher(vpltools.VPLTestCase):
             self.fail(msg=f"Expected all commands to be run, got {num_commands_found} of {len(self.commands_to_find)}")
 
 if __name__ == "__main__":
-    vpltools.main()
\ No newline at end of file
+    vpltools.main()
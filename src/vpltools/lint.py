@@ -0,0 +1,128 @@
+'''
+lint.py -- the PyLint style check, run in-process, and remembered.
+
+    python3 -m vpltools lint [--enable CHECK,...] [--rcfile FILE] <file.py> ...
+
+The PyLint case in vpl_evaluate.cases runs this, rather than python3 -m pylint.
+Its report is stored with a key made from the checked files, the PyLint
+configuration (the checks enabled, and any pylintrc beside the files) and the
+version of PyLint, so a submission which hasn't changed is rated again without
+importing PyLint at all. With VPLTestCase.pylint_checks, only the checks an
+assignment cares about are enabled, which makes even a new submission quick.
+The grader runs these cases in its own process, through lint_report.
+'''
+import io
+import os
+import sys
+import hashlib
+import argparse
+import threading
+import importlib.metadata
+
+from vpltools.resultstore import ResultStore, cache_dir, hash_paths
+
+__unittest = True
+
+# Configuration files which PyLint reads from the directory it is run in.
+PYLINT_CONFIG_FILES = ("pylintrc", ".pylintrc")
+
+# PyLint keeps its state in globals, so only one thread may run it at once.
+_pylint_lock = threading.Lock()
+
+
+class LintError(RuntimeError):
+    pass
+
+
+def default_lint_store_dir() -> str:
+    return os.path.join(cache_dir(), "pylint")
+
+
+def pylint_version() -> str:
+    try:
+        return importlib.metadata.version("pylint")
+    except importlib.metadata.PackageNotFoundError:
+        raise LintError("PyLint is not installed. Install it with: python3 -m pip install pylint") from None
+
+
+def config_files(root: str, rcfile: str | None) -> list[str]:
+    if rcfile is not None:
+        return [ os.path.join(root, rcfile) ]
+    return [ path for name in PYLINT_CONFIG_FILES if os.path.isfile(path := os.path.join(root, name)) ]
+
+
+def pylint_arguments(file_names: list[str], root: str, checks: list[str] | None, rcfile: str | None) -> list[str]:
+    arguments = [ "--persistent=n", "--score=y" ]
+    if (found := config_files(root, rcfile)):
+        arguments.append(f"--rcfile={found[0]}")
+    if checks:
+        arguments += [ "--disable=all", f"--enable={','.join(checks)}" ]
+    return arguments + [ os.path.join(root, name) for name in file_names ]
+
+
+def lint_key(file_names: list[str], root: str, checks: list[str] | None, rcfile: str | None) -> str:
+    '''
+    Returns a key which changes whenever the files, their configuration, or PyLint change.
+    '''
+    hasher = hashlib.sha256(f"pylint {pylint_version()}\0{','.join(sorted(checks or []))}\0".encode())
+    hash_paths(hasher, [ os.path.join(root, name) for name in file_names ], root)
+    hasher.update(b"\0config\0")
+    hash_paths(hasher, config_files(root, rcfile), root)
+    return hasher.hexdigest()
+
+
+def run_pylint(file_names: list[str], root: str, checks: list[str] | None, rcfile: str | None) -> str:
+    '''
+    Runs PyLint on the files in root, in this process, and returns its report.
+    '''
+    from pylint.lint import Run
+    from pylint.reporters.text import TextReporter
+
+    report = io.StringIO()
+    with _pylint_lock:
+        Run(pylint_arguments(file_names, root, checks, rcfile), reporter=TextReporter(report), exit=False)
+    # Files outside the working directory are reported by their full path.
+    return report.getvalue().replace(os.path.abspath(root) + os.sep, "")
+
+
+def lint_report(file_names: list[str], root: str = ".", checks: list[str] | None = None, rcfile: str | None = None,
+                store: ResultStore | None = None) -> str:
+    '''
+    Returns PyLint's report on file_names, files in root, ending with its rating
+    ("Your code has been rated at ..."). A report stored for the same files and
+    configuration is returned without running PyLint.
+    '''
+    missing = [ name for name in file_names if not os.path.isfile(os.path.join(root, name)) ]
+    if missing:
+        raise LintError(f"Can't check the style of {', '.join(missing)}: not found.")
+
+    store = store or ResultStore(default_lint_store_dir())
+    key = lint_key(file_names, root, checks, rcfile)
+    if (stored := store.get(key)) is not None:
+        return stored["report"]
+    report = run_pylint(file_names, root, checks, rcfile)
+    store.put(key, { "report": report })
+    store.evict()
+    return report
+
+
+def command_report(argv: list[str], root: str = ".") -> str:
+    '''
+    Returns lint_report for the command line arguments of python3 -m vpltools lint,
+    naming files in root.
+    '''
+    parser = argparse.ArgumentParser(prog="python3 -m vpltools lint",
+        description="Check the style of Python files with PyLint, reusing the report on unchanged files.")
+    parser.add_argument("files", nargs="+", help="Python files to check, in the current directory")
+    parser.add_argument("--enable", default="", help="comma separated PyLint checks to enable, and no others")
+    parser.add_argument("--rcfile", default=None, help="PyLint configuration file (default: ./pylintrc, if there is one)")
+    args = parser.parse_args(argv)
+    return lint_report(args.files, root, [ check for check in args.enable.split(",") if check ], args.rcfile)
+
+
+def main(argv: list[str]) -> None:
+    try:
+        report = command_report(argv)
+    except LintError as error:
+        sys.exit(str(error))
+    sys.stdout.write(report)
@@ -3,9 +3,16 @@ Provides functions for automatically generating vpl_evaluate.cases files
 for use with Moodle VPL assignments.
 '''
 import os.path
+import re
 import enum
 
 from math import ceil
+from dataclasses import dataclass
+
+from vpltools.manifest import CasesManifest, write_atomically
+
+# What the record of a passing test contains (see records.py).
+RECORD_PASSED_PATTERN = '"passed": true'
 
 class GradeReduction(enum.Enum):
     AbsoluteReduction = "oneHundred"
@@ -13,39 +20,39 @@ class GradeReduction(enum.Enum):
 
 __unittest = True
 
-def overwrite_file_if_different(file_path: str, new_contents: str, verbose: bool = False) -> bool:
+def overwrite_file_if_different(file_path: str, new_contents: str, verbose: bool = False,
+                                manifest: CasesManifest | None = None) -> bool:
     '''
     Given the path to the existing vpl_evaluate.cases file, and 
     the desired contents of the file, update it if they are different.
+    With a manifest (see manifest.py), a file it wrote, which hasn't been
+    touched since, isn't read back. The file is replaced atomically.
     '''
-    did_write_file = False
-    # Two cases for writing the file:
-    # 1. It doesn't exist.
-    # 2. It's out of date.
     print("Making vpl_evaluate.cases...", end="")
-    try:
-        with open(file_path, 'r') as old_file_object:
-            old_file_contents = old_file_object.read()
-
-        if old_file_contents != new_contents:
-            raise FileNotFoundError
-        
-        if verbose:
-            print("no changes...", end="")
-
-    except FileNotFoundError:
-        with open(file_path, "w") as new_file_object:
-            new_file_object.write(new_contents)
-        
-        did_write_file = True
-    
+    if manifest is not None:
+        did_write_file = manifest.write_if_changed(os.path.basename(file_path), new_contents)
+    else:
+        # Two cases for writing the file:
+        # 1. It doesn't exist.
+        # 2. It's out of date.
+        try:
+            with open(file_path, 'r') as old_file_object:
+                did_write_file = old_file_object.read() != new_contents
+        except FileNotFoundError:
+            did_write_file = True
+        if did_write_file:
+            write_atomically(file_path, new_contents)
+
+    if verbose and not did_write_file:
+        print("no changes...", end="")
     if verbose:
         print("done.")
 
     return did_write_file
 
 
-def python3_case_block(test_method_description: tuple[str, str, str], num_tests: int, grade_reduction: GradeReduction) -> str:
+def python3_case_block(test_method_description: tuple[str, str, str], num_tests: int, grade_reduction: GradeReduction, server_socket: str | None = None,
+                       result_records: bool = False) -> str:
     '''
     Returns a string suitable to write to a vpl_evaluate.cases file
     to invoke a single test method from a VPLTestCase.
@@ -90,30 +97,43 @@ def python3_case_block(test_method_description: tuple[str, str, str], num_tests:
     a VPL module on Moodle. For this reason, we strip all but the last submodule name, so that test 
     methods are referred to by a name which will let VPL find them, instead of using the extra 
     prefixes which will not be available to VPL at runtime.
+
+    If server_socket is given, the test is run by vpltools.client, through the
+    evaluation server listening there (see server.py), rather than by unittest.
+    If result_records is set, the test is run by vpltools.records, and the case
+    passes on its JSON record, rather than on unittest's "OK" (see records.py).
     '''
     penalty = f"{ceil(100/num_tests)}%" if grade_reduction == GradeReduction.LinearReduction else "100%"
 
     module_name, test_class, method_name = test_method_description
     module_name = module_name.split(".")[-1]
+    socket_option = "" if server_socket is None else f" --socket {server_socket}"
+    if result_records:
+        runner, expected_output = f"vpltools.records{socket_option}", "/" + RECORD_PASSED_PATTERN + "/"
+    else:
+        runner, expected_output = "unittest" if server_socket is None else f"vpltools.client{socket_option}", "/.*OK.*/i"
     test_case_format = (f"Case = {method_name}" + "\n"
         f"program to run = /usr/bin/python3"    + "\n"
-        f"program arguments = -m unittest {module_name}.{test_class}.{method_name}" + "\n"
+        f"program arguments = -m {runner} {module_name}.{test_class}.{method_name}" + "\n"
         f"expected exit code = 0\n"
-        f"output = /.*OK.*/i"                   + "\n"
+        f"output = {expected_output}"           + "\n"
         f"grade reduction = {penalty}"  + "\n"
         "\n")
     return test_case_format
 
 
-def pylint_case_block(module_name: str) -> str:
+def pylint_case_block(file_names: list[str], checks: list[str] | None = None) -> str:
     '''
     Returns a string suitable to write to a vpl_evaluate.cases file
-    to invoke pylint on the student's submission.
+    to invoke pylint on the student's submission, through vpltools.lint,
+    which remembers the rating of files it has already checked.
+    checks, if given, are the only PyLint checks enabled.
     '''
+    enable = f" --enable {','.join(checks)}" if checks else ""
     pylint_test_case = (
         f"Case = PyLint Style Check" + "\n"
         f"program to run = /usr/bin/python3" + "\n"
-        f"program arguments = -m pylint {module_name}" + "\n"
+        f"program arguments = -m vpltools lint{enable} {' '.join(file_names)}" + "\n"
         f"output = /.*Your code has been rated at 10.00/10*/i" + "\n"
         f"grade reduction = 0%" + "\n"
     )
@@ -132,23 +152,130 @@ def get_vpl_eval_path(module_path: str) -> str:
         "vpl_evaluate.cases")
 
 
-def make_cases_file_from_list(module_path: str, test_method_list: list[tuple[str, str, str]], include_pylint: bool, verbose: bool, grade_reduction: GradeReduction):
+def make_cases_file_from_list(module_path: str, test_method_list: list[tuple[str, str, str]], include_pylint: bool, verbose: bool, grade_reduction: GradeReduction, server_socket: str | None = None,
+                              pylint_files: list[str] | None = None, pylint_checks: list[str] | None = None,
+                              result_records: bool = False, manifest: CasesManifest | None = None,
+                              test_attributes: dict[tuple[str, str, str], dict] | None = None):
     '''
     Writes or overwrites the vpl_evaluate.cases file located alongside 
     student's module. Writes one "case" block for each element of test_method_list, 
-    and another for pylint, if the flag has been set.
+    and another for pylint, if the flag has been set. The pylint case checks
+    pylint_files (by default, the first test module) with pylint_checks.
+    test_attributes may give the grade_reduction, evaluation_server_socket and
+    result_records of each test's class (see manifest.py), in place of those passed.
     '''
-    all_test_cases_string = ""
-
+    case_blocks = []
     for test_method_description in test_method_list:
-        all_test_cases_string += python3_case_block(test_method_description, len(test_method_list), grade_reduction)
+        attributes = (test_attributes or {}).get(tuple(test_method_description), {})
+        case_blocks.append(python3_case_block(test_method_description, len(test_method_list),
+                                              GradeReduction(attributes.get("grade_reduction", grade_reduction.value)),
+                                              attributes.get("evaluation_server_socket", server_socket),
+                                              attributes.get("result_records", result_records)))
 
     if include_pylint and test_method_list:
-        all_test_cases_string += pylint_case_block(test_method_list[0][0])
+        case_blocks.append(pylint_case_block(pylint_files or [ test_method_list[0][0].split(".")[-1] + ".py" ], pylint_checks))
 
     vpl_eval_path = get_vpl_eval_path(module_path)
-    overwrite_file_if_different(vpl_eval_path, all_test_cases_string, verbose)
+    overwrite_file_if_different(vpl_eval_path, "".join(case_blocks), verbose, manifest)
+
+
+
+@dataclass
+class VPLCase:
+    '''
+    One "case" block read back from a vpl_evaluate.cases file.
+    '''
+    name: str
+    program_to_run: str = ""
+    program_arguments: str = ""
+    expected_exit_code: int | None = None
+    output: str = ""
+    grade_reduction: str = ""
+
+    @property
+    def unittest_id(self) -> str | None:
+        '''
+        Returns module.Class.method if this case runs a single unittest test
+        (with unittest, through an evaluation server, or with vpltools.records),
+        None otherwise.
+        '''
+        arguments = self.program_arguments.split()
+        if arguments[:2] in (["-m", "unittest"], ["-m", "vpltools.records"]) and len(arguments) == 3:
+            return arguments[2]
+        if (arguments[:2] in (["-m", "vpltools.client"], ["-m", "vpltools.records"])
+                and arguments[2:3] == ["--socket"] and len(arguments) == 5):
+            return arguments[4]
+        return None
+
+
+    @property
+    def lint_arguments(self) -> list[str] | None:
+        '''
+        Returns the arguments of python3 -m vpltools lint if this is a PyLint case
+        run through vpltools.lint, None otherwise.
+        '''
+        arguments = self.program_arguments.split()
+        if arguments[:3] == ["-m", "vpltools", "lint"]:
+            return arguments[3:]
+        return None
+
+
+    def output_matches(self, output: str) -> bool:
+        '''
+        Returns True if output satisfies this case's expected output, which
+        is either a /regular expression/flags, or text compared ignoring whitespace.
+        '''
+        if not self.output:
+            return True
+        if (regex := re.fullmatch(r"/(.*)/(i?)", self.output.strip(), re.DOTALL)) is not None:
+            flags = re.IGNORECASE if regex.group(2) else 0
+            return re.search(regex.group(1), output, flags) is not None
+        return self.output.split() == output.split()
+
+
+    def reduction_from(self, max_grade: float, num_cases: int) -> float:
+        '''
+        Returns the number of points lost by failing this case. As in VPL, a case
+        without a grade reduction shares the maximum grade equally with the others.
+        '''
+        if not self.grade_reduction:
+            return max_grade / num_cases
+        if self.grade_reduction.endswith("%"):
+            return max_grade * float(self.grade_reduction[:-1]) / 100
+        return float(self.grade_reduction)
+
+
+def read_cases_file(file_path: str) -> list[VPLCase]:
+    '''
+    Reads a vpl_evaluate.cases file, such as one written by make_cases_file_from_list.
+    Lines without a "key = value" pair continue the value on the line before.
+    '''
+    cases = []
+    last_key = None
+    with open(file_path, "r") as cases_fo:
+        for line in cases_fo:
+            key, separator, value = line.partition("=")
+            key = key.strip().lower().replace(" ", "_")
+            if separator and key == "case":
+                cases.append(VPLCase(value.strip()))
+                last_key = None
+            elif separator and cases and key in VPLCase.__dataclass_fields__:
+                value = value.strip()
+                setattr(cases[-1], key, int(value) if key == "expected_exit_code" else value)
+                last_key = key
+            elif last_key is not None and line.strip():
+                setattr(cases[-1], last_key, getattr(cases[-1], last_key) + "\n" + line.rstrip("\n"))
+    return cases
+
+
+def grade_from_cases(cases: list[VPLCase], passed: list[bool], max_grade: float = 100) -> float:
+    '''
+    Returns the grade VPL would give: the maximum grade, less the reduction
+    for each failed case (passed[i] is the result of cases[i]), and never less than zero.
+    '''
+    reductions = sum(case.reduction_from(max_grade, len(cases)) for case, case_passed in zip(cases, passed) if not case_passed)
+    return max(0.0, max_grade - reductions)
+
 
-        
 if __name__ == '__main__':
     print("make_evaluate_cases_vpl.py: Are you lost? You look lost.")
@@ -0,0 +1,315 @@
+'''
+manifest.py -- remembering which tests each test module defines, so that
+vpl_evaluate.cases can be written without importing every test module again.
+
+VPLTestCase.make_vpl_evaluate_cases lists every test in its directory. Discovering
+them imports every test module there, even when only one test was run. Instead,
+a CasesManifest, kept in ~/.cache/vpltools/manifests, records each module's tests
+as (module, class, method, attributes), with the module's size, modification
+time and hash. The attributes are the settings of the test's class which its
+case depends on (CASE_ATTRIBUTES). A module's tests may also depend on other
+files in its directory: a base class imported from a sibling module, or a
+MatchTable read from a data file. So the same is recorded for every local module
+it imports (directly or not), and for every file in the directory which one of
+them names in a string literal. Only modules which are new, or which have
+changed along with any of those files, are discovered again. The manifest also
+records the hash of each file written from it, so that an unchanged
+vpl_evaluate.cases is neither read back nor rewritten.
+
+A file modified within RACY_MODIFICATION_NS of being recorded might change again
+without its modification time changing, so it is hashed again next time (see
+directory_index.py). Files are written under a temporary name and renamed into
+place, so that an evaluation reading one never sees it half written.
+'''
+import os
+import re
+import ast
+import enum
+import json
+import fnmatch
+import hashlib
+import time
+import tempfile
+import unittest
+
+from vpltools.resultstore import cache_dir, vpltools_version
+from vpltools.session import discover_tests, iterate_tests
+from vpltools.directory_index import RACY_MODIFICATION_NS
+
+__unittest = True
+
+# The test modules unittest discovers, by default.
+TEST_MODULE_PATTERN = "test*.py"
+VALID_MODULE_NAME = re.compile(r"[_a-z]\w*\.py$", re.IGNORECASE)
+
+# The settings of a test's class which its case in vpl_evaluate.cases depends on (see make_vpl_evaluate_cases.py).
+CASE_ATTRIBUTES = ("grade_reduction", "evaluation_server_socket", "result_records")
+
+
+def case_attributes(test: unittest.TestCase) -> dict:
+    '''
+    Returns those of CASE_ATTRIBUTES which test's class has, as recorded in a manifest.
+    '''
+    attributes = {}
+    for name in CASE_ATTRIBUTES:
+        if hasattr(type(test), name):
+            value = getattr(type(test), name)
+            attributes[name] = value.value if isinstance(value, enum.Enum) else value
+    return attributes
+
+
+def imported_and_named(source: str) -> tuple[set[str], set[str]]:
+    '''
+    Returns the top level names of the modules imported by source (those of
+    relative imports included), and the strings it contains.
+    '''
+    modules, strings = set(), set()
+    for node in ast.walk(ast.parse(source)):
+        if isinstance(node, ast.Import):
+            modules.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            if node.module is not None:
+                modules.add(node.module.split(".")[0])
+            elif node.level:
+                modules.update(alias.name for alias in node.names) # from . import sibling
+        elif isinstance(node, ast.Constant) and isinstance(node.value, str) and "\n" not in node.value:
+            strings.add(os.path.basename(node.value))
+    return modules, strings
+
+
+def default_manifest_dir() -> str:
+    return os.path.join(cache_dir(), "manifests")
+
+
+def content_hash(contents: str | bytes) -> str:
+    return hashlib.sha256(contents.encode() if isinstance(contents, str) else contents).hexdigest()
+
+
+def write_atomically(file_path: str, contents: str) -> None:
+    '''
+    Replaces the file at file_path with contents, keeping its permissions if it exists.
+    '''
+    try:
+        mode = os.stat(file_path).st_mode & 0o777
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        mode = 0o666 & ~umask
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(file_path) or ".", prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(file_descriptor, "w") as file_fo:
+            file_fo.write(contents)
+        os.chmod(temporary_path, mode)
+        os.replace(temporary_path, file_path)
+    except:
+        os.unlink(temporary_path)
+        raise
+
+
+def file_stamp(file_path: str) -> list[int] | None:
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+    return [ stat.st_mtime_ns, stat.st_size ]
+
+
+def trustworthy_stamp(file_path: str) -> list[int] | None:
+    '''
+    Returns the stamp to record for file_path: None if it was modified too recently to be trusted.
+    '''
+    stamp = file_stamp(file_path)
+    if stamp is None or time.time_ns() - stamp[0] <= RACY_MODIFICATION_NS:
+        return None
+    return stamp
+
+
+_manifests: dict[str, "CasesManifest"] = {}
+
+
+def get_manifest(directory: str) -> "CasesManifest":
+    '''
+    Returns the manifest of directory, reading it the first time it is asked for.
+    '''
+    directory = os.path.abspath(directory)
+    if directory not in _manifests:
+        _manifests[directory] = CasesManifest(directory)
+    return _manifests[directory]
+
+
+class CasesManifest:
+    '''
+    The tests defined by the modules in directory, and the files written from them,
+    as recorded by earlier runs. Nothing recorded by another version of vpltools is used.
+    '''
+    def __init__(self, directory: str, manifest_dir: str | None = None):
+        self.directory = os.path.abspath(directory)
+        self.path = os.path.join(manifest_dir or default_manifest_dir(), content_hash(self.directory) + ".json")
+        self.modules: dict[str, dict] = {}
+        self.files: dict[str, dict] = {}
+        # CASE_ATTRIBUTES of each test listed, by (module, class, method).
+        self.attributes: dict[tuple[str, str, str], dict] = {}
+        self.changed = False
+        try:
+            with open(self.path, "r") as manifest_fo:
+                saved = json.load(manifest_fo)
+        except (OSError, ValueError):
+            return
+        if saved.get("vpltools") == vpltools_version() and saved.get("directory") == self.directory:
+            self.modules, self.files = saved["modules"], saved["files"]
+
+
+    def test_module_names(self) -> list[str] | None:
+        '''
+        Returns the names of the test modules in directory, in the order unittest
+        discovers them, or None if directory has packages of tests, which unittest
+        would search too.
+        '''
+        names = []
+        for entry in sorted(os.scandir(self.directory), key=lambda entry: entry.name):
+            if entry.is_dir():
+                if os.path.isfile(os.path.join(entry.path, "__init__.py")):
+                    return None
+            elif fnmatch.fnmatch(entry.name, TEST_MODULE_PATTERN) and VALID_MODULE_NAME.match(entry.name):
+                names.append(entry.name)
+        return names
+
+
+    def file_record(self, file_name: str) -> dict:
+        file_path = os.path.join(self.directory, file_name)
+        stamp = trustworthy_stamp(file_path)
+        try:
+            with open(file_path, "rb") as file_fo:
+                digest = content_hash(file_fo.read())
+        except FileNotFoundError:
+            digest = None
+        return { "stamp": stamp, "hash": digest }
+
+
+    def unchanged(self, records: dict[str, dict]) -> bool:
+        '''
+        Returns whether every file in records is as recorded. The stamps of
+        files which were touched, but not changed, are recorded again.
+        '''
+        for file_name, record in records.items():
+            if record["stamp"] is not None and record["stamp"] == file_stamp(os.path.join(self.directory, file_name)):
+                continue
+            now = self.file_record(file_name)
+            if now["hash"] != record["hash"]:
+                return False
+            if now["stamp"] != record["stamp"]:
+                record["stamp"] = now["stamp"]
+                self.changed = True
+        return True
+
+
+    def local_dependencies(self, file_name: str) -> list[str]:
+        '''
+        Returns the files in directory which the module file_name depends on: the
+        local modules it imports, directly or through one another, and the files
+        any of them name in a string literal (e.g. a table of rows to test).
+        '''
+        local_files = { entry.name for entry in os.scandir(self.directory) if entry.is_file() }
+        local_files -= set(self.files) # Written from the manifest, not read by tests.
+        dependencies = []
+        modules_to_read = [ file_name ]
+        while modules_to_read:
+            try:
+                with open(os.path.join(self.directory, modules_to_read.pop()), "rb") as module_fo:
+                    modules, strings = imported_and_named(module_fo.read())
+            except (OSError, SyntaxError, ValueError):
+                continue # Discovery will report it, if it is a test module.
+            for name in sorted({ module + ".py" for module in modules } | strings):
+                if name in local_files and name != file_name and name not in dependencies:
+                    dependencies.append(name)
+                    if name.endswith(".py") and name[:-3] in modules:
+                        modules_to_read.append(name)
+        return sorted(dependencies)
+
+
+    def recorded_tests(self, entry: dict) -> list[tuple[str, str, str]]:
+        tests = []
+        for module, class_name, method, attributes in entry["tests"]:
+            tests.append((module, class_name, method))
+            self.attributes[tests[-1]] = attributes
+        return tests
+
+
+    def module_tests(self, file_name: str) -> list[tuple[str, str, str]]:
+        '''
+        Returns the tests defined by the module file_name, as recorded if neither
+        it nor any of its dependencies have changed, or as discovered now, and
+        recorded, if they have.
+        '''
+        entry = self.modules.get(file_name)
+        if entry is not None and "files" in entry and self.unchanged(entry["files"]):
+            return self.recorded_tests(entry)
+
+        # Recorded before discovery, so that a change made meanwhile is seen next time.
+        files = { name: self.file_record(name) for name in [ file_name ] + self.local_dependencies(file_name) }
+        discovered = list(iterate_tests(discover_tests(self.directory, pattern=file_name)))
+        entry = { "files": files, "tests": [ [ test.__module__.split(".")[-1], type(test).__name__, test._testMethodName, case_attributes(test) ]
+                                            for test in discovered ] }
+        # A module which failed to import is discovered again next time.
+        if not any(isinstance(test, unittest.loader._FailedTest) for test in discovered):
+            self.modules[file_name] = entry
+            self.changed = True
+        return self.recorded_tests(entry)
+
+
+    def test_tuples(self) -> list[tuple[str, str, str]] | None:
+        '''
+        Returns (module, class, method) for every test in directory, in the order
+        unittest would discover them, or None if the manifest can't list them.
+        '''
+        names = self.test_module_names()
+        if names is None:
+            return None
+        for file_name in set(self.modules) - set(names):
+            del self.modules[file_name]
+            self.changed = True
+        return [ test for file_name in names for test in self.module_tests(file_name) ]
+
+
+    def write_if_changed(self, file_name: str, contents: str) -> bool:
+        '''
+        Writes contents to file_name in directory, unless it already holds them,
+        and returns whether it was written. A file which hasn't been touched since
+        it was last written from the manifest isn't even read.
+        '''
+        file_path = os.path.join(self.directory, file_name)
+        digest = content_hash(contents)
+        recorded = self.files.get(file_name)
+        if recorded is not None and recorded["stamp"] is not None and recorded["stamp"] == file_stamp(file_path):
+            existing = recorded["hash"]
+        else:
+            try:
+                with open(file_path, "rb") as file_fo:
+                    existing = content_hash(file_fo.read())
+            except FileNotFoundError:
+                existing = None
+
+        written = existing != digest
+        if written:
+            write_atomically(file_path, contents)
+        stamp = trustworthy_stamp(file_path)
+        if recorded != { "stamp": stamp, "hash": digest }:
+            self.files[file_name] = { "stamp": stamp, "hash": digest }
+            self.changed = True
+        return written
+
+
+    def save(self) -> None:
+        '''
+        Writes the manifest, if anything in it has changed.
+        '''
+        if not self.changed:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        write_atomically(self.path, json.dumps({
+            "vpltools" : vpltools_version(),
+            "directory": self.directory,
+            "modules"  : self.modules,
+            "files"    : self.files,
+        }))
+        self.changed = False
@@ -0,0 +1,366 @@
+'''
+multipattern.py -- single-pass matching of many patterns against a stream of lines.
+
+HistorySearcher needs to know which of (possibly hundreds of) required commands
+appear in a (possibly very long) history file. Checking each command with
+"command in contents" scans the whole file once per command. Instead, all
+patterns are compiled into one MultiPatternMatcher, and the file is fed through
+it once, a batch of lines at a time.
+
+Three kinds of pattern are supported:
+- plain strings, matched as substrings (the original HistorySearcher behaviour),
+  including across line breaks,
+- WhitespaceInsensitiveCommand, matched as substrings after runs of whitespace
+  have been collapsed to a single space, in both the pattern and the text,
+- RegexCommand, matched with re.search against each line.
+'''
+import re
+from bisect import bisect_right
+from collections import deque
+from dataclasses import dataclass
+from itertools import accumulate, islice
+
+__unittest = True
+
+# Lines scanned at once. Scanning a batch costs one call, whatever its length.
+BATCH_LINES = 1024
+
+def batches(iterable, size: int = BATCH_LINES):
+    '''
+    Yields lists of up to size consecutive items of iterable.
+    '''
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+@dataclass(frozen=True)
+class RegexCommand:
+    '''
+    A required command, expressed as a regular expression. Matches a line of
+    history if re.search finds the pattern anywhere in it.
+    '''
+    pattern: str
+    flags: int = 0
+
+    def __str__(self):
+        return f"/{self.pattern}/"
+
+
+@dataclass(frozen=True)
+class WhitespaceInsensitiveCommand:
+    '''
+    A required command which should match regardless of the amount of
+    whitespace between its words; e.g. "ls   -l" matches "ls -l".
+    '''
+    command: str
+
+    def __str__(self):
+        return self.command
+
+
+WHITESPACE_RUN = re.compile(r"\s+")
+
+def normalize_whitespace(text: str) -> str:
+    '''
+    Collapses every run of whitespace to a single space, and strips both ends.
+    '''
+    return WHITESPACE_RUN.sub(" ", text).strip()
+
+
+class AhoCorasickAutomaton:
+    '''
+    A classic Aho-Corasick automaton over str. Patterns are identified by the
+    integer passed to add_pattern(). Call build() once after adding all patterns,
+    then search() or scan() as often as required.
+    '''
+    def __init__(self):
+        self.goto: list[dict[str, int]] = [{}]
+        self.fail: list[int] = [0]
+        self.output: list[list[int]] = [[]]
+        self.is_built = False
+
+
+    def add_pattern(self, pattern: str, pattern_id: int) -> None:
+        if self.is_built:
+            raise RuntimeError("Cannot add patterns to an automaton which has already been built.")
+
+        state = 0
+        for char in pattern:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][char] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            state = next_state
+        self.output[state].append(pattern_id)
+
+
+    def build(self) -> None:
+        '''
+        Computes failure links breadth first, merging the outputs of each state
+        with those of the state its failure link points to. Then follows the
+        failure links ahead of time, so that scanning a character is one lookup.
+        '''
+        self.delta: list[dict[str, int]] = [dict(self.goto[0])] + [{} for _ in self.goto[1:]]
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            self.delta[state] = self.delta[self.fail[state]] | self.goto[state]
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+        self.states_by_pattern: dict[int, list[int]] = {}
+        for state, pattern_ids in enumerate(self.output):
+            for pattern_id in pattern_ids:
+                self.states_by_pattern.setdefault(pattern_id, []).append(state)
+        self.is_built = True
+
+
+    def discard_pattern(self, pattern_id: int) -> None:
+        '''
+        Stops reporting pattern_id, e.g. once it has been found, so that scanning
+        text which contains only known patterns is as fast as scanning text
+        which contains none.
+        '''
+        for state in self.states_by_pattern.pop(pattern_id, ()):
+            self.output[state] = [ i for i in self.output[state] if i != pattern_id ]
+
+
+    def scan(self, text: str, state: int = 0) -> tuple[int, list[tuple[int, list[int]]]]:
+        '''
+        Feeds text to the automaton, starting in state (0 for the start of a
+        stream). Returns the state to continue the stream from, and a list of
+        (index in text, pattern ids) for each character where patterns end.
+        '''
+        hits = []
+        delta, output = self.delta, self.output
+        for index, char in enumerate(text):
+            state = delta[state].get(char, 0)
+            if output[state]:
+                hits.append((index, output[state]))
+        return state, hits
+
+
+    def search(self, text: str) -> set[int]:
+        '''
+        Returns the ids of all patterns occurring anywhere in text.
+        '''
+        found = set(self.output[0]) # The empty pattern matches everything.
+        for _, pattern_ids in self.scan(text)[1]:
+            found.update(pattern_ids)
+        return found
+
+
+INLINE_FLAGS = { re.IGNORECASE: "i", re.MULTILINE: "m", re.DOTALL: "s", re.VERBOSE: "x", re.ASCII: "a" }
+
+def group_for_regex(pattern_id: int, regex: RegexCommand) -> str:
+    '''
+    Returns regex as a named group which can be alternated with others, its
+    flags scoped to the group; e.g. (?P<p3>(?i:ls)).
+    '''
+    letters = "".join(letter for flag, letter in INLINE_FLAGS.items() if regex.flags & flag)
+    if not letters:
+        return f"(?P<p{pattern_id}>(?:{regex.pattern}))"
+    # A verbose pattern may end in a comment, which would swallow the closing parenthesis.
+    end = "\n" if regex.flags & re.VERBOSE else ""
+    return f"(?P<p{pattern_id}>(?{letters}:{regex.pattern}{end}))"
+
+
+class MultiPatternMatcher:
+    '''
+    Matches a list of patterns (see the module docstring for the types accepted)
+    against a stream of lines in a single pass, remembering which patterns
+    were found, and in which line.
+
+    Plain and whitespace insensitive patterns share one AhoCorasickAutomaton,
+    which reads the stream once, with whitespace collapsed and each line break
+    read as a space. A plain pattern can only occur where its collapsed form
+    does, so each candidate the automaton reports is confirmed with str.find
+    around that line. Regular expressions without groups are alternated into
+    one compiled pattern, and the rest tried one by one. Every pattern stops
+    being looked for once found.
+    '''
+    def __init__(self, patterns: list):
+        self.patterns = list(patterns)
+        self.found = [False] * len(self.patterns)
+        self.automaton = AhoCorasickAutomaton()
+        self.normalized_ids: set[int] = set()
+        self.pending_automaton_ids: set[int] = set()
+        self.pending_regexes: dict[int, re.Pattern] = {}
+        self.grouped_regexes: dict[int, str] = {}
+
+        for pattern_id, pattern in enumerate(self.patterns):
+            if isinstance(pattern, RegexCommand):
+                self.add_regex(pattern_id, pattern)
+            elif isinstance(pattern, WhitespaceInsensitiveCommand):
+                self.automaton.add_pattern(normalize_whitespace(pattern.command), pattern_id)
+                self.normalized_ids.add(pattern_id)
+                self.pending_automaton_ids.add(pattern_id)
+            elif isinstance(pattern, str):
+                # Not stripped: the whitespace at either end of the pattern must be in the text too.
+                self.automaton.add_pattern(WHITESPACE_RUN.sub(" ", pattern), pattern_id)
+                self.pending_automaton_ids.add(pattern_id)
+            else:
+                raise TypeError(f"Unsupported pattern {pattern!r} of type {type(pattern)}. "
+                                + "Use str, RegexCommand, or WhitespaceInsensitiveCommand.")
+        self.automaton.build()
+        self.combined_regex = self.combine_regexes()
+
+        # Enough of the raw stream to confirm any plain pattern which began in an earlier batch.
+        self.raw_tail_length = 2 * max((len(pattern) for pattern in self.patterns if isinstance(pattern, str)), default=0)
+        self.break_stream()
+
+
+    def add_regex(self, pattern_id: int, regex: RegexCommand) -> None:
+        '''
+        Compiles regex, and keeps it aside to be alternated with the others if
+        it can be: its own groups would be renumbered, and flags such as (?i)
+        are only allowed at the start of the whole expression.
+        '''
+        compiled = re.compile(regex.pattern, regex.flags)
+        if compiled.groups == 0:
+            group = group_for_regex(pattern_id, regex)
+            try:
+                re.compile(group)
+                self.grouped_regexes[pattern_id] = group
+                return
+            except re.error:
+                pass
+        self.pending_regexes[pattern_id] = compiled
+
+
+    def combine_regexes(self) -> re.Pattern | None:
+        if not self.grouped_regexes:
+            return None
+        return re.compile("|".join(self.grouped_regexes.values()))
+
+
+    def break_stream(self) -> None:
+        '''
+        Starts a new stream, so that no pattern matches across the break; e.g.
+        around lines which the caller skips.
+        '''
+        self.state = 0
+        self.at_start = True
+        self.raw_tail = ""
+        # Plain patterns ending in whitespace, which were cut off by the end of the last batch.
+        self.unconfirmed_ids: set[int] = set()
+
+
+    def collapse(self, lines: list[str]) -> tuple[str, list[int]]:
+        '''
+        Returns lines as they continue the collapsed stream, in which every run
+        of whitespace, including line breaks, reads as a single space; and the
+        index in it at which each line ends.
+        '''
+        pieces = []
+        for line in lines:
+            if "  " in line or not line.isprintable():
+                piece = WHITESPACE_RUN.sub(" ", line).strip(" ")
+            else:
+                piece = line.strip(" ")
+            pieces.append(piece + " " if piece else "")
+        if self.at_start and lines and (not lines[0] or lines[0][0].isspace()):
+            pieces[0] = " " + pieces[0]
+        self.at_start = False
+        return "".join(pieces), list(accumulate(map(len, pieces)))
+
+
+    def confirm(self, pattern: str, raw_text: str, raw_ends: list[int], first_line: int, last_line: int) -> int | None:
+        '''
+        Returns the index of the line in which pattern ends, if it occurs in
+        raw_text between lines first_line and last_line: the line in which the
+        automaton found its collapsed form, and the end of the whitespace
+        which follows it.
+        '''
+        line_start = raw_ends[first_line - 1] if first_line else len(self.raw_tail)
+        position = raw_text.find(pattern, max(0, line_start - len(pattern)), raw_ends[last_line])
+        if position < 0:
+            return None
+        return bisect_right(raw_ends, position + len(pattern) - 1)
+
+
+    def scan_batch(self, lines: list[str], first_lines: dict[int, int]) -> None:
+        text, ends = self.collapse(lines)
+        self.state, hits = self.automaton.scan(text, self.state)
+        # Index -1 stands for the start of the batch, before the first line's collapsed text (if any).
+        if self.unconfirmed_ids:
+            hits.insert(0, (-1, list(self.unconfirmed_ids)))
+            self.unconfirmed_ids = set()
+        if self.automaton.output[0]:
+            hits.insert(0, (-1, self.automaton.output[0])) # Empty patterns, found even in a blank line.
+
+        raw_text = self.raw_tail + "\n".join(lines) + "\n"
+        raw_ends = list(accumulate((len(line) + 1 for line in lines), initial=len(self.raw_tail)))[1:]
+        for index, pattern_ids in hits:
+            for pattern_id in pattern_ids:
+                if pattern_id not in self.pending_automaton_ids:
+                    continue
+                line_index = min(bisect_right(ends, index), len(lines) - 1)
+                if pattern_id not in self.normalized_ids:
+                    # The collapsed form of a plain pattern which ends in whitespace may stand for any of the
+                    # blank lines after line_index, up to the indentation of the next line which isn't blank.
+                    pattern = self.patterns[pattern_id]
+                    next_line = bisect_right(ends, ends[line_index])
+                    line_index = self.confirm(pattern, raw_text, raw_ends, line_index, min(next_line, len(lines) - 1))
+                    if line_index is None:
+                        if next_line == len(lines) and pattern[-1:].isspace():
+                            self.unconfirmed_ids.add(pattern_id)
+                        continue
+                first_lines[pattern_id] = line_index
+                self.pending_automaton_ids.discard(pattern_id)
+                self.automaton.discard_pattern(pattern_id)
+        self.raw_tail = raw_text[-self.raw_tail_length:] if self.raw_tail_length else ""
+
+
+    def feed_batch(self, lines: list[str]) -> dict[int, int]:
+        '''
+        Feeds a batch of consecutive lines to the matcher. Returns, for each
+        pattern first found in them, the index of the line in which it ends.
+        '''
+        first_lines: dict[int, int] = {}
+        if not lines:
+            return first_lines
+        if self.pending_automaton_ids:
+            self.scan_batch(lines, first_lines)
+
+        for line_index, line in enumerate(lines if self.combined_regex is not None or self.pending_regexes else ()):
+            while self.combined_regex is not None and (match := self.combined_regex.search(line)) is not None:
+                pattern_id = int(match.lastgroup[1:])
+                first_lines[pattern_id] = line_index
+                del self.grouped_regexes[pattern_id]
+                self.combined_regex = self.combine_regexes()
+
+            for pattern_id, regex in list(self.pending_regexes.items()):
+                if regex.search(line) is not None:
+                    first_lines[pattern_id] = line_index
+                    del self.pending_regexes[pattern_id]
+
+        for pattern_id in first_lines:
+            self.found[pattern_id] = True
+        return first_lines
+
+
+    def feed_line(self, line: str) -> set[int]:
+        '''
+        Records every pattern which occurs in line, or ends in it having started
+        on an earlier line. Returns the ids of the patterns first found in line.
+        '''
+        return set(self.feed_batch([line]))
+
+
+    def feed_lines(self, lines) -> list[bool]:
+        '''
+        Feeds each line of an iterable (e.g. an open file) to the matcher.
+        Returns the list of found flags, in the order the patterns were given.
+        '''
+        for batch in batches(lines):
+            self.feed_batch([ line.rstrip("\n") for line in batch ])
+        return self.found
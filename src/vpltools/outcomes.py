@@ -0,0 +1,247 @@
+'''
+outcomes.py -- recording the outcome of every test in a unittest run, in a form
+which can be written to disk and read back by another process.
+'''
+import re
+import json
+import time
+import unittest
+from dataclasses import dataclass, field, asdict, replace
+
+__unittest = True
+
+# unittest prints "OK" for each of these, so each satisfies a VPL case's /.*OK.*/i.
+PASSING_STATUSES = ("pass", "skip", "expected_failure")
+
+# Describes errors raised outside a test method, e.g. "setUpClass (test_module.TestClass)".
+FIXTURE_ERROR_DESCRIPTION = re.compile(r"^(\w+) \((.+)\)$")
+
+# How many of the costliest calls (see calls.py) a summary shows.
+COSTLIEST_CALLS_SHOWN = 3
+
+# How each status is shown as tests finish, and in a summary, as unittest shows them.
+PROGRESS_MARKS = {
+    "pass"              : (".", "ok"),
+    "fail"              : ("F", "FAIL"),
+    "error"             : ("E", "ERROR"),
+    "skip"              : ("s", "skipped"),
+    "expected_failure"  : ("x", "expected failure"),
+    "unexpected_success": ("u", "unexpected success"),
+}
+
+
+@dataclass
+class TestOutcome:
+    '''
+    The outcome of a single test method, identified by module.Class.method,
+    and anything it printed, where that was captured. calls holds what each
+    call made with VPLTestCase.call_student or call_key cost, as a dict of
+    calls.CallUsage fields. reused is set on an outcome recorded by an earlier
+    run, and reused because nothing the test depends on has changed. Where the
+    test was run by a TestWorker (see runner.py), cpu_seconds is the CPU time it
+    used, with any programs it ran, and max_rss the peak resident memory, in
+    bytes, of the process which ran it (or of the largest of its programs).
+    '''
+    test_id: str
+    status: str
+    message: str = ""
+    duration: float = 0.0
+    output: str = ""
+    calls: list[dict] = field(default_factory=list)
+    reused: bool = False
+    cpu_seconds: float | None = None
+    max_rss: int | None = None
+
+    @property
+    def passed(self) -> bool:
+        return self.status in PASSING_STATUSES
+
+
+class RecordingTestResult(unittest.TestResult):
+    '''
+    A TestResult which records a TestOutcome for each test, and the error
+    messages of any failing setUpClass, tearDownClass, setUpModule or
+    tearDownModule, keyed by the class or module which raised them.
+    '''
+    def __init__(self, stream=None, descriptions=None, verbosity=0):
+        super().__init__(stream, descriptions, verbosity)
+        self.outcomes: dict[str, TestOutcome] = {}
+        self.fixture_errors: dict[str, str] = {}
+        self.start_times: dict[str, float] = {}
+
+
+    def startTest(self, test):
+        super().startTest(test)
+        self.start_times[test.id()] = time.perf_counter()
+
+
+    def record(self, test, status: str, message: str = "") -> None:
+        if not isinstance(test, unittest.TestCase):
+            # An _ErrorHolder, standing in for a class or module fixture.
+            match = FIXTURE_ERROR_DESCRIPTION.match(str(test))
+            scope = match.group(2) if match else str(test)
+            self.fixture_errors[scope] = self.fixture_errors.get(scope, "") + message
+            return
+
+        test_id = test.id()
+        if test_id in self.outcomes:
+            # Subtests may fail several times before the test itself finishes.
+            self.outcomes[test_id].message += message
+            return
+
+        started = self.start_times.pop(test_id, time.perf_counter())
+        self.outcomes[test_id] = TestOutcome(test_id, status, message, time.perf_counter() - started,
+                                             calls=list(getattr(test, "call_usages", [])))
+
+
+    def addSuccess(self, test):
+        super().addSuccess(test)
+        self.record(test, "pass")
+
+    def addFailure(self, test, err):
+        super().addFailure(test, err)
+        self.record(test, "fail", self._exc_info_to_string(err, test))
+
+    def addError(self, test, err):
+        super().addError(test, err)
+        self.record(test, "error", self._exc_info_to_string(err, test))
+
+    def addSkip(self, test, reason):
+        super().addSkip(test, reason)
+        self.record(test, "skip", reason)
+
+    def addExpectedFailure(self, test, err):
+        super().addExpectedFailure(test, err)
+        self.record(test, "expected_failure")
+
+    def addUnexpectedSuccess(self, test):
+        super().addUnexpectedSuccess(test)
+        self.record(test, "unexpected_success")
+
+    def addSubTest(self, test, subtest, err):
+        super().addSubTest(test, subtest, err)
+        if err is not None:
+            status = "fail" if issubclass(err[0], test.failureException) else "error"
+            self.record(test, status, self._exc_info_to_string(err, test))
+
+
+    def outcome_of(self, test_id: str) -> TestOutcome:
+        '''
+        Returns the outcome of test_id, as VPL would see it if the test were run
+        on its own: a failing class or module fixture fails every test it contains.
+        '''
+        class_id = test_id.rsplit(".", 1)[0]
+        module_id = class_id.rsplit(".", 1)[0]
+        fixture_error = self.fixture_errors.get(class_id, "") + self.fixture_errors.get(module_id, "")
+        outcome = self.outcomes.get(test_id, TestOutcome(test_id, "error", "The test did not run.\n"))
+        if fixture_error:
+            return replace(outcome, status="error", message=outcome.message + fixture_error)
+        return outcome
+
+
+@dataclass
+class RunReport:
+    '''
+    The outcome of every test in a run, in the order the tests were loaded, and
+    how they were scheduled. Like a unittest.TestResult, it has testsRun, skipped
+    and wasSuccessful(), so that unittest.main can decide its exit status from it.
+    '''
+    outcomes: list[TestOutcome]
+    elapsed: float
+    jobs: int
+    schedule: str = ""
+
+    @property
+    def testsRun(self) -> int:
+        return len(self.outcomes)
+
+    @property
+    def skipped(self) -> list[TestOutcome]:
+        return [ outcome for outcome in self.outcomes if outcome.status == "skip" ]
+
+    def wasSuccessful(self) -> bool:
+        return all(outcome.passed for outcome in self.outcomes)
+
+
+    def write_summary(self, stream) -> None:
+        '''
+        Writes the failures and errors, then a summary, as unittest.TextTestRunner would.
+        '''
+        for outcome in self.outcomes:
+            if outcome.status in ("fail", "error"):
+                stream.write("=" * 70 + "\n")
+                stream.write(f"{PROGRESS_MARKS[outcome.status][1]}: {describe(outcome.test_id)}\n")
+                stream.write("-" * 70 + "\n")
+                stream.write(outcome.message)
+                if outcome.output:
+                    stream.write(f"\nOutput:\n{outcome.output}")
+                stream.write("\n")
+
+        stream.write("-" * 70 + "\n")
+        plural = "" if self.testsRun == 1 else "s"
+        workers = f", with {self.jobs} workers" if self.jobs > 1 else ""
+        stream.write(f"Ran {self.testsRun} test{plural} in {self.elapsed:.3f}s{workers}\n")
+        if self.schedule:
+            stream.write(f"Scheduled {self.schedule}\n")
+        if (num_reused := sum(outcome.reused for outcome in self.outcomes)):
+            stream.write(f"Reused {num_reused} of {self.testsRun} outcomes, from earlier runs of unchanged tests"
+                         " (--rerun runs every test)\n")
+        self.write_costliest_calls(stream)
+        stream.write("\n")
+
+        counts = { status: sum(outcome.status == status for outcome in self.outcomes) for status in PROGRESS_MARKS }
+        details = [ f"{name}={counts[status]}" for status, name in (
+            ("fail", "failures"), ("error", "errors"), ("skip", "skipped"),
+            ("expected_failure", "expected failures"), ("unexpected_success", "unexpected successes"),
+        ) if counts[status] ]
+        stream.write(("OK" if self.wasSuccessful() else "FAILED")
+                     + (f" ({', '.join(details)})" if details else "") + "\n")
+        stream.flush()
+
+
+    def write_costliest_calls(self, stream) -> None:
+        calls = [ (usage, outcome.test_id) for outcome in self.outcomes for usage in outcome.calls ]
+        if not calls:
+            return
+        calls.sort(key=lambda call: -call[0]["wall_seconds"])
+        stream.write(f"Slowest of {len(calls)} measured call{'' if len(calls) == 1 else 's'}:\n")
+        for usage, test_id in calls[:COSTLIEST_CALLS_SHOWN]:
+            cpu = "?" if usage["cpu_seconds"] is None else f"{usage['cpu_seconds']:.3f}s"
+            peak = "?" if usage["peak_memory"] is None else f"{usage['peak_memory'] / 1024:.0f} KiB"
+            stream.write(f"  {usage['wall_seconds']:.3f}s wall, {cpu} CPU, {peak} peak: {usage['call']}, in {describe(test_id)}\n")
+
+
+def describe(test_id: str) -> str:
+    return f"{test_id.rsplit('.', 1)[-1]} ({test_id})"
+
+
+def run_tests(suite: unittest.TestSuite) -> RecordingTestResult:
+    '''
+    Runs suite, capturing anything printed by the tests, and returns the result.
+    '''
+    result = RecordingTestResult()
+    result.buffer = True
+    suite.run(result)
+    return result
+
+
+def write_outcomes(result: RecordingTestResult, file_path: str) -> None:
+    with open(file_path, "w") as outcomes_fo:
+        json.dump({
+            "outcomes"      : [ asdict(outcome) for outcome in result.outcomes.values() ],
+            "fixture_errors": result.fixture_errors,
+        }, outcomes_fo)
+
+
+def read_outcomes(file_path: str) -> RecordingTestResult:
+    '''
+    Reads a file written by write_outcomes, returning a result which can
+    answer outcome_of() just as the original did.
+    '''
+    with open(file_path, "r") as outcomes_fo:
+        saved = json.load(outcomes_fo)
+
+    result = RecordingTestResult()
+    result.outcomes = { outcome["test_id"]: TestOutcome(**outcome) for outcome in saved["outcomes"] }
+    result.fixture_errors = saved["fixture_errors"]
+    return result
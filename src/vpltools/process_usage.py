@@ -0,0 +1,125 @@
+'''
+process_usage.py -- running a program in a subprocess, and measuring what it cost.
+
+subprocess.run waits for its process without keeping the process's resource usage.
+run_measured waits for it with os.wait4 instead, which returns the CPU time and
+peak resident memory of that process alone, even while other programs run
+alongside it. VPLTestCase.run_student_program and run_key_program use it when
+called with measure_usage=True, and assertUsageLike compares the two.
+'''
+import os
+import time
+import resource
+import contextlib
+import threading
+import subprocess
+from dataclasses import dataclass
+
+__unittest = True
+
+
+@dataclass
+class ProcessUsage:
+    '''
+    What one run of a program cost. max_rss is its peak resident memory, in bytes.
+    '''
+    user_seconds: float
+    system_seconds: float
+    max_rss: int
+    wall_seconds: float
+
+    @property
+    def cpu_seconds(self) -> float:
+        return self.user_seconds + self.system_seconds
+
+
+class MeasuredProcess(subprocess.CompletedProcess):
+    '''
+    A CompletedProcess, with the ProcessUsage of its run.
+    '''
+    def __init__(self, args, returncode: int, stdout, stderr, usage: ProcessUsage):
+        super().__init__(args, returncode, stdout, stderr)
+        self.usage = usage
+
+
+def usage_so_far() -> ProcessUsage:
+    '''
+    Returns what this process, and the children it has waited for, have cost so far.
+    max_rss is the larger of its peak and its largest child's; wall_seconds is 0.
+    '''
+    own, children = resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN)
+    return ProcessUsage(own.ru_utime + children.ru_utime, own.ru_stime + children.ru_stime,
+                        max(own.ru_maxrss, children.ru_maxrss) * 1024, 0.0)
+
+
+def run_measured(command: list[str], input=None, timeout: float | None = None, capture_output: bool = False,
+                 check: bool = False, **popen_kwargs) -> MeasuredProcess:
+    '''
+    Runs command as subprocess.run does, taking the same arguments, and returns a
+    MeasuredProcess. Raises subprocess.TimeoutExpired if it runs past timeout seconds.
+    '''
+    if capture_output:
+        popen_kwargs["stdout"] = popen_kwargs["stderr"] = subprocess.PIPE
+    if input is not None:
+        popen_kwargs["stdin"] = subprocess.PIPE
+
+    started = time.perf_counter()
+    process = subprocess.Popen(command, **popen_kwargs)
+    # Pipes are served by threads, so that this thread can wait for the process itself.
+    outputs = { "stdout": None, "stderr": None }
+
+    def write_input():
+        # The program needn't read all of its input.
+        with contextlib.suppress(BrokenPipeError):
+            process.stdin.write(input)
+        with contextlib.suppress(BrokenPipeError):
+            process.stdin.close()
+
+    def read_output(name: str):
+        outputs[name] = getattr(process, name).read()
+
+    threads = [ threading.Thread(target=read_output, args=(name,), daemon=True) for name in outputs if getattr(process, name) ]
+    if input is not None:
+        threads.append(threading.Thread(target=write_input, daemon=True))
+    for thread in threads:
+        thread.start()
+
+    # Once the process has been reaped, its pid may belong to another process, which
+    # mustn't be killed. So the process is reaped only while holding the lock, and
+    # after the timer's last chance to kill it: until then, it is at worst a zombie.
+    timed_out = threading.Event()
+    reaping = threading.Lock()
+    reaped = False
+    def stop_process():
+        with reaping:
+            if not reaped:
+                timed_out.set()
+                process.kill()
+    timer = threading.Timer(timeout, stop_process) if timeout is not None else None
+    if timer is not None:
+        timer.start()
+    try:
+        os.waitid(os.P_PID, process.pid, os.WEXITED | os.WNOWAIT)
+        with reaping:
+            reaped = True
+            if timer is not None:
+                timer.cancel()
+            _, status, rusage = os.wait4(process.pid, 0)
+    finally:
+        if timer is not None:
+            timer.cancel()
+    wall_seconds = time.perf_counter() - started
+    # Tell process it has been waited for, so that it doesn't wait again.
+    process.returncode = os.waitstatus_to_exitcode(status)
+    for thread in threads:
+        thread.join()
+    for stream in (process.stdout, process.stderr):
+        if stream:
+            stream.close()
+
+    if timed_out.is_set():
+        raise subprocess.TimeoutExpired(command, timeout, outputs["stdout"], outputs["stderr"])
+    if check and process.returncode:
+        raise subprocess.CalledProcessError(process.returncode, command, outputs["stdout"], outputs["stderr"])
+    usage = ProcessUsage(rusage.ru_utime, rusage.ru_stime, rusage.ru_maxrss * 1024, wall_seconds) # ru_maxrss is in KiB on Linux.
+    return MeasuredProcess(command, process.returncode, outputs["stdout"], outputs["stderr"], usage)
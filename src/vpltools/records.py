@@ -0,0 +1,283 @@
+'''
+records.py -- reporting each test's outcome as a compact JSON record, and
+evaluating an assignment's cases from those records.
+
+    python3 -m vpltools.records [--socket PATH] module.Class.method [...]
+    python3 -m vpltools evaluate <directory> [--timeout SECONDS]
+
+vpl_evaluate.cases runs the first instead of python3 -m unittest when the test
+class sets result_records. It prints one JSON object per line for each test,
+much as the evaluation server sends them (see server.py), but without what the
+test printed, and with its message cut short:
+    {"test_id": ..., "status": "fail", "passed": false, "duration": 0.012,
+     "cpu_seconds": 0.011, "max_rss": 23449600, "message": "Traceback ..."}
+Each case passes if its record says "passed": true. While the tests run, file
+descriptors 1 and 2 point at /dev/null, and the records are written to a
+duplicate of the original standard output: so nothing a submission prints, through
+sys.stdout, sys.__stdout__, os.write(1, ...) or a child process, reaches VPL,
+and a submission can't pass a case by printing "passed": true.
+With --socket, the tests are run by the evaluation server there, if one is listening.
+
+The second runs every case in a directory's vpl_evaluate.cases, as VPL would,
+and reports the grade, with what each case cost, from their records.
+'''
+import os
+import io
+import sys
+import json
+import time
+import shlex
+import argparse
+import unittest
+import traceback
+import subprocess
+from contextlib import contextmanager, redirect_stdout, redirect_stderr
+from dataclasses import dataclass
+
+from vpltools.outcomes import TestOutcome
+from vpltools.runner import TestWorker
+from vpltools.session import finish_sessions, iterate_tests
+from vpltools.make_vpl_evaluate_cases import VPLCase, read_cases_file, grade_from_cases, get_vpl_eval_path
+
+__unittest = True
+
+# How much of a test's message a record keeps. VPL shows students the start of it.
+MAX_MESSAGE_LENGTH = 2000
+
+DEFAULT_CASE_TIMEOUT = 60.0
+
+
+def truncate(text: str, limit: int = MAX_MESSAGE_LENGTH) -> str:
+    if len(text) <= limit:
+        return text
+    return text[:limit] + f"... ({len(text) - limit} more characters)"
+
+
+def outcome_record(outcome: TestOutcome) -> dict:
+    '''
+    Returns the record of outcome: its status, what it cost, and the start of its message.
+    '''
+    return {
+        "test_id"    : outcome.test_id,
+        "status"     : outcome.status,
+        "passed"     : outcome.passed,
+        "duration"   : round(outcome.duration, 6),
+        "cpu_seconds": None if outcome.cpu_seconds is None else round(outcome.cpu_seconds, 6),
+        "max_rss"    : outcome.max_rss,
+        "message"    : truncate(outcome.message),
+    }
+
+
+def write_record(stream, outcome: TestOutcome) -> None:
+    stream.write(json.dumps(outcome_record(outcome)) + "\n")
+    stream.flush()
+
+
+def read_records(output: str) -> list[TestOutcome]:
+    '''
+    Returns the outcomes recorded in output, skipping any lines which aren't records.
+    '''
+    outcomes = []
+    for line in output.splitlines():
+        if not line.startswith("{"):
+            continue
+        try:
+            record = json.loads(line)
+            outcomes.append(TestOutcome(record["test_id"], record["status"], record.get("message", ""),
+                                        record.get("duration", 0.0), cpu_seconds=record.get("cpu_seconds"),
+                                        max_rss=record.get("max_rss")))
+        except (ValueError, KeyError, TypeError):
+            continue
+    return outcomes
+
+
+def record_tests(tests: list[unittest.TestCase], stream) -> bool:
+    '''
+    Runs tests in this process, writing the record of each to stream as it
+    finishes, and returns whether they all passed.
+    '''
+    worker = TestWorker()
+    passed = True
+    for test in tests:
+        outcome = worker.run_test(test)
+        write_record(stream, outcome)
+        passed = passed and outcome.passed
+    # As in the evaluation server, nobody is listening to what tearing down prints.
+    with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+        worker.finish()
+        finish_sessions()
+    return passed
+
+
+def load_tests(test_ids: list[str]) -> tuple[list[unittest.TestCase], list[TestOutcome]]:
+    '''
+    Returns the tests named by test_ids, and an error outcome for each name which can't be loaded.
+    '''
+    tests, errors = [], []
+    for test_id in test_ids:
+        try:
+            tests.extend(iterate_tests(unittest.defaultTestLoader.loadTestsFromName(test_id)))
+        except Exception:
+            errors.append(TestOutcome(test_id, "error", traceback.format_exc()))
+    return tests, errors
+
+
+def record_through_server(socket_path: str, test_ids: list[str], stream) -> bool | None:
+    '''
+    Has the evaluation server at socket_path run the tests, writing the record of
+    each outcome it sends to stream. Returns whether they all passed, or None if
+    no server is listening, or it stopped before sending anything.
+    '''
+    from vpltools.client import request_evaluation
+
+    replies = request_evaluation(socket_path, test_ids)
+    if replies is None:
+        return None
+    passed, outcomes = True, 0
+    with replies:
+        for line in replies:
+            reply = json.loads(line)
+            if reply.pop("event") == "done":
+                return passed
+            outcome = TestOutcome(**reply)
+            write_record(stream, outcome)
+            passed, outcomes = passed and outcome.passed, outcomes + 1
+    if not outcomes:
+        return None
+    write_record(stream, TestOutcome(test_ids[-1], "error", "The evaluation server stopped before the tests finished.\n"))
+    return False
+
+
+@contextmanager
+def records_stream():
+    '''
+    Yields a stream to the original standard output, for the records only, with
+    file descriptors 1 and 2 pointing at /dev/null until the context exits.
+    '''
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved_fds = [ os.dup(1), os.dup(2) ]
+    stream = os.fdopen(os.dup(1), "w")
+    null_fd = os.open(os.devnull, os.O_WRONLY)
+    try:
+        os.dup2(null_fd, 1)
+        os.dup2(null_fd, 2)
+        yield stream
+    finally:
+        stream.flush()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        for fd, saved_fd in zip([ 1, 2 ], saved_fds):
+            os.dup2(saved_fd, fd)
+            os.close(saved_fd)
+        os.close(null_fd)
+        stream.close()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="python3 -m vpltools.records",
+        description="Run tests, printing a JSON record of each outcome.")
+    parser.add_argument("--socket", default=None, help="path of an evaluation server's Unix socket, to run the tests through")
+    parser.add_argument("tests", nargs="+", help="tests to run, as module.Class.method")
+    args = parser.parse_args(argv)
+
+    passed = None
+    with records_stream() as stream:
+        if args.socket is not None:
+            passed = record_through_server(args.socket, args.tests, stream)
+        if passed is None:
+            sys.path.insert(0, os.getcwd()) # As python3 -m unittest would.
+            tests, errors = load_tests(args.tests)
+            for error in errors:
+                write_record(stream, error)
+            passed = record_tests(tests, stream) and not errors
+    sys.exit(not passed)
+
+
+@dataclass
+class CaseResult:
+    '''
+    The result of one case of vpl_evaluate.cases, with the outcomes it recorded, if any.
+    '''
+    case: VPLCase
+    passed: bool
+    outcomes: list[TestOutcome]
+    wall_seconds: float
+    output: str
+
+
+def run_case(case: VPLCase, directory: str, timeout: float) -> CaseResult:
+    '''
+    Runs case in directory, as VPL would. A case which prints records passes if
+    every test it ran passed; any other case, if its exit code and output are as expected.
+    '''
+    program = case.program_to_run
+    if os.path.basename(program).startswith("python3"):
+        program = sys.executable
+    # Run the tests with the same vpltools as this process.
+    env = dict(os.environ)
+    vpltools_parent_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [ vpltools_parent_dir, env.get("PYTHONPATH") ]))
+    started = time.perf_counter()
+    try:
+        process = subprocess.run([ program, *shlex.split(case.program_arguments) ], cwd=directory, env=env,
+                                 capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return CaseResult(case, False, [], time.perf_counter() - started, f"Timed out after {timeout:g} seconds.")
+    wall_seconds = time.perf_counter() - started
+
+    output = process.stdout + process.stderr
+    exit_code_ok = case.expected_exit_code is None or process.returncode == case.expected_exit_code
+    if (outcomes := read_records(process.stdout)):
+        passed = exit_code_ok and all(outcome.passed for outcome in outcomes)
+    else:
+        passed = exit_code_ok and case.output_matches(output)
+    return CaseResult(case, passed, outcomes, wall_seconds, output)
+
+
+def write_evaluation(stream, results: list[CaseResult], grade: float) -> None:
+    '''
+    Writes a line for each case, with what its tests cost, then the grade and totals.
+    '''
+    for result in results:
+        cpu = [ outcome.cpu_seconds for outcome in result.outcomes if outcome.cpu_seconds is not None ]
+        peaks = [ outcome.max_rss for outcome in result.outcomes if outcome.max_rss is not None ]
+        costs = f"{result.wall_seconds:.3f}s wall"
+        if result.outcomes:
+            costs += f", {sum(outcome.duration for outcome in result.outcomes):.3f}s in tests"
+        if cpu:
+            costs += f", {sum(cpu):.3f}s CPU"
+        if peaks:
+            costs += f", {max(peaks) / 2**20:.1f} MiB peak"
+        stream.write(f"{'ok  ' if result.passed else 'FAIL'} {result.case.name}: {costs}\n")
+        if not result.passed:
+            messages = [ outcome.message for outcome in result.outcomes if not outcome.passed ]
+            stream.write("".join(messages) if messages else result.output)
+            stream.write("\n")
+
+    slowest = max(results, key=lambda result: result.wall_seconds, default=None)
+    stream.write(f"Passed {sum(result.passed for result in results)} of {len(results)} cases"
+                 f" in {sum(result.wall_seconds for result in results):.3f}s")
+    if slowest is not None:
+        stream.write(f"; slowest: {slowest.case.name}, {slowest.wall_seconds:.3f}s")
+    stream.write(f"\nGrade: {grade:g}\n")
+
+
+def evaluate_command(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(prog="python3 -m vpltools evaluate",
+        description="Run every case in a directory's vpl_evaluate.cases, and report the grade, and what each case cost.")
+    parser.add_argument("directory", help="directory containing the tests, vpl_evaluate.cases and a submission")
+    parser.add_argument("-t", "--timeout", type=float, default=DEFAULT_CASE_TIMEOUT, help="seconds allowed for each case")
+    args = parser.parse_args(argv)
+
+    cases_path = get_vpl_eval_path(os.path.abspath(args.directory))
+    if not os.path.exists(cases_path):
+        sys.exit(f"{cases_path} not found. Run the tests once to generate it.")
+    cases = read_cases_file(cases_path)
+    results = [ run_case(case, os.path.dirname(cases_path), args.timeout) for case in cases ]
+    grade = grade_from_cases(cases, [ result.passed for result in results ])
+    write_evaluation(sys.stdout, results, grade)
+
+
+if __name__ == "__main__":
+    main()
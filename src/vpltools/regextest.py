@@ -1,7 +1,13 @@
-
 import re
+import time
+import multiprocessing
+import math
 import vpltools
 from dataclasses import dataclass
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from vpltools.adversarial_inputs import adversarial_families
+from vpltools.complexity import fit_growth_exponent_robust, describe_growth
 
 __unittest = True # Keep, to silence tracebacks.
 
@@ -11,13 +17,463 @@ class MatchTarget:
     text_to_search: str = ""
     text_to_find: str | None = ""
     text_to_capture: str | None = ""
+    expect_no_match: bool = False # Used by MatchTable rows, like negate_match and force_no_match.
+
+
+@dataclass
+class MatchTable:
+    '''
+    A table of MatchTargets for one exercise, evaluated in a single pass.
+    - exercise      : name of the function in the student's module which returns the pattern.
+    - targets       : the rows of the table.
+    - full_match    : True to check rows like match_text(), False to check them
+                      like match_and_capture_text().
+    - credit_per_row: True to generate one test method (and so one VPL case) per
+                      row, named test_<exercise>_row<N>, for partial credit. Where
+                      the rows run in one process, the table is still evaluated only
+                      once, by whichever row runs first. In production, where VPL runs
+                      each case in a process of its own, each row matches only itself.
+                      False to generate a single test method, test_<exercise>.
+    '''
+    exercise: str
+    targets: list[MatchTarget]
+    full_match: bool = False
+    credit_per_row: bool = False
+
+
+# Sent by a RegexWorker's child process once it is ready for requests, which it
+# may take WORKER_START_TIMEOUT seconds to be.
+WORKER_READY = "ready"
+WORKER_START_TIMEOUT = 60.0
+
+
+class PatternTimeoutError(RuntimeError):
+    pass
+
+
+class RegexWorkerError(RuntimeError):
+    '''
+    A RegexWorker's child process died before it answered a request.
+    '''
+
+
+@dataclass
+class MatchResult:
+    '''
+    A picklable stand in for re.Match, holding the parts of a match which
+    RegexTestCase uses. Supports group(), like re.Match.
+    '''
+    span: tuple[int, int]
+    groups: tuple
+
+    def group(self, index: int = 0):
+        if index == 0:
+            return self.groups[0]
+        if index < 0 or index >= len(self.groups):
+            raise IndexError("no such group")
+        return self.groups[index]
+
+
+    @classmethod
+    def from_match(cls, match: re.Match | None) -> "MatchResult | None":
+        if match is None:
+            return None
+        return cls(match.span(), (match.group(0),) + match.groups())
+
+
+def describe_mismatch(pattern: str, match_target: MatchTarget, match: MatchResult | None, full_match: bool, expect_no_match: bool = False) -> str | None:
+    '''
+    Returns a message describing how match (the result of matching pattern against
+    match_target.text_to_search) differs from what match_target expects, or None
+    if it doesn't. See RegexTestCase.match_text() and match_and_capture_text().
+    '''
+    if full_match:
+        if expect_no_match and match is not None:
+            return f"The pattern matched '{match_target.text_to_search}', but shouldn't have."
+        if not expect_no_match and match is None:
+            return f"The pattern didn't match '{match_target.text_to_search}', but should have."
+        return None
+
+    if match_target.text_to_find is not None and match is None:
+        return f"The pattern {pattern} didn't match '{match_target.text_to_find}', but should have."
+    elif match_target.text_to_find is None and expect_no_match and match is not None:
+        return f"The pattern {pattern} matched '{match.group(0)}' in {match_target.text_to_search}, but shouldn't have."
+
+    captured = None
+    if match is not None:
+        captured = match.group(1)
+
+    if match_target.text_to_capture is not None and captured != match_target.text_to_capture:
+        return f"The captured '{captured}' didn't match the expected text '{match_target.text_to_capture}'"
+    elif match_target.text_to_capture is None and match is not None:
+        return f"'{captured}' was captured, but shouldn't have been."
+    return None
+
+
+def run_match(compile_pattern, pattern: str, method: str, text: str) -> MatchResult | None:
+    '''
+    Applies the re.Pattern method named by method ("match", "fullmatch" or "search")
+    to text, using compile_pattern to obtain the compiled pattern.
+    '''
+    return MatchResult.from_match(getattr(compile_pattern(pattern), method)(text))
+
+
+def time_match(compile_pattern, pattern: str, method: str, text: str, min_seconds: float) -> float:
+    '''
+    Returns the mean time taken by run_match(), repeating it until at least
+    min_seconds have elapsed, so that very fast matches can be timed precisely.
+    '''
+    compile_pattern(pattern) # Don't time compilation.
+    repeats = 0
+    start = time.perf_counter()
+    while True:
+        run_match(compile_pattern, pattern, method, text)
+        repeats += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return elapsed / repeats
+
+
+def regex_worker_loop(connection, cache_size: int) -> None:
+    '''
+    Runs in a RegexWorker's child process. Serves match requests until the
+    connection is closed, keeping its own cache of compiled patterns. Requests
+    are (pattern, method, text, min_seconds) tuples. If min_seconds is None,
+    the response is the result of the match, otherwise it is the time it took.
+    WORKER_READY is sent first, once the process has started.
+    '''
+    compile_pattern = lru_cache(maxsize=cache_size)(re.compile)
+    connection.send(WORKER_READY)
+    while True:
+        try:
+            requests = connection.recv()
+        except EOFError:
+            return
+        for pattern, method, text, min_seconds in requests: # One response per request, as soon as it is ready.
+            try:
+                if min_seconds is None:
+                    connection.send(run_match(compile_pattern, pattern, method, text))
+                else:
+                    connection.send(time_match(compile_pattern, pattern, method, text, min_seconds))
+            except Exception as e: # e.g. re.error, or TypeError from a pattern which isn't a string.
+                try:
+                    connection.send(e)
+                except Exception: # It can't be pickled.
+                    connection.send(RuntimeError(f"{type(e).__name__}: {e}"))
+
+
+class RegexWorker:
+    '''
+    Matches patterns in a child process, so that a catastrophically backtracking
+    pattern can be killed when it exceeds its time limit. The child process is
+    started on first use, and restarted after it has been killed, or has died.
+    '''
+    def __init__(self, cache_size: int):
+        self.cache_size = cache_size
+        self.process = None
+        self.connection = None
+
+
+    def start(self) -> None:
+        '''
+        Starts the child process, and waits until it is ready, so that the time it takes
+        to start (e.g. to import vpltools, with the spawn start method) isn't counted
+        against the first match. Raises RegexWorkerError if it doesn't start.
+        '''
+        self.connection, child_connection = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=regex_worker_loop,
+            args=(child_connection, self.cache_size),
+            daemon=True)
+        self.process.start()
+        child_connection.close()
+        try:
+            if self.connection.poll(WORKER_START_TIMEOUT) and self.connection.recv() == WORKER_READY:
+                return
+            message = f"The process matching patterns didn't start within {WORKER_START_TIMEOUT:g} seconds."
+        except (EOFError, BrokenPipeError):
+            self.process.join(1)
+            message = f"The process matching patterns died while starting, with exit code {self.process.exitcode}."
+        self.stop()
+        raise RegexWorkerError(message)
+
+
+    def stop(self) -> None:
+        if self.process is None:
+            return
+        self.connection.close() # type: ignore
+        self.process.kill()
+        self.process.join()
+        self.process = None
+        self.connection = None
+
+
+    def match(self, pattern: str, method: str, text: str, time_limit: float) -> MatchResult | None:
+        '''
+        Returns the result of the match, raises whatever matching raised (e.g. re.error
+        if the pattern doesn't compile), PatternTimeoutError if matching takes longer
+        than time_limit seconds, or RegexWorkerError if the child process died.
+        '''
+        result = self.match_many([(pattern, method, text)], time_limit)[0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+    def match_many(self, requests: list[tuple[str, str, str]], time_limit: float) -> list:
+        '''
+        Performs a batch of (pattern, method, text) requests in one round trip.
+        Returns a list with a MatchResult, None, or the exception raised (e.g. re.error,
+        PatternTimeoutError or RegexWorkerError) for each request. When a request times
+        out, or the worker dies, the worker is restarted for the requests after it.
+        '''
+        return self.exchange([ (*request, None) for request in requests ], time_limit)
+
+
+    def time_many(self, requests: list[tuple[str, str, str]], time_limit: float, min_seconds: float = 0.001) -> list:
+        '''
+        Like match_many(), but returns the time each match took, in seconds,
+        in place of its result. See time_match().
+        '''
+        return self.exchange([ (*request, min_seconds) for request in requests ], time_limit)
+
+
+    def exchange(self, requests: list[tuple], time_limit: float) -> list:
+        results = []
+        while len(results) < len(requests):
+            remaining = requests[len(results):]
+            if self.process is None:
+                try:
+                    self.start()
+                except RegexWorkerError as e:
+                    results.extend([ e ] * len(remaining))
+                    break
+            try:
+                self.connection.send(remaining) # type: ignore
+            except BrokenPipeError: # The worker died after the last exchange.
+                self.stop()
+                continue
+            for _ in remaining:
+                try:
+                    if not self.connection.poll(time_limit): # type: ignore
+                        self.stop()
+                        results.append(PatternTimeoutError(f"Matching took longer than {time_limit} seconds."))
+                        break
+                    results.append(self.connection.recv()) # type: ignore
+                except (EOFError, BrokenPipeError):
+                    self.process.join(1) # type: ignore
+                    exit_code = self.process.exitcode # type: ignore
+                    self.stop()
+                    results.append(RegexWorkerError(f"The process matching patterns died, with exit code {exit_code}."))
+                    break
+        return results
 
 
 class RegexTestCase(vpltools.VPLTestCase):
+    '''
+    Tests regular expressions returned by student functions. Compiled patterns
+    are cached per class, in a cache of pattern_cache_size entries.
+
+    Each match is allowed match_time_limit seconds, after which the test fails
+    with a "pattern too slow" message, rather than hanging the evaluation.
+    Matches run in a worker process so that they can be killed; the time the
+    process takes to start isn't counted. The limit is 2 seconds by default:
+    earlier versions matched in this process, without a limit, as they still
+    do with match_time_limit set to None.
+    '''
     TEXT = "text"
     FIND = "find"
     CAPT = "capture"
 
+    match_time_limit: float | None = 2.0
+    pattern_cache_size = 128
+
+    # Settings for assertPatternEfficient()
+    efficiency_input_sizes = (256, 512, 1024, 2048, 4096)
+    efficiency_repeats = 3
+    efficiency_time_limit = 1.0     # Seconds allowed for a single match, when timing patterns.
+    max_growth_exponent = 1.5       # Patterns are "super-linear" if their time grows faster than n^this.
+
+    match_tables: list[MatchTable] = []
+    table_workers = 1               # Worker processes used to evaluate large tables in parallel.
+    rows_per_table_worker = 64      # Tables with fewer rows than this use a single worker.
+
+    def __init_subclass__(cls, **kwargs):
+        '''
+        Adds test methods for each of the subclass' match_tables.
+        '''
+        super().__init_subclass__(**kwargs)
+        for table in cls.__dict__.get("match_tables", []):
+            if table.credit_per_row:
+                for row in range(len(table.targets)):
+                    setattr(cls, f"test_{table.exercise}_row{row}", cls.make_table_row_test(table, row))
+            else:
+                setattr(cls, f"test_{table.exercise}", cls.make_table_test(table))
+
+
+    @staticmethod
+    def make_table_test(table: MatchTable):
+        def test_table(self):
+            mismatches = [ (row, message) for row, message in enumerate(self.evaluate_table(table)) if message is not None ]
+            if mismatches:
+                self.fail(msg=(f"{len(mismatches)} of {len(table.targets)} rows of {table.exercise} failed:\n"
+                    + "\n".join(f"  row {row}: {message}" for row, message in mismatches)))
+        test_table.__doc__ = f"Checks all {len(table.targets)} rows of {table.exercise}."
+        return test_table
+
+
+    @staticmethod
+    def make_table_row_test(table: MatchTable, row: int):
+        def test_table_row(self):
+            if table.exercise not in self.table_results and self.in_production_environment():
+                message = self.match_rows(table, [ row ])[0] # No other row will run in this process.
+            else:
+                message = self.evaluate_table(table)[row]
+            if message is not None:
+                self.fail(msg=message)
+        test_table_row.__doc__ = f"Checks row {row} of {table.exercise}: '{table.targets[row].text_to_search}'."
+        return test_table_row
+
+
+    @classmethod
+    def setUpClass(cls):
+        cls.compile_pattern = staticmethod(lru_cache(maxsize=cls.pattern_cache_size)(re.compile))
+        cls.regex_workers = [ RegexWorker(cls.pattern_cache_size) for _ in range(max(1, cls.table_workers)) ]
+        cls.regex_worker = cls.regex_workers[0]
+        cls.table_results = {}
+        return super().setUpClass()
+
+
+    @classmethod
+    def tearDownClass(cls):
+        for worker in cls.regex_workers:
+            worker.stop()
+        return super().tearDownClass()
+
+
+    def evaluate_table(self, table: MatchTable) -> list[str | None]:
+        '''
+        Returns, for each row of table, a description of how the student's pattern
+        failed that row, or None if it passed. Every row is matched in one pass,
+        split across table_workers worker processes for large tables. Results are
+        kept for the rest of the class, so that each row's test can reuse them.
+        '''
+        if table.exercise not in self.table_results:
+            self.table_results[table.exercise] = self.match_rows(table, list(range(len(table.targets))))
+        return self.table_results[table.exercise]
+
+
+    def match_rows(self, table: MatchTable, rows: list[int]) -> list[str | None]:
+        '''
+        Returns, for each of rows of table, a description of how the student's
+        pattern failed that row, or None if it passed.
+        '''
+        if not rows:
+            return []
+        targets = [ table.targets[row] for row in rows ]
+        pattern = getattr(self.student_py_module, table.exercise)()
+        method = "fullmatch" if table.full_match else "match"
+        requests = [ (pattern, method, target.text_to_search) for target in targets ]
+
+        if self.match_time_limit is None:
+            matches = [ run_match(self.compile_pattern, *request) for request in requests ]
+        else:
+            num_workers = min(len(self.regex_workers), max(1, len(requests) // self.rows_per_table_worker))
+            chunk_size = -(-len(requests) // num_workers)
+            chunks = [ requests[i:i + chunk_size] for i in range(0, len(requests), chunk_size) ]
+            with ThreadPoolExecutor(max_workers=num_workers) as executor: # Threads only wait; workers match.
+                chunk_results = executor.map(
+                    lambda worker, chunk: worker.match_many(chunk, self.match_time_limit),
+                    self.regex_workers, chunks)
+            matches = [ match for chunk in chunk_results for match in chunk ]
+
+        messages = []
+        for target, match in zip(targets, matches):
+            if isinstance(match, Exception) and not isinstance(match, PatternTimeoutError):
+                raise match
+            if isinstance(match, PatternTimeoutError):
+                messages.append(f"Pattern too slow! The pattern {pattern} took more than "
+                    + f"{self.match_time_limit} seconds to match '{target.text_to_search}'.")
+                continue
+            message = describe_mismatch(pattern, target, match, table.full_match, target.expect_no_match)
+            if message is not None and match is not None:
+                message += f" (groups: {match.groups[1:]})"
+            messages.append(message)
+        return messages
+
+
+    def find_match(self, pattern: str, method: str, text: str) -> MatchResult | None:
+        '''
+        Matches pattern against text using the re.Pattern method named by method,
+        failing the test if the match exceeds match_time_limit.
+        '''
+        if self.match_time_limit is None:
+            return run_match(self.compile_pattern, pattern, method, text)
+
+        try:
+            return self.regex_worker.match(pattern, method, text, self.match_time_limit)
+        except PatternTimeoutError:
+            timeout_message = (f"Pattern too slow! The pattern {pattern} took more than "
+                + f"{self.match_time_limit} seconds to match '{text}'.\n"
+                + "This usually means catastrophic backtracking; look for nested "
+                + "repetition, like (a+)+, or alternatives which can match the same text, like (a|a)*.")
+        self.fail(msg=timeout_message) # Failing outside the except keeps the traceback short.
+
+
+    def time_pattern(self, pattern: str, method: str, texts: list[str]) -> list[float]:
+        '''
+        Returns the time pattern takes to match each of texts, which should be in
+        increasing order of length. The best of efficiency_repeats timings is used.
+        Once a match takes longer than efficiency_time_limit, it and all later
+        (longer) texts are given a time of math.inf.
+        '''
+        times = []
+        for text in texts:
+            timings = self.regex_worker.time_many([(pattern, method, text)] * self.efficiency_repeats, self.efficiency_time_limit)
+            if any(isinstance(timing, Exception) for timing in timings):
+                break
+            times.append(min(timings))
+        return times + [math.inf] * (len(texts) - len(times))
+
+
+    def assertPatternEfficient(self, pattern: str, key_pattern: str, method: str = "match", msg: str | None = None):
+        '''
+        Asserts that pattern does not scale super-linearly on adversarial inputs
+        unless key_pattern does too. Inputs are long "near misses" generated from
+        the repetitions in both patterns (see adversarial_inputs.py), with the
+        lengths in efficiency_input_sizes. For each family of inputs, the growth
+        rate of the matching time is estimated for both patterns, robustly, so that
+        one disturbed timing can't make a pattern look slow (see complexity.py). The
+        assertion fails if the student's grows faster than n^max_growth_exponent
+        while the key's doesn't, or if pattern isn't a valid regular expression.
+        '''
+        try:
+            families, invalid_message = adversarial_families(pattern), None
+        except re.error as e:
+            families, invalid_message = [], f"Your pattern {pattern} isn't a valid regular expression: {e}"
+        # Failing within an except complicates the traceback.
+        if invalid_message is not None:
+            self.fail(msg=msg or invalid_message)
+
+        families += [ family for family in adversarial_families(key_pattern) if family not in families ]
+
+        for family in families:
+            texts = [ family.make_input(size) for size in self.efficiency_input_sizes ]
+            lengths = [ len(text) for text in texts ]
+
+            student_exponent = fit_growth_exponent_robust(lengths, self.time_pattern(pattern, method, texts))
+            if student_exponent <= self.max_growth_exponent:
+                continue
+
+            key_exponent = fit_growth_exponent_robust(lengths, self.time_pattern(key_pattern, method, texts))
+            if key_exponent <= self.max_growth_exponent:
+                self.fail(msg=msg or (f"Your pattern {pattern} is too slow on long inputs which almost match, "
+                    + f"like {family}.\nIts matching time grows {describe_growth(student_exponent)}, "
+                    + f"but it could grow {describe_growth(key_exponent)}.\n"
+                    + "Look for nested repetition, like (a+)+, or repetitions next to each other "
+                    + "which can match the same text, like [0-9]*[0-9]*."))
+
+
     # def match_text(self, pattern: str, text_to_match: str, negate_match=False):
     def match_text(self, pattern: str, match_target: MatchTarget, negate_match=False):
         '''
@@ -25,13 +481,10 @@ class RegexTestCase(vpltools.VPLTestCase):
         Uses re.fullmatch. This method ignores match_target's text_to_find, and
         text_to_capture attributes
         '''
-        test_pattern = re.compile(pattern)
-        match = test_pattern.fullmatch(match_target.text_to_search)
-        if negate_match:
-            match = True if match is None else None
-        self.assertIsNotNone(
-            match, 
-            msg=f"The pattern didn't match '{match_target.text_to_search}', but should have.")
+        match = self.find_match(pattern, "fullmatch", match_target.text_to_search)
+        mismatch = describe_mismatch(pattern, match_target, match, full_match=True, expect_no_match=negate_match)
+        if mismatch is not None:
+            self.fail(msg=mismatch)
 
 
     def match_and_capture_text(self, pattern: str, match_target: MatchTarget, force_no_match=False):
@@ -40,35 +493,7 @@ class RegexTestCase(vpltools.VPLTestCase):
         match_target.text_to_capture was captured. match_target.text_to_find and 
         match_target.text_to_capture may both be None.
         '''
-        test_pattern = re.compile(pattern)
-        match = test_pattern.match(match_target.text_to_search)
-        # match = test_pattern.findall(text_to_match_and_capture[self.TEXT])
-
-        if match_target.text_to_find is not None:
-            self.assertIsNotNone(
-                match, 
-                msg=f"The pattern {pattern} didn't match '{match_target.text_to_find}', but should have.")
-        elif match_target.text_to_find is None and force_no_match:
-            self.assertIsNone(
-                match,
-                msg=f"The pattern {pattern} matched '{match}' in {match_target.text_to_search}, but shouldn't have."
-            )
-    
-        if match_target.text_to_capture is not None:
-            captured = None
-            if match is not None:
-                captured = match.group(1)
-
-            self.assertEqual(
-                captured, 
-                match_target.text_to_capture,
-                msg=f"The captured '{captured}' didn't match the expected text '{match_target.text_to_capture}'")
-        else:
-            captured = None
-            if match is not None:
-                captured = match.group(1)
-
-            self.assertIsNone(
-                match,
-                msg=f"'{captured}' was captured, but shouldn't have been."
-            )
+        match = self.find_match(pattern, "match", match_target.text_to_search)
+        mismatch = describe_mismatch(pattern, match_target, match, full_match=False, expect_no_match=force_no_match)
+        if mismatch is not None:
+            self.fail(msg=mismatch)
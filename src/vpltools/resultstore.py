@@ -0,0 +1,183 @@
+'''
+resultstore.py -- remembering the results of running tests, keyed by a hash of
+everything which could change them, so that identical runs needn't be repeated.
+
+Each result is a small JSON file. Files are written under a temporary name and
+renamed into place, so any number of processes can read and write the same
+store at once: a reader sees either a whole result, or none at all.
+'''
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import tempfile
+import subprocess
+import importlib.metadata
+from functools import cache
+
+__unittest = True
+
+DEFAULT_MAX_ENTRIES = 10000
+STALE_TEMPORARY_SECONDS = 3600
+
+# Commands which print the version of the tools which build or run programs with each extension.
+TOOL_VERSION_COMMANDS = {
+    ".c"   : ("gcc", "--version"),
+    ".cpp" : ("g++", "--version"),
+    ".java": ("javac", "-version"),
+    ".f90" : ("gfortran", "--version"),
+    ".sql" : ("mariadb", "--version"),
+}
+# Settings which can't change a test's outcome.
+OUTCOME_NEUTRAL_SETTINGS = { "VPLTOOLS_JOBS", "VPLTOOLS_FIXTURE_CACHE" }
+
+
+def cache_dir() -> str:
+    cache_home = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "vpltools")
+
+
+def default_store_dir() -> str:
+    return os.path.join(cache_dir(), "results")
+
+
+def hash_paths(hasher, paths: list[str], root: str) -> None:
+    '''
+    Adds the names (relative to root) and contents of the files at paths
+    to hasher. Directories are added file by file, in sorted order.
+    '''
+    for path in sorted(paths):
+        if os.path.isdir(path):
+            hash_paths(hasher, [ os.path.join(path, name) for name in os.listdir(path) if name != "__pycache__" ], root)
+            continue
+        hasher.update(os.path.relpath(path, root).encode() + b"\0")
+        with open(path, "rb") as fo:
+            while chunk := fo.read(1 << 20):
+                hasher.update(chunk)
+        hasher.update(b"\0")
+
+
+@cache
+def vpltools_version() -> str:
+    '''
+    Returns the installed version of vpltools, or, when it is used from a source
+    tree rather than installed, a hash of its source files.
+    '''
+    try:
+        return importlib.metadata.version("vpltools")
+    except importlib.metadata.PackageNotFoundError:
+        package_dir = os.path.dirname(os.path.abspath(__file__))
+        hasher = hashlib.sha256()
+        hash_paths(hasher, [ os.path.join(package_dir, name) for name in os.listdir(package_dir) if name.endswith(".py") ], package_dir)
+        return hasher.hexdigest()
+
+
+@cache
+def tool_version(command: tuple[str, ...]) -> str:
+    '''
+    Returns what command prints, e.g. a compiler's version, or a note that it couldn't run.
+    '''
+    try:
+        process = subprocess.run(command, capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        return f"{command[0]} unavailable: {type(e).__name__}"
+    return (process.stdout + process.stderr).strip()
+
+
+def environment_fingerprint(extensions: set[str]) -> str:
+    '''
+    Returns a description of what, outside a directory of tests, can change their
+    outcomes: the Python running them, the tools for programs with the given
+    extensions, PATH, and vpltools' environment variables.
+    '''
+    parts = [ sys.version, os.getenv("PATH", "") ]
+    parts += [ f"{name}={value}" for name, value in sorted(os.environ.items())
+               if name.startswith("VPLTOOLS_") and name not in OUTCOME_NEUTRAL_SETTINGS ]
+    parts += [ tool_version(TOOL_VERSION_COMMANDS[extension]) for extension in sorted(extensions) if extension in TOOL_VERSION_COMMANDS ]
+    if ".sql" in extensions:
+        parts.append(f"sqlite {sqlite3.sqlite_version}")
+    return "\0".join(parts)
+
+
+def make_result_key(submission_dir: str, submission_files: list[str], tests_dir: str, test_files: list[str]) -> str:
+    '''
+    Returns a key which changes whenever the submission's files, the test
+    files, or vpltools itself change.
+    '''
+    hasher = hashlib.sha256(vpltools_version().encode() + b"\0")
+    hash_paths(hasher, [ os.path.join(submission_dir, name) for name in submission_files ], submission_dir)
+    hasher.update(b"\0tests\0")
+    hash_paths(hasher, [ os.path.join(tests_dir, name) for name in test_files ], tests_dir)
+    return hasher.hexdigest()
+
+
+class ResultStore:
+    '''
+    A directory of results, each a JSON-serializable dict, keyed by strings like
+    those from make_result_key. When there are more than max_entries results,
+    evict() removes those which were least recently used.
+    '''
+    def __init__(self, directory: str | None = None, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.directory = directory or default_store_dir()
+        self.max_entries = max_entries
+        os.makedirs(self.directory, exist_ok=True)
+
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+
+    def get(self, key: str) -> dict | None:
+        '''
+        Returns the result stored for key, or None if there isn't one.
+        '''
+        path = self.path_for(key)
+        try:
+            with open(path, "r") as result_fo:
+                result = json.load(result_fo)
+            os.utime(path) # Record the use, for evict().
+        except (OSError, ValueError):
+            return None
+        return result
+
+
+    def put(self, key: str, result: dict) -> None:
+        '''
+        Stores result for key, replacing any result already stored.
+        '''
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, prefix=".", suffix=".tmp")
+        try:
+            with os.fdopen(file_descriptor, "w") as result_fo:
+                json.dump(result, result_fo)
+            os.replace(temporary_path, self.path_for(key))
+        except:
+            os.unlink(temporary_path)
+            raise
+
+
+    def evict(self) -> int:
+        '''
+        Removes the least recently used results, until at most max_entries
+        remain. Returns the number of results removed.
+        '''
+        entries = []
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.name.endswith(".json"):
+                    entries.append((entry.stat().st_mtime, entry.path))
+                elif entry.name.endswith(".tmp") and time.time() - entry.stat().st_mtime > STALE_TEMPORARY_SECONDS:
+                    os.unlink(entry.path) # Left by a process which died while writing.
+            except FileNotFoundError:
+                pass # Evicted, or renamed into place, by another process.
+
+        entries.sort()
+        num_removed = 0
+        for _, path in entries[:max(0, len(entries) - self.max_entries)]:
+            try:
+                os.unlink(path)
+                num_removed += 1
+            except FileNotFoundError:
+                pass
+        return num_removed
@@ -0,0 +1,470 @@
+'''
+runner.py -- running test methods in parallel, in worker processes.
+
+    python3 test_assignment.py -j 4
+    python3 -m vpltools test [discover options] -j 4
+
+vpltools.main() is unittest.main(), unless it is asked for more than one job, with
+-j/--jobs on the command line, its jobs argument, or the VPLTOOLS_JOBS environment
+variable. Then the tests are shared between that many worker processes, forked
+once they have been loaded. Each worker sets a test class up the first time it
+runs one of its tests, and tears it down when it runs out of tests, so a class is
+set up at most once per worker. Workers use isolated workspaces (see
+VPLTestCase.isolated_workspace), so they can't see each other's files. Tests
+are handed out longest expected first, going by how long they took before
+(see durations.py).
+
+Tests report what they print, and pass or fail, just as they would in a serial
+run, and vpl_evaluate.cases is written once, by the main process, as it would be
+by a serial run. Tests which can't share the machine (e.g. because they time
+themselves) are marked with @vpltools.serial, and run in the main process, one at
+a time, after the others.
+
+Outside production, each test's outcome is remembered, keyed by a hash of the
+files beside it and of vpltools (see VPLTestCase.result_cache_key), and reused
+while none of those change, so that running unchanged tests again is quick.
+--rerun runs every test regardless.
+'''
+import io
+import os
+import sys
+import math
+import time
+import hashlib
+import argparse
+import unittest
+import traceback
+import multiprocessing
+import multiprocessing.connection
+from contextlib import redirect_stdout, redirect_stderr
+from dataclasses import asdict, replace
+
+from vpltools.outcomes import TestOutcome, RecordingTestResult, RunReport, PROGRESS_MARKS, describe
+from vpltools.session import get_session, all_sessions, finish_sessions, forget_sessions, iterate_tests
+from vpltools.durations import DurationHistory, order_longest_first
+from vpltools.resultstore import ResultStore, cache_dir
+from vpltools.process_usage import usage_so_far
+from vpltools.vpl_test_case import VPLTestCase
+
+__unittest = True
+
+
+def serial(test_item):
+    '''
+    Marks a test method, or every test method of a class, to be run on its own,
+    in the main process, rather than alongside other tests in a worker.
+    '''
+    test_item.vpltools_serial = True
+    return test_item
+
+
+def is_serial(test: unittest.TestCase) -> bool:
+    test_method = getattr(test, getattr(test, "_testMethodName", ""), None)
+    return getattr(test_method, "vpltools_serial", False) or getattr(type(test), "vpltools_serial", False)
+
+
+class TestWorker:
+    '''
+    Runs tests one at a time in this process. Each test class is set up the first
+    time one of its tests runs, and every class is torn down by finish().
+    '''
+    def __init__(self):
+        self.result = RecordingTestResult()
+        self.classes_seen: set[type] = set()
+        self.classes_set_up: list[type] = []
+        self.classes_failed: set[type] = set()
+        self.classes_skipped: dict[type, str] = {}
+
+
+    @staticmethod
+    def class_id(test_class: type) -> str:
+        return f"{test_class.__module__}.{test_class.__qualname__}"
+
+
+    def add_fixture_error(self, test_class: type, exc_info) -> None:
+        scope = self.class_id(test_class)
+        self.result.fixture_errors[scope] = (self.result.fixture_errors.get(scope, "")
+                                             + "".join(traceback.format_exception(*exc_info)))
+
+
+    def do_class_cleanups(self, test_class: type) -> None:
+        test_class.doClassCleanups()
+        while test_class.tearDown_exceptions:
+            self.add_fixture_error(test_class, test_class.tearDown_exceptions.pop(0))
+
+
+    def set_up_class(self, test_class: type) -> None:
+        if test_class in self.classes_seen:
+            return
+        self.classes_seen.add(test_class)
+        if getattr(test_class, "__unittest_skip__", False):
+            return # Each test reports the skip itself.
+
+        try:
+            test_class.setUpClass()
+        except unittest.SkipTest as skip:
+            self.classes_skipped[test_class] = str(skip)
+        except Exception:
+            self.classes_failed.add(test_class)
+            self.add_fixture_error(test_class, sys.exc_info())
+            self.do_class_cleanups(test_class)
+        else:
+            self.classes_set_up.append(test_class)
+
+
+    def run_test(self, test: unittest.TestCase) -> TestOutcome:
+        '''
+        Runs test, setting its class up first if necessary, and returns its outcome,
+        with anything printed by it (or by its class's setUpClass), and what it cost.
+        '''
+        output = io.StringIO()
+        usage_before = usage_so_far()
+        with redirect_stdout(output), redirect_stderr(output):
+            self.set_up_class(type(test))
+            if type(test) in self.classes_skipped:
+                self.result.addSkip(test, self.classes_skipped[type(test)])
+            elif type(test) not in self.classes_failed:
+                test(self.result)
+        usage = usage_so_far()
+        outcome = self.result.outcome_of(test.id())
+        outcome.output = output.getvalue()
+        outcome.cpu_seconds = usage.cpu_seconds - usage_before.cpu_seconds
+        outcome.max_rss = usage.max_rss
+        return outcome
+
+
+    def finish(self) -> None:
+        '''
+        Tears down every class which was set up, most recently set up first.
+        '''
+        while self.classes_set_up:
+            test_class = self.classes_set_up.pop()
+            try:
+                test_class.tearDownClass()
+            except Exception:
+                self.add_fixture_error(test_class, sys.exc_info())
+            self.do_class_cleanups(test_class)
+
+
+def work(tests: list[unittest.TestCase], task_queue, connection) -> None:
+    '''
+    The body of a worker process: runs batches of tests (lists of indices into tests)
+    from task_queue until it gets None, reporting to connection as it goes.
+    '''
+    forget_sessions(hold=True) # Sessions are finished below, once every batch has run.
+    os.environ["VPLTOOLS_ISOLATED_WORKSPACE"] = "1"
+    worker = TestWorker()
+    while (batch := task_queue.get()) is not None:
+        for test_index in batch:
+            connection.send(("started", test_index))
+            outcome = worker.run_test(tests[test_index])
+            connection.send(("outcome", (test_index, asdict(outcome))))
+    worker.finish()
+
+    # The main process writes vpl_evaluate.cases; this process just says how.
+    cases_file_writers = []
+    for session in all_sessions():
+        if session.cases_file_writer is not None:
+            cases_file_writers.append((session.directory, TestWorker.class_id(session.cases_file_writer),
+                                       session.include_pylint, session.pylint_files))
+            session.cases_file_writer = None
+        session.finish() # Removes this worker's workspace.
+    connection.send(("finished", (worker.result.fixture_errors, cases_file_writers)))
+
+
+def make_batches(tests: list[unittest.TestCase], test_indices: list[int], jobs: int) -> list[list[int]]:
+    '''
+    Splits each class's tests into at most jobs batches of consecutive tests,
+    so that no more than jobs workers need to set a class up.
+    '''
+    indices_by_class: dict[type, list[int]] = {}
+    for test_index in test_indices:
+        indices_by_class.setdefault(type(tests[test_index]), []).append(test_index)
+
+    batches = []
+    for class_indices in indices_by_class.values():
+        batch_size = math.ceil(len(class_indices) / jobs)
+        batches.extend(class_indices[start:start + batch_size] for start in range(0, len(class_indices), batch_size))
+    return batches
+
+
+class ParallelTestRunner:
+    '''
+    A unittest test runner which runs tests in jobs worker processes. Given a
+    history, it starts the batches expected to take longest first, and records
+    how long each test took. Given a result_store, it reuses the outcomes of
+    tests whose files haven't changed since they last ran, and stores the rest.
+    '''
+    def __init__(self, jobs: int | None = None, stream=None, verbosity: int = 1, history: DurationHistory | None = None,
+                 result_store: ResultStore | None = None):
+        self.jobs = jobs or os.cpu_count() or 1
+        self.stream = stream or sys.stderr
+        self.verbosity = verbosity
+        self.history = history
+        self.result_store = result_store
+
+
+    def report_progress(self, outcome: TestOutcome) -> None:
+        mark, word = PROGRESS_MARKS.get(outcome.status, ("?", outcome.status))
+        if self.verbosity > 1:
+            self.stream.write(f"{describe(outcome.test_id)} ... {word}\n")
+        elif self.verbosity == 1:
+            self.stream.write(mark)
+        self.stream.flush()
+
+
+    def run(self, test: unittest.TestSuite | unittest.TestCase) -> RunReport:
+        tests = list(iterate_tests(test)) if isinstance(test, unittest.TestSuite) else [ test ]
+        started = time.perf_counter()
+        result = RecordingTestResult()
+        result_keys = self.result_keys(tests)
+        indices_to_run = [ index for index in range(len(tests)) if not self.reuse_outcome(tests[index], result_keys.get(index), result) ]
+
+        schedule = ""
+        parallel_indices = [ index for index in indices_to_run if not is_serial(tests[index]) ]
+        if (self.jobs > 1 and len(parallel_indices) > 1
+                and "fork" in multiprocessing.get_all_start_methods()):
+            schedule = self.run_in_workers(tests, parallel_indices, result)
+            serial_indices = [ index for index in indices_to_run if is_serial(tests[index]) ]
+        else:
+            serial_indices = indices_to_run
+
+        worker = TestWorker()
+        worker.result = result
+        for test_index in serial_indices:
+            self.report_progress(worker.run_test(tests[test_index]))
+        worker.finish()
+        finish_sessions() # Writes the vpl_evaluate.cases files handed over by the workers.
+
+        if self.verbosity == 1:
+            self.stream.write("\n")
+        report = RunReport([ result.outcome_of(test_case.id()) for test_case in tests ],
+                           time.perf_counter() - started, self.jobs, schedule)
+        report.write_summary(self.stream)
+        if self.history is not None:
+            for outcome in report.outcomes:
+                if outcome.duration > 0 and not outcome.reused:
+                    self.history.record(outcome.test_id, outcome.duration)
+            self.history.save()
+        if self.result_store is not None:
+            self.store_outcomes(report.outcomes, result_keys)
+        return report
+
+
+    def result_keys(self, tests: list[unittest.TestCase]) -> dict[int, str]:
+        '''
+        Returns the key under which each test's outcome is stored, by index into tests,
+        for the tests of classes which can say what they depend on (see
+        VPLTestCase.result_cache_key). Keys are made before any test runs,
+        so that files the tests write can't change them.
+        '''
+        if self.result_store is None:
+            return {}
+        class_keys: dict[type, str | None] = {}
+        keys = {}
+        for index, test_case in enumerate(tests):
+            test_class = type(test_case)
+            if test_class not in class_keys:
+                try:
+                    class_keys[test_class] = test_class.result_cache_key() if hasattr(test_class, "result_cache_key") else None
+                except OSError:
+                    class_keys[test_class] = None # e.g. a file removed while it was read; the tests just run.
+            if class_keys[test_class] is not None:
+                keys[index] = hashlib.sha256(f"{class_keys[test_class]}\0{test_case.id()}".encode()).hexdigest()
+        return keys
+
+
+    def reuse_outcome(self, test: unittest.TestCase, key: str | None, result: RecordingTestResult) -> bool:
+        '''
+        Records the outcome stored for test in result, and reports it, if there is one.
+        '''
+        if key is None or (stored := self.result_store.get(key)) is None:
+            return False
+        result.outcomes[test.id()] = replace(TestOutcome(**stored), reused=True)
+        self.report_progress(result.outcomes[test.id()])
+        return True
+
+
+    def store_outcomes(self, outcomes: list[TestOutcome], result_keys: dict[int, str]) -> None:
+        '''
+        Stores the outcome of each test which ran, except errors, which are more often
+        due to the machine (e.g. a missing compiler, or a killed worker) than the test.
+        '''
+        for index, outcome in enumerate(outcomes):
+            if index in result_keys and not outcome.reused and outcome.status != "error":
+                self.result_store.put(result_keys[index], asdict(outcome))
+        self.result_store.evict()
+
+
+    def schedule(self, tests: list[unittest.TestCase], batches: list[list[int]]) -> tuple[list[list[int]], str]:
+        '''
+        Returns batches, longest expected first, and a description of the order.
+        A test which hasn't run before is assumed to take as long as the average one which has.
+        '''
+        if self.history is None:
+            return batches, ""
+        estimates = { index: self.history.expected(tests[index].id()) for batch in batches for index in batch }
+        known = [ estimate for estimate in estimates.values() if estimate is not None ]
+        average = sum(known) / len(known) if known else 0.0
+        batch_estimates = [ None if all(estimates[index] is None for index in batch)
+                            else sum(average if estimates[index] is None else estimates[index] for index in batch)
+                            for batch in batches ]
+        order, description = order_longest_first(batch_estimates, "batches")
+        return [ batches[index] for index in order ], description
+
+
+    def run_in_workers(self, tests: list[unittest.TestCase], test_indices: list[int], result: RecordingTestResult) -> str:
+        '''
+        Runs tests[test_indices] in worker processes, recording their outcomes in result,
+        and returns a description of the order they were started in. Each worker
+        reports through its own pipe, which is closed when it exits.
+        '''
+        context = multiprocessing.get_context("fork")
+        task_queue = context.Queue()
+        batches, schedule = self.schedule(tests, make_batches(tests, test_indices, self.jobs))
+        for batch in batches:
+            task_queue.put(batch)
+        num_workers = min(self.jobs, len(batches))
+        for _ in range(num_workers):
+            task_queue.put(None)
+
+        sys.stdout.flush()
+        sys.stderr.flush()
+        workers = {}
+        for _ in range(num_workers):
+            reader, writer = context.Pipe(duplex=False)
+            worker_process = context.Process(target=work, args=(tests, task_queue, writer))
+            worker_process.start()
+            writer.close() # So that reader sees the end of the pipe when the worker exits.
+            workers[reader] = worker_process
+
+        running_tests: dict[multiprocessing.connection.Connection, int] = {}
+        cases_file_writers = {}
+        try:
+            while workers:
+                for reader in multiprocessing.connection.wait(list(workers)):
+                    try:
+                        kind, payload = reader.recv()
+                    except EOFError:
+                        self.notice_exit(workers.pop(reader), running_tests.pop(reader, None), tests, result)
+                        continue
+
+                    if kind == "started":
+                        running_tests[reader] = payload
+                    elif kind == "outcome":
+                        test_index, outcome = payload
+                        del running_tests[reader]
+                        result.outcomes[tests[test_index].id()] = TestOutcome(**outcome)
+                        self.report_progress(result.outcome_of(tests[test_index].id()))
+                    elif kind == "finished":
+                        fixture_errors, writers = payload
+                        for scope, message in fixture_errors.items():
+                            result.fixture_errors[scope] = result.fixture_errors.get(scope, "") + message
+                        for directory, class_id, include_pylint, pylint_files in writers:
+                            cases_file_writers.setdefault(directory, []).append((class_id, include_pylint, pylint_files))
+        finally:
+            for worker_process in workers.values():
+                worker_process.terminate()
+                worker_process.join()
+
+        self.hand_over_cases_files(tests, cases_file_writers)
+        return schedule
+
+
+    @staticmethod
+    def notice_exit(worker_process, running_test: int | None,
+                    tests: list[unittest.TestCase], result: RecordingTestResult) -> None:
+        '''
+        Fails the test a worker was running when it exited, e.g. if it was killed, or crashed.
+        '''
+        worker_process.join()
+        if running_test is not None:
+            test_id = tests[running_test].id()
+            result.outcomes[test_id] = TestOutcome(test_id, "error",
+                f"The worker process running this test exited with code {worker_process.exitcode}.\n")
+
+
+    @staticmethod
+    def hand_over_cases_files(tests: list[unittest.TestCase], cases_file_writers: dict[str, list[tuple[str, bool, list[str]]]]) -> None:
+        '''
+        Arranges for this process to write each vpl_evaluate.cases the workers would have,
+        with the settings of the last class loaded, as a serial run would.
+        '''
+        classes_by_id = { TestWorker.class_id(type(test_case)): type(test_case) for test_case in tests }
+        load_order = list(classes_by_id)
+        for directory, writers in cases_file_writers.items():
+            class_id, include_pylint, pylint_files = max(writers, key=lambda writer: load_order.index(writer[0]))
+            writer_class = classes_by_id[class_id]
+            writer_class.set_this_dir_name()
+            session = get_session(directory)
+            session.cases_file_writer = writer_class
+            session.include_pylint = include_pylint
+            session.pylint_files = pylint_files
+
+
+def default_test_results_dir() -> str:
+    return os.path.join(cache_dir(), "test_results")
+
+
+class ParallelTestProgram(unittest.TestProgram):
+    '''
+    unittest.main, with its tests run by a ParallelTestRunner, which reuses the
+    outcomes of unchanged tests unless rerun is set, or the tests run in production
+    (see VPLTestCase.in_production_environment).
+    '''
+    def __init__(self, *args, jobs: int | None = None, rerun: bool = False, **kwargs):
+        self.jobs = jobs
+        self.rerun = rerun
+        super().__init__(*args, **kwargs)
+
+    def runTests(self):
+        result_store = None
+        if not self.rerun and not VPLTestCase.in_production_environment():
+            result_store = ResultStore(default_test_results_dir())
+        self.testRunner = ParallelTestRunner(self.jobs, verbosity=self.verbosity, history=DurationHistory(),
+                                             result_store=result_store)
+        super().runTests()
+
+
+def pop_jobs_option(argv: list[str]) -> tuple[int | None, list[str]]:
+    '''
+    Returns the number of jobs given by -j/--jobs in argv (0 meaning one per CPU),
+    and argv without that option, to be parsed by unittest.
+    '''
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("-j", "--jobs", type=int)
+    args, other_args = parser.parse_known_args(argv[1:])
+    if args.jobs == 0:
+        args.jobs = os.cpu_count() or 1
+    return args.jobs, argv[:1] + other_args
+
+
+def pop_rerun_option(argv: list[str]) -> tuple[bool, list[str]]:
+    '''
+    Returns whether argv has --rerun, and argv without it, to be parsed by unittest.
+    '''
+    return "--rerun" in argv[1:], argv[:1] + [ arg for arg in argv[1:] if arg != "--rerun" ]
+
+
+def main(module="__main__", argv: list[str] | None = None, jobs: int | None = None, **kwargs):
+    '''
+    unittest.main, run by a ParallelTestProgram: in parallel when more than one job
+    is asked for, and reusing the outcomes of unchanged tests unless --rerun is given.
+    Exported as vpltools.main, so test modules can end with
+        if __name__ == "__main__":
+            vpltools.main()
+    '''
+    argv_jobs, argv = pop_jobs_option(sys.argv if argv is None else argv)
+    rerun, argv = pop_rerun_option(argv)
+    jobs = argv_jobs or jobs or int(os.getenv("VPLTOOLS_JOBS") or 1)
+    return ParallelTestProgram(module=module, argv=argv, jobs=jobs, rerun=rerun, **kwargs)
+
+
+def test_command(argv: list[str]) -> None:
+    '''
+    python3 -m vpltools test [-j N] [--rerun] [unittest arguments], e.g. "discover -s tests".
+    Runs one job per CPU unless told otherwise.
+    '''
+    jobs, argv = pop_jobs_option(["python3 -m vpltools test"] + argv)
+    rerun, argv = pop_rerun_option(argv)
+    ParallelTestProgram(module=None, argv=argv, jobs=jobs or os.cpu_count() or 1, rerun=rerun)
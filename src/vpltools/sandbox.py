@@ -0,0 +1,297 @@
+'''
+sandbox.py -- importing a student's Python module in a child process, and calling into it.
+
+import_as_py_module normally imports the student's module into the test process
+itself, where a submission which waits for input or loops at import time stops
+every test, and one which changes global state changes it for the tests after.
+With sandbox_student_module set, a SandboxedModule imports it in a forked child
+instead, with stdin closed, optional resource limits and a time limit. Tests call
+its functions through the proxy, as they would call the module's: arguments,
+results and exceptions are pickled across a pipe, and anything printed is printed
+by the test process. A call which takes longer than call_timeout seconds, or uses
+more than cpu_seconds of CPU time, fails its test, and the child is started afresh
+for the next call. call_timeout can't be None: the test process waits for each call.
+
+Values cross the pipe as copies, so only values of built-in (or other importable,
+non-student) types can be passed and returned, and patching the test process
+(e.g. builtins.input) does not affect the child.
+'''
+import io
+import os
+import sys
+import math
+import pickle
+import time
+import signal
+import weakref
+import resource
+import traceback
+import multiprocessing
+import importlib.util
+from contextlib import redirect_stdout, redirect_stderr
+from dataclasses import asdict
+
+from vpltools.calls import CallTimeoutError, CallUsage, measure_call
+
+__unittest = True
+
+DEFAULT_IMPORT_TIMEOUT = 10.0
+DEFAULT_CALL_TIMEOUT = 10.0
+
+
+class SandboxError(RuntimeError):
+    pass
+
+
+class SandboxTimeoutError(CallTimeoutError, AssertionError):
+    '''
+    A call into a sandboxed module took too long. It is raised in the test process,
+    not in the call, which is stopped with its child, so it can be an AssertionError,
+    failing a test which calls the module's functions directly.
+    '''
+
+
+def limit_cpu_time(cpu_seconds: float) -> None:
+    '''
+    Lets this process use cpu_seconds more CPU time (in whole seconds, as RLIMIT_CPU
+    counts it) before SIGXCPU stops it.
+    '''
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    limit = math.ceil(usage.ru_utime + usage.ru_stime + cpu_seconds)
+    _, hard_limit = resource.getrlimit(resource.RLIMIT_CPU)
+    if hard_limit != resource.RLIM_INFINITY:
+        limit = min(limit, hard_limit)
+    resource.setrlimit(resource.RLIMIT_CPU, (limit, hard_limit))
+
+
+def limit_resources(memory_limit: int | None, cpu_seconds: float | None) -> None:
+    if memory_limit is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+    if cpu_seconds is not None:
+        limit_cpu_time(cpu_seconds)
+
+
+def sendable_exception(error: BaseException, module_name: str) -> BaseException:
+    '''
+    Returns error, unless its class is defined by the student's module, which the
+    test process mustn't import to unpickle it. Then a SandboxError describes it.
+    '''
+    if type(error).__module__ == module_name:
+        return SandboxError(f"{type(error).__name__}: {error}")
+    return error
+
+
+def serve_module(path: str, module_name: str, connection, memory_limit: int | None, cpu_seconds: float | None) -> None:
+    '''
+    The body of the child: imports the module at path, and then answers requests
+    from connection, until the test process closes it. The import, and each request,
+    may use cpu_seconds of CPU time.
+    '''
+    signal.signal(signal.SIGINT, signal.SIG_IGN) # Interrupting the tests stops the child with them.
+    null_input = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(null_input, 0)
+    sys.stdin = open(os.devnull)
+    limit_resources(memory_limit, cpu_seconds)
+
+    try:
+        with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+            sys.path.insert(0, os.path.dirname(path))
+            spec = importlib.util.spec_from_file_location(module_name, path)
+            module = importlib.util.module_from_spec(spec)  # type: ignore
+            sys.modules[module_name] = module
+            spec.loader.exec_module(module)                 # type: ignore
+    except BaseException:
+        connection.send(("failed", traceback.format_exc(), "", ""))
+        return
+    connection.send(("ready", None, "", ""))
+
+    while True:
+        try:
+            request, name, args, kwargs = connection.recv()
+        except EOFError:
+            return
+
+        if cpu_seconds is not None:
+            limit_cpu_time(cpu_seconds)
+        if request == "attribute":
+            if not hasattr(module, name):
+                reply = ("missing", None, "", "")
+            elif callable(value := getattr(module, name)):
+                reply = ("callable", None, "", "")
+            else:
+                reply = ("value", value, "", "")
+        elif request == "measure" and not callable(getattr(module, name, None)):
+            reply = ("raised", AttributeError(f"module '{module_name}' has no function '{name}'"), "", "")
+        elif request == "measure":
+            # args holds the call's arguments, and its memory limit. See calls.measure_call.
+            call_args, call_kwargs, max_memory = args
+            stdout, stderr = io.StringIO(), io.StringIO()
+            with redirect_stdout(stdout), redirect_stderr(stderr):
+                raised, value, usage = measure_call(getattr(module, name), call_args, call_kwargs,
+                                                    max_memory=max_memory, limit_address_space=True)
+            if raised:
+                value.__traceback__ = None
+                value = sendable_exception(value, module_name)
+            reply = ("measured", (raised, value, asdict(usage)), stdout.getvalue(), stderr.getvalue())
+        else:
+            stdout, stderr = io.StringIO(), io.StringIO()
+            with redirect_stdout(stdout), redirect_stderr(stderr):
+                try:
+                    reply = ("returned", getattr(module, name)(*args, **kwargs))
+                except BaseException as error:
+                    error.__traceback__ = None
+                    reply = ("raised", sendable_exception(error, module_name))
+            reply += (stdout.getvalue(), stderr.getvalue())
+
+        try:
+            connection.send(reply)
+        except Exception as error:
+            connection.send(("raised", SandboxError(f"The value of {name} can't be sent to the tests: {error}"), *reply[2:]))
+
+
+class StudentUnpickler(pickle.Unpickler):
+    '''
+    Refuses to unpickle anything defined by the student's module, which would import it.
+    '''
+    def __init__(self, data: bytes, module_name: str):
+        super().__init__(io.BytesIO(data))
+        self.module_name = module_name
+
+    def find_class(self, module: str, name: str):
+        if module == self.module_name or module.startswith(self.module_name + "."):
+            raise SandboxError(f"{name} is defined by the submission, so its objects can't be sent to the tests.")
+        return super().find_class(module, name)
+
+
+def stop_process(process, connection) -> None:
+    connection.close()
+    if process.is_alive():
+        process.kill()
+    process.join()
+
+
+class SandboxedFunction:
+    '''
+    Stands for a function of a sandboxed module. Calling it calls the function in the child.
+    '''
+    def __init__(self, sandbox: "SandboxedModule", name: str):
+        self.sandbox = sandbox
+        self.__name__ = name
+
+    def __call__(self, *args, **kwargs):
+        return self.sandbox._call(self.__name__, args, kwargs)
+
+    def __repr__(self) -> str:
+        return f"<sandboxed function {self.__name__}>"
+
+
+class SandboxedModule:
+    '''
+    The module at path, imported in a child process. Its attributes are looked up in the
+    child: functions are returned as SandboxedFunctions, and other values as copies.
+    Raises SandboxError if the import fails, or takes longer than import_timeout.
+    '''
+    def __init__(self, path: str, module_name: str, import_timeout: float = DEFAULT_IMPORT_TIMEOUT,
+                 call_timeout: float = DEFAULT_CALL_TIMEOUT,
+                 memory_limit: int | None = None, cpu_seconds: float | None = None):
+        if call_timeout is None:
+            raise ValueError("A sandboxed module needs a call timeout: without one, a call which never returns "
+                             + "stops every test. Set sandbox_call_timeout to a number of seconds.")
+        self._path = path
+        self._module_name = module_name
+        self._import_timeout = import_timeout
+        self._call_timeout = call_timeout
+        self._limits = (memory_limit, cpu_seconds)
+        self._process = None
+        self._start()
+
+
+    def _start(self) -> None:
+        context = multiprocessing.get_context("fork")
+        self._connection, child_connection = context.Pipe()
+        self._process = context.Process(target=serve_module, daemon=True,
+                                        args=(self._path, self._module_name, child_connection, *self._limits))
+        self._process.start()
+        child_connection.close()
+        self._finalizer = weakref.finalize(self, stop_process, self._process, self._connection)
+
+        if not self._connection.poll(self._import_timeout):
+            self._stop()
+            raise SandboxError(f"Importing {os.path.basename(self._path)} took longer than {self._import_timeout:g} seconds.")
+        try:
+            status, message, _, _ = self._receive("the import")
+        except SandboxTimeoutError as error:
+            raise SandboxError(f"Importing {os.path.basename(self._path)} failed: {error}") from None
+        if status != "ready":
+            self._stop()
+            raise SandboxError(f"Importing {os.path.basename(self._path)} failed:\n{message}")
+
+
+    def _stop(self) -> None:
+        self._finalizer()
+        self._process = None
+
+
+    def _receive(self, what: str) -> tuple:
+        try:
+            data = self._connection.recv_bytes()
+        except EOFError:
+            self._process.join()
+            exit_code = self._process.exitcode
+            self._stop()
+            if exit_code == -signal.SIGXCPU:
+                raise SandboxTimeoutError(f"{what} used more than {self._limits[1]:g} seconds of CPU time.") from None
+            raise SandboxError(f"The submission's process exited with code {exit_code} during {what}.") from None
+        return StudentUnpickler(data, self._module_name).load()
+
+
+    def _request(self, request: str, name: str, args: tuple = (), kwargs: dict = {}, timeout: float | None = None) -> tuple:
+        if self._process is None:
+            self._start()
+        self._connection.send((request, name, args, kwargs))
+        if not self._connection.poll(timeout):
+            self._stop()
+            raise SandboxTimeoutError(f"{name} took longer than {timeout:g} seconds.")
+        status, value, stdout, stderr = self._receive(name)
+        sys.stdout.write(stdout)
+        sys.stderr.write(stderr)
+        return status, value
+
+
+    def _call(self, name: str, args: tuple, kwargs: dict, timeout: float | None = None):
+        status, value = self._request("call", name, args, kwargs, timeout or self._call_timeout)
+        if status == "raised":
+            raise value
+        return value
+
+
+    def _measure(self, name: str, args: tuple, kwargs: dict, timeout: float | None = None,
+                 max_memory: int | None = None) -> tuple[bool, object, CallUsage]:
+        '''
+        Calls name with calls.measure_call in the child, returning as measure_call does.
+        A call which times out is measured here, by wall time alone.
+        '''
+        started = time.perf_counter()
+        try:
+            status, value = self._request("measure", name, (args, kwargs, max_memory), {}, timeout or self._call_timeout)
+        except SandboxTimeoutError as error:
+            return True, error, CallUsage(name, time.perf_counter() - started)
+        if status == "raised": # Not called, or its result couldn't be sent.
+            return True, value, CallUsage(name, time.perf_counter() - started)
+        raised, value, usage = value
+        return raised, value, CallUsage(**usage)
+
+
+    def __getattr__(self, name: str):
+        if name.startswith("_"):
+            raise AttributeError(name) # Not looked up in the child, like the proxy's own attributes.
+        status, value = self._request("attribute", name, timeout=self._call_timeout)
+        if status == "missing":
+            raise AttributeError(f"module '{self._module_name}' has no attribute '{name}'")
+        if status == "callable":
+            return SandboxedFunction(self, name)
+        return value
+
+
+    def __repr__(self) -> str:
+        return f"<sandboxed module '{self._module_name}' from '{self._path}'>"
@@ -0,0 +1,305 @@
+'''
+server.py -- a warm interpreter which runs the evaluations sent to it by vpltools.client.
+
+    python3 -m vpltools serve --socket PATH [-j N] [--timeout SECONDS] [--group GROUP] [--mode MODE]
+                              [--preload MODULE ...]
+
+Every evaluation VPL runs starts from nothing: Python starts, and imports vpltools
+and its dependencies, before any test runs. The server does that importing once
+(along with any --preload modules, e.g. pandas, or vpltools.sql_test_case), then
+forks a child for each request, which inherits it all, runs the requested tests
+in the client's directory, and streams their outcomes back. The tests see the
+server's environment, with only the client's USER, LOGNAME, locale (LANG,
+LANGUAGE, TZ, LC_*), and VPLTOOLS_* and VPL_* variables (see client_environment).
+Children share SQL fixture databases through VPLTOOLS_FIXTURE_CACHE. At most
+--jobs children run at once; later requests wait in a queue. As each request gets
+a fresh child, no submission's modules are seen by another's tests. A child which
+hasn't finished within --timeout seconds, e.g. running a submission which hangs,
+or waiting on a client which never sends its request, is killed, along with any
+programs it started, so that its place is given to the next request.
+
+Only the server's user may connect, by default. VPL runs each evaluation as a
+user of its own, so those users must share a group which is given --group, with
+--mode 660. The tests still run as the server's user.
+
+Requests and replies are JSON objects, one per line:
+    {"directory": ..., "tests": [ "module.Class.method", ... ], "environment": { ... }}
+    {"event": "outcome", "test_id": ..., "status": ..., "message": ..., ...}   (one per test)
+    {"event": "done"}
+'''
+import io
+import os
+import sys
+import grp
+import json
+import time
+import signal
+import socket
+import argparse
+import tempfile
+import unittest
+import selectors
+import importlib
+import traceback
+from collections import deque
+from contextlib import redirect_stdout, redirect_stderr
+from dataclasses import asdict
+
+from vpltools.outcomes import TestOutcome
+from vpltools.runner import TestWorker
+from vpltools.session import finish_sessions, iterate_tests
+
+__unittest = True
+
+# Seconds a request may take, from being started until its tests are done.
+DEFAULT_REQUEST_TIMEOUT = 300.0
+# Seconds a client may take to send its request, once connected.
+REQUEST_READ_TIMEOUT = 10.0
+# The variables of a client's environment which are passed to its tests: who is
+# being evaluated (VPLTestCase.in_production_environment() looks at USER), their
+# locale, and the settings of vpltools and VPL.
+CLIENT_VARIABLES = { "USER", "LOGNAME", "LANG", "LANGUAGE", "TZ" }
+CLIENT_VARIABLE_PREFIXES = ("VPLTOOLS_", "VPL_", "LC_")
+# Set by the server for every child, whatever the client says.
+SERVER_VARIABLES = { "VPLTOOLS_FIXTURE_CACHE" }
+
+# Permissions of the socket: only the server's user may connect.
+DEFAULT_SOCKET_MODE = 0o600
+
+
+class ServerError(RuntimeError):
+    pass
+
+
+def send_event(stream, event: str, **fields) -> None:
+    stream.write(json.dumps({ "event": event, **fields }) + "\n")
+    stream.flush()
+
+
+def client_environment(environment: dict[str, str]) -> dict[str, str]:
+    '''
+    Returns the variables of a client's environment which its tests may see: those
+    in CLIENT_VARIABLES, or beginning with one of CLIENT_VARIABLE_PREFIXES. The rest,
+    like PATH, PYTHONPATH and LD_PRELOAD, are the server's, as its imported modules
+    and fixtures were made with them.
+    '''
+    return { name: value for name, value in environment.items()
+             if (name in CLIENT_VARIABLES or name.startswith(CLIENT_VARIABLE_PREFIXES))
+                and name not in SERVER_VARIABLES }
+
+
+def run_evaluation(request: dict, stream) -> None:
+    '''
+    Runs the tests request names, in its directory, with the variables of
+    its environment which clients may set, sending each outcome to stream
+    as soon as it is known.
+    '''
+    os.environ.update(client_environment(request.get("environment", {})))
+    os.chdir(request["directory"])
+    sys.path.insert(0, request["directory"]) # As python3 -m unittest would.
+
+    worker = TestWorker()
+    for test_id in request["tests"]:
+        try:
+            tests = list(iterate_tests(unittest.defaultTestLoader.loadTestsFromName(test_id)))
+        except Exception:
+            send_event(stream, "outcome", **asdict(TestOutcome(test_id, "error", traceback.format_exc())))
+            continue
+        for test in tests:
+            send_event(stream, "outcome", **asdict(worker.run_test(test)))
+
+    # As when the tests are run by unittest, classes are torn down and sessions
+    # finished at the end, but nobody is listening to what they print.
+    with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+        worker.finish()
+        finish_sessions()
+    send_event(stream, "done")
+
+
+class EvaluationServer:
+    '''
+    Listens on a Unix socket, forking a child to run each request, at most jobs at once,
+    and killing any which takes longer than timeout seconds.
+    '''
+    def __init__(self, socket_path: str, jobs: int | None = None, preload: list[str] = [],
+                 timeout: float = DEFAULT_REQUEST_TIMEOUT, group: str | None = None, mode: int = DEFAULT_SOCKET_MODE):
+        self.socket_path = os.path.abspath(socket_path)
+        self.jobs = jobs or os.cpu_count() or 1
+        self.timeout = timeout
+        self.pending: deque[socket.socket] = deque()
+        # The deadline, by time.monotonic(), of each running child.
+        self.children: dict[int, float] = {}
+
+        for module_name in preload:
+            importlib.import_module(module_name)
+
+        self.fixture_cache = None
+        if not os.getenv("VPLTOOLS_FIXTURE_CACHE"):
+            self.fixture_cache = tempfile.TemporaryDirectory(prefix="vpltools_fixtures_")
+            os.environ["VPLTOOLS_FIXTURE_CACHE"] = self.fixture_cache.name
+
+        self.remove_stale_socket()
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(self.socket_path)
+        if group is not None:
+            os.chown(self.socket_path, -1, grp.getgrnam(group).gr_gid)
+        os.chmod(self.socket_path, mode)
+        self.listener.listen()
+        self.listener.setblocking(False)
+
+        # SIGCHLD wakes the selector, so finished children are replaced at once.
+        self.wakeup_reader, self.wakeup_writer = os.pipe()
+        os.set_blocking(self.wakeup_reader, False)
+        os.set_blocking(self.wakeup_writer, False)
+        signal.set_wakeup_fd(self.wakeup_writer)
+        signal.signal(signal.SIGCHLD, lambda signal_number, frame: None)
+
+
+    def remove_stale_socket(self) -> None:
+        if not os.path.exists(self.socket_path):
+            return
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(self.socket_path)
+            except OSError:
+                os.unlink(self.socket_path) # Left by a server which didn't shut down.
+                return
+        raise ServerError(f"A server is already listening on {self.socket_path}.")
+
+
+    def serve_forever(self) -> None:
+        selector = selectors.DefaultSelector()
+        selector.register(self.listener, selectors.EVENT_READ)
+        selector.register(self.wakeup_reader, selectors.EVENT_READ)
+        while True:
+            for key, _ in selector.select(self.seconds_to_next_deadline()):
+                if key.fileobj is self.listener:
+                    self.accept_requests()
+                else:
+                    while True:
+                        try:
+                            if not os.read(self.wakeup_reader, 4096):
+                                break
+                        except BlockingIOError:
+                            break
+            self.kill_overdue_children()
+            self.reap_children()
+            self.start_pending()
+
+
+    def accept_requests(self) -> None:
+        while True:
+            try:
+                connection, _ = self.listener.accept()
+            except BlockingIOError:
+                return
+            self.pending.append(connection)
+
+
+    def seconds_to_next_deadline(self) -> float | None:
+        if not self.children:
+            return None
+        return max(0.0, min(self.children.values()) - time.monotonic())
+
+
+    def kill_overdue_children(self) -> None:
+        '''
+        Kills each child which has passed its deadline, with every process it started.
+        They are reaped, and their places given to waiting requests, once SIGCHLD arrives.
+        '''
+        now = time.monotonic()
+        for pid, deadline in self.children.items():
+            if deadline <= now:
+                try:
+                    os.killpg(pid, signal.SIGKILL) # Each child leads its own process group.
+                except ProcessLookupError:
+                    pass
+
+
+    def reap_children(self) -> None:
+        while self.children:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.children.clear()
+                return
+            if pid == 0:
+                return
+            self.children.pop(pid, None)
+
+
+    def start_pending(self) -> None:
+        while self.pending and len(self.children) < self.jobs:
+            connection = self.pending.popleft()
+            pid = os.fork()
+            if pid == 0:
+                self.evaluate(connection)
+            try:
+                os.setpgid(pid, pid) # As the child does, in case it hasn't yet.
+            except OSError:
+                pass
+            self.children[pid] = time.monotonic() + self.timeout
+            connection.close()
+
+
+    def evaluate(self, connection: socket.socket) -> None:
+        '''
+        The body of a child: reads one request from connection, runs it, and exits.
+        '''
+        exit_code = 0
+        try:
+            os.setpgid(0, 0) # So that the parent can kill the programs the tests start, too.
+            signal.set_wakeup_fd(-1)
+            for signal_number in (signal.SIGCHLD, signal.SIGTERM):
+                signal.signal(signal_number, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            self.listener.close()
+            for waiting_connection in self.pending:
+                waiting_connection.close()
+            os.close(self.wakeup_reader)
+            os.close(self.wakeup_writer)
+
+            # A client which connects, then sends nothing, mustn't hold the child until its deadline.
+            connection.settimeout(min(REQUEST_READ_TIMEOUT, self.timeout))
+            with connection, connection.makefile("rw") as stream:
+                request = json.loads(stream.readline())
+                connection.settimeout(None)
+                run_evaluation(request, stream)
+        except BaseException:
+            traceback.print_exc()
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+
+    def close(self) -> None:
+        self.listener.close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        if self.fixture_cache is not None:
+            self.fixture_cache.cleanup()
+
+
+def main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(prog="python3 -m vpltools serve",
+        description="Run the tests requested by vpltools.client in warm, forked interpreters.")
+    parser.add_argument("--socket", required=True, help="path of the Unix socket to listen on")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="evaluations to run at once (default: one per CPU)")
+    parser.add_argument("-t", "--timeout", type=float, default=DEFAULT_REQUEST_TIMEOUT,
+                        help=f"seconds allowed for each evaluation (default: {DEFAULT_REQUEST_TIMEOUT:g})")
+    parser.add_argument("--group", default=None, help="group to give the socket, e.g. one shared by the users VPL evaluates as")
+    parser.add_argument("--mode", type=lambda text: int(text, 8), default=DEFAULT_SOCKET_MODE,
+                        help=f"permissions of the socket, in octal (default: {DEFAULT_SOCKET_MODE:o}; 660 with --group)")
+    parser.add_argument("--preload", action="append", default=[], metavar="MODULE",
+                        help="module to import before serving, e.g. pandas (may be repeated)")
+    args = parser.parse_args(argv)
+
+    signal.signal(signal.SIGTERM, signal.default_int_handler) # Shut down cleanly when stopped.
+    server = EvaluationServer(args.socket, args.jobs, args.preload, args.timeout, args.group, args.mode)
+    print(f"Serving evaluations on {server.socket_path}, {server.jobs} at a time.", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
@@ -0,0 +1,179 @@
+'''
+session.py -- work shared by every test class in one directory, within one process.
+
+An assignment's tests may be split between several VPLTestCase subclasses, in one
+or more test modules. Each class needs the same compiled student and key programs,
+the same imported Python modules, and the same workspace, so a DirectorySession
+keeps them for all of them. vpl_evaluate.cases, which describes every class in the
+directory, is written once, when the session finishes, instead of once per class.
+A session finishes when the last of its classes loaded for the run is torn down,
+and the test runners (see runner.py, records.py and server.py) finish every
+session when they have run their tests. Sessions still open when the process
+exits, e.g. because only some of a module's classes were run, are finished then.
+'''
+import os
+import sys
+import atexit
+import unittest
+from types import ModuleType
+from dataclasses import dataclass, field
+
+from vpltools.supported_languages import SupportedLanguageProgram
+from vpltools.workspace import make_workspace, link_into_workspace, remove_workspace
+
+__unittest = True
+
+
+@dataclass
+class DirectorySession:
+    '''
+    What the test classes in directory share. cases_file_writer is the class
+    (the last one torn down) whose settings vpl_evaluate.cases is written with,
+    and include_pylint whether that class's student program, made of
+    pylint_files, is checked by pylint. classes_to_tear_down are the classes
+    whose teardown the session waits for before it finishes.
+    '''
+    directory: str
+    programs: dict[tuple[str, str, tuple[str, ...]], SupportedLanguageProgram] = field(default_factory=dict)
+    modules: dict[str, ModuleType | None] = field(default_factory=dict)
+    workspace: str | None = None
+    cases_file_writer: type | None = None
+    include_pylint: bool = False
+    pylint_files: list[str] = field(default_factory=list)
+    classes_to_tear_down: set[type] | None = None
+
+
+    def get_workspace(self) -> str:
+        '''
+        Returns this session's private workspace, creating it on first use.
+        '''
+        if self.workspace is None:
+            self.workspace = make_workspace(prefix=f"vpltools_{os.path.basename(self.directory)}_", near=self.directory)
+            link_into_workspace(self.workspace, self.directory)
+        return self.workspace
+
+
+    def forget(self, changed_paths: set[str]) -> None:
+        '''
+        Forgets programs compiled from, and modules imported from, any of changed_paths.
+        '''
+        for key in list(self.programs):
+            work_dir, _, source_files = key
+            if any(os.path.join(work_dir, source_file) in changed_paths for source_file in source_files):
+                del self.programs[key]
+        for module_path in changed_paths.intersection(self.modules):
+            del self.modules[module_path]
+
+
+    def class_set_up(self, test_class: type, base_class: type) -> None:
+        '''
+        Notes that test_class is being set up. The first class set up in a run makes
+        the session wait for every class derived from base_class, with tests, in the
+        modules loaded from test_class's directory.
+        '''
+        if self.classes_to_tear_down is None:
+            self.classes_to_tear_down = loaded_test_classes(test_class, base_class)
+        self.classes_to_tear_down.add(test_class)
+
+
+    def class_torn_down(self, test_class: type) -> None:
+        '''
+        Notes that test_class has been torn down, finishing the session if it was the last.
+        '''
+        if self.classes_to_tear_down is None:
+            return
+        self.classes_to_tear_down.discard(test_class)
+        if not self.classes_to_tear_down and not _finishing_held:
+            self.finish()
+
+
+    def finish(self) -> None:
+        '''
+        Writes vpl_evaluate.cases, if any class asked for it, and removes the workspace.
+        '''
+        if self.cases_file_writer is not None:
+            cases_file_writer, self.cases_file_writer = self.cases_file_writer, None
+            cases_file_writer.make_vpl_evaluate_cases(self.include_pylint, self.pylint_files)
+        if self.workspace is not None:
+            remove_workspace(self.workspace)
+            self.workspace = None
+        self.classes_to_tear_down = None
+
+
+def loaded_test_classes(test_class: type, base_class: type) -> set[type]:
+    '''
+    Returns the classes derived from base_class, with tests that aren't skipped, defined
+    in the modules loaded from the directory test_class's module was loaded from.
+    '''
+    directory = os.path.dirname(os.path.abspath(sys.modules[test_class.__module__].__file__))
+    loader = unittest.TestLoader()
+    classes = set()
+    for module in list(sys.modules.values()):
+        module_file = getattr(module, "__file__", None)
+        if module_file is None or os.path.dirname(os.path.abspath(module_file)) != directory:
+            continue
+        for value in list(vars(module).values()):
+            if (isinstance(value, type) and issubclass(value, base_class) and value.__module__ == module.__name__
+                    and not getattr(value, "__unittest_skip__", False) and loader.getTestCaseNames(value)):
+                classes.add(value)
+    return classes
+
+
+_sessions: dict[str, DirectorySession] = {}
+_finishing_held = False
+
+
+def get_session(directory: str) -> DirectorySession:
+    '''
+    Returns the session for directory, starting one if necessary.
+    '''
+    directory = os.path.abspath(directory)
+    if directory not in _sessions:
+        if not _sessions:
+            atexit.register(finish_sessions)
+        _sessions[directory] = DirectorySession(directory)
+    return _sessions[directory]
+
+
+def all_sessions() -> list[DirectorySession]:
+    return list(_sessions.values())
+
+
+def finish_sessions() -> None:
+    for session in all_sessions():
+        session.finish()
+
+
+def forget_sessions(hold: bool = False) -> None:
+    '''
+    Forgets every session without finishing it. A forked process calls this, so that
+    it neither writes its parent's files nor removes its parent's workspaces. With
+    hold, sessions no longer finish when their classes are torn down, but only
+    when finish_sessions() is called.
+    '''
+    global _finishing_held
+    _sessions.clear()
+    _finishing_held = _finishing_held or hold
+
+
+def discover_tests(directory: str, pattern: str = "test*.py") -> unittest.TestSuite:
+    '''
+    Discovers the tests in directory's modules matching pattern. Modules are named as
+    unittest named them, when it discovered the tests being run, so that they aren't
+    imported again under new names.
+    '''
+    top_level_dir = getattr(unittest.defaultTestLoader, "_top_level_dir", None)
+    if top_level_dir is None or os.path.relpath(directory, top_level_dir).startswith(os.pardir):
+        top_level_dir = directory
+    return unittest.TestLoader().discover(directory, pattern=pattern, top_level_dir=top_level_dir)
+
+
+def iterate_tests(suite: unittest.TestSuite):
+    '''
+    Yields each test in suite, however deeply its suites are nested.
+    '''
+    for test_item in suite:
+        if isinstance(test_item, unittest.TestSuite):
+            yield from iterate_tests(test_item)
+        else:
+            yield test_item
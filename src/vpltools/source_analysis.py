@@ -0,0 +1,206 @@
+'''
+source_analysis.py -- what can be learned about a Python file without running it.
+
+Basic tests (see basic_tests.py) which only need the source are run on its syntax
+tree, before the file is imported: so they run even when importing it fails, or
+would wait for input. Each file is parsed once, however many checks look at it,
+and parsed again only if its contents change.
+'''
+import ast
+import hashlib
+from dataclasses import dataclass
+from functools import cached_property
+
+__unittest = True
+
+# Loops, counted by loop_depth. Each "for" of a comprehension counts as one too.
+LOOP_NODES = (ast.For, ast.AsyncFor, ast.While, ast.comprehension)
+# Each of these starts a new scope, whose loops run when it is called, not where it is defined.
+SCOPE_NODES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef)
+
+
+def is_main_guard(statement: ast.stmt) -> bool:
+    '''
+    True for if __name__ == "__main__":, whose body doesn't run on import.
+    '''
+    return (isinstance(statement, ast.If)
+            and isinstance(test := statement.test, ast.Compare)
+            and isinstance(test.left, ast.Name) and test.left.id == "__name__"
+            and len(test.comparators) == 1
+            and isinstance(test.comparators[0], ast.Constant) and test.comparators[0].value == "__main__")
+
+
+def assigned_names(target: ast.expr) -> list[ast.Name]:
+    '''
+    Returns the names bound by an assignment to target, e.g. a, b and c for a, (b, *c) = ...
+    '''
+    if isinstance(target, ast.Name):
+        return [ target ]
+    if isinstance(target, (ast.Tuple, ast.List)):
+        return [ name for element in target.elts for name in assigned_names(element) ]
+    if isinstance(target, ast.Starred):
+        return assigned_names(target.value)
+    return [] # e.g. an attribute or a subscript, which binds no new name.
+
+
+@dataclass(eq=False)
+class ParsedSource:
+    '''
+    The syntax tree of a Python file, and facts about it, each worked out when first asked for.
+    '''
+    tree: ast.Module
+
+
+    @cached_property
+    def statements_run_on_import(self) -> list[ast.stmt]:
+        '''
+        The module level statements, including those inside module level if, for,
+        while, with and try statements, but not inside if __name__ == "__main__":.
+        '''
+        statements = []
+        waiting = list(self.tree.body)
+        while waiting:
+            statement = waiting.pop(0)
+            if is_main_guard(statement):
+                continue
+            statements.append(statement)
+            if isinstance(statement, (ast.If, ast.For, ast.AsyncFor, ast.While)):
+                waiting.extend(statement.body + statement.orelse)
+            elif isinstance(statement, (ast.With, ast.AsyncWith)):
+                waiting.extend(statement.body)
+            elif isinstance(statement, ast.Try):
+                waiting.extend(statement.body + statement.orelse + statement.finalbody)
+                for handler in statement.handlers:
+                    waiting.extend(handler.body)
+        return statements
+
+
+    @cached_property
+    def global_variables(self) -> list[ast.Name]:
+        '''
+        The names which importing the file binds to values other than functions,
+        classes and modules. Dunder names, like __author__, are not counted.
+        '''
+        names = []
+        for statement in self.statements_run_on_import:
+            if isinstance(statement, ast.Assign) and not isinstance(statement.value, ast.Lambda):
+                names.extend(name for target in statement.targets for name in assigned_names(target))
+            elif isinstance(statement, ast.AnnAssign) and statement.value is not None and not isinstance(statement.value, ast.Lambda):
+                names.extend(assigned_names(statement.target))
+            elif isinstance(statement, ast.AugAssign):
+                names.extend(assigned_names(statement.target))
+            elif isinstance(statement, (ast.For, ast.AsyncFor)):
+                names.extend(assigned_names(statement.target))
+            elif isinstance(statement, (ast.With, ast.AsyncWith)):
+                names.extend(name for item in statement.items if item.optional_vars is not None
+                             for name in assigned_names(item.optional_vars))
+        return [ name for name in names if not (name.id.startswith("__") and name.id.endswith("__")) ]
+
+
+    @cached_property
+    def module_level_functions(self) -> set[str]:
+        return { statement.name for statement in self.statements_run_on_import
+                 if isinstance(statement, (ast.FunctionDef, ast.AsyncFunctionDef)) }
+
+
+    @cached_property
+    def imports(self) -> list[tuple[str, int]]:
+        '''
+        The full name and line of each module imported anywhere in the file, including
+        those imported with __import__("name") or importlib.import_module("name").
+        '''
+        imported = []
+        for node in ast.walk(self.tree):
+            if isinstance(node, ast.Import):
+                imported.extend((alias.name, node.lineno) for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module is not None and node.level == 0:
+                imported.append((node.module, node.lineno))
+            elif (isinstance(node, ast.Call) and node.args
+                  and isinstance(node.args[0], ast.Constant) and isinstance(node.args[0].value, str)
+                  and ((isinstance(node.func, ast.Name) and node.func.id == "__import__")
+                       or (isinstance(node.func, ast.Attribute) and node.func.attr == "import_module"))):
+                imported.append((node.args[0].value, node.lineno))
+        return imported
+
+
+    @cached_property
+    def call_graph(self) -> dict[str, set[str]]:
+        '''
+        For each function or method defined in the file, the names of the functions and
+        methods it calls: f(...) calls f, and self.f(...) or cls.f(...) calls f.
+        Functions defined inside a function count as part of it.
+        '''
+        graph: dict[str, set[str]] = {}
+
+        def visit(node: ast.AST, caller: str | None) -> None:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and caller is None:
+                caller = node.name
+                graph.setdefault(caller, set())
+            if isinstance(node, ast.Call) and caller is not None:
+                if isinstance(node.func, ast.Name):
+                    graph[caller].add(node.func.id)
+                elif (isinstance(node.func, ast.Attribute) and isinstance(node.func.value, ast.Name)
+                      and node.func.value.id in ("self", "cls")):
+                    graph[caller].add(node.func.attr)
+            for child in ast.iter_child_nodes(node):
+                visit(child, caller)
+
+        visit(self.tree, None)
+        return { caller: callees & graph.keys() for caller, callees in graph.items() }
+
+
+    @cached_property
+    def recursive_functions(self) -> set[str]:
+        '''
+        The functions which call themselves, directly or through other functions in the file.
+        '''
+        recursive = set()
+        for function in self.call_graph:
+            reached = set()
+            waiting = list(self.call_graph[function])
+            while waiting:
+                callee = waiting.pop()
+                if callee not in reached:
+                    reached.add(callee)
+                    waiting.extend(self.call_graph[callee])
+            if function in reached:
+                recursive.add(function)
+        return recursive
+
+
+    @cached_property
+    def deepest_loop(self) -> tuple[int, int]:
+        '''
+        How deeply loops are nested, at most, and the line of the innermost loop
+        there, or (0, 0) for a file without loops.
+        '''
+        deepest = (0, 0)
+
+        def visit(node: ast.AST, depth: int) -> None:
+            nonlocal deepest
+            if isinstance(node, SCOPE_NODES):
+                depth = 0
+            if isinstance(node, LOOP_NODES):
+                depth += 1
+                if depth > deepest[0]:
+                    deepest = (depth, getattr(node, "lineno", None) or node.target.lineno)
+            for child in ast.iter_child_nodes(node):
+                visit(child, depth)
+
+        visit(self.tree, 0)
+        return deepest
+
+
+_parsed: dict[str, ParsedSource] = {} # keyed by the SHA-256 of the file's contents
+
+
+def parse_source(path: str) -> ParsedSource:
+    '''
+    Returns the ParsedSource for the file at path. Raises SyntaxError if it isn't valid Python.
+    '''
+    with open(path, "rb") as source_fo:
+        contents = source_fo.read()
+    digest = hashlib.sha256(contents).hexdigest()
+    if digest not in _parsed:
+        _parsed[digest] = ParsedSource(ast.parse(contents, filename=path))
+    return _parsed[digest]
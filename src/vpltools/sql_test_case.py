@@ -1,16 +1,23 @@
 # from typing import Type
+from __future__ import annotations
+
 import re
 import sys
 import abc
 import os.path
+import hashlib
 import subprocess
 import unittest
 import sqlite3 as sl
 
-import mariadb
-import pandas as pd
 from enum import Enum
 from itertools import permutations
+from typing import TYPE_CHECKING
+
+# pandas and mariadb are imported where they're used, so that importing vpltools,
+# e.g. for vpltools.client, doesn't wait for them.
+if TYPE_CHECKING:
+    import pandas as pd
 
 import vpltools
 
@@ -43,6 +50,7 @@ class Database(abc.ABC):
 
     @abc.abstractmethod
     def run_query(self, query: str) -> pd.DataFrame:
+        import pandas as pd
         return pd.read_sql_query(query, self.conn)
     
 
@@ -67,6 +75,7 @@ class MariaDBPersistentDatabase(Database):
             raise RuntimeError("Couldn't initialize MariaDB database.\nPlease send the complete "
                                + "traceback from this error message to your instructor.")
         
+        import mariadb
         try:
             self.conn = mariadb.connect(
                 user=user,
@@ -113,12 +122,52 @@ class InMemoryTestingDatabase(Database):
     An object representing an ephemeral SQLite 3 database.
     setup_script_name : string representing an SQL script which builds a database.
     '''
+    # If this environment variable names a directory, each database built by a setup
+    # script is saved there, and later copied from there instead of being rebuilt.
+    fixture_cache_variable = "VPLTOOLS_FIXTURE_CACHE"
+
+    # Databases already built in this process, keyed by a hash of their setup script,
+    # so that every test class using the same script gets a copy of the same build.
+    built_databases: dict[str, sl.Connection] = {}
+
     def __init__(self, setup_script_name: str):
         self.conn = sl.connect(":memory:")
         with open(setup_script_name, 'r') as fo:
             script_contents = fo.read()
-            
-        self.cursor = self.conn.executescript(script_contents)
+
+        script_hash = hashlib.sha256(script_contents.encode()).hexdigest()
+        if script_hash not in self.built_databases:
+            self.built_databases[script_hash] = self.build_database(script_contents, script_hash)
+        self.built_databases[script_hash].backup(self.conn)
+        self.cursor = self.conn.cursor()
+
+
+    @classmethod
+    def build_database(cls, script_contents: str, script_hash: str) -> sl.Connection:
+        '''
+        Returns an in-memory database built by script_contents, copied from
+        the fixture cache directory if it has been built there before.
+        '''
+        built_db = sl.connect(":memory:", check_same_thread=False)
+        cache_dir = os.getenv(cls.fixture_cache_variable)
+        if not cache_dir:
+            built_db.executescript(script_contents)
+            return built_db
+
+        cached_db_path = os.path.join(cache_dir, f"{script_hash}.sqlite3")
+        if os.path.exists(cached_db_path):
+            cached_db = sl.connect(cached_db_path)
+            cached_db.backup(built_db)
+            cached_db.close()
+        else:
+            built_db.executescript(script_contents)
+            # Write to a temporary name, so that other processes never see a partial copy.
+            temporary_db_path = f"{cached_db_path}.{os.getpid()}"
+            temporary_db = sl.connect(temporary_db_path)
+            built_db.backup(temporary_db)
+            temporary_db.close()
+            os.replace(temporary_db_path, cached_db_path)
+        return built_db
 
 
     def run_query(self, query: str) -> pd.DataFrame:
@@ -378,6 +427,7 @@ class TestSQLSelectQuery(TestSQLQuery):
         Only one student source file is supported; if more than one is provided, there is 
         no guarantee which one will be used.
         '''
+        import pandas as pd
         db_err = None
         use_key_file = key_source_file if key_source_file else self.key_source_files[0]
         try:
@@ -6,6 +6,8 @@ import subprocess
 
 from typing import Type
 
+from vpltools.process_usage import run_measured
+
 __unittest = True
 
 class NoProgramError(RuntimeError):
@@ -100,6 +102,16 @@ class SupportedLanguageProgram(abc.ABC):
         Executes the program represented by the calling object in a subprocess.
         '''
         raise NotImplementedError
+
+
+    def run_command(self, command: list[str], input="", measure_usage=False, **kwargs) -> subprocess.CompletedProcess:
+        '''
+        Runs command with subprocess.run, or, with measure_usage, with
+        process_usage.run_measured, whose result also holds what the run cost.
+        '''
+        if measure_usage:
+            return run_measured(command, input=input, **kwargs)
+        return subprocess.run(command, input=input, **kwargs)
         
 
 
@@ -124,7 +136,7 @@ class CProgram(SupportedLanguageProgram):
     
 
     def run(self, cli_args, input="", **kwargs):
-        return subprocess.run([self.executable_name, *cli_args], input=input, **kwargs)
+        return self.run_command([self.executable_name, *cli_args], input, **kwargs)
 
     
 
@@ -149,7 +161,7 @@ class CPPProgram(SupportedLanguageProgram):
     
 
     def run(self, cli_args, input="", **kwargs):
-        return subprocess.run([self.executable_name, *cli_args], input=input, **kwargs)
+        return self.run_command([self.executable_name, *cli_args], input, **kwargs)
     
 
 
@@ -177,7 +189,7 @@ class JavaProgram(SupportedLanguageProgram):
 
 
     def run(self, cli_args, input="", **kwargs):
-        return subprocess.run(["java", self.executable_name, *cli_args], input=input, **kwargs)
+        return self.run_command(["java", self.executable_name, *cli_args], input, **kwargs)
     
 
     def find_main_and_set_exec_name(self) -> str:
@@ -224,7 +236,7 @@ class PythonProgram(SupportedLanguageProgram):
     
 
     def run(self, cli_args, input="", **kwargs):
-        return subprocess.run([self.PYTHON_COMMAND, self.executable_name, *cli_args], input=input, **kwargs)
+        return self.run_command([self.PYTHON_COMMAND, self.executable_name, *cli_args], input, **kwargs)
 
 
 
@@ -277,7 +289,7 @@ class Fortran90Program(SupportedLanguageProgram):
     
 
     def run(self, cli_args, input="", **kwargs):
-        return subprocess.run([self.executable_name, *cli_args], input=input, **kwargs)
+        return self.run_command([self.executable_name, *cli_args], input, **kwargs)
 
 
 
@@ -297,3 +309,8 @@ OBJECT_REPRESENTING_PROGRAM_IN_LANGUAGE: dict[SupportedLanguages, Type[Supported
     SupportedLanguages.SQL      :   SQLQuery,
     SupportedLanguages.Fortran90:   Fortran90Program,
 }
+
+# Maps each file extension to the language it indicates, e.g. ".py" to SupportedLanguages.Python.
+LANGUAGE_FOR_EXTENSION: dict[str, SupportedLanguages] = {
+    language.value.extension: language for language in OBJECT_REPRESENTING_PROGRAM_IN_LANGUAGE
+}
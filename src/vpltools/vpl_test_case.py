@@ -4,9 +4,16 @@ import sys
 import unittest
 import warnings
 import importlib
+import importlib.util
+import math
+import time
+import hashlib
+import reprlib
+import subprocess
 from types import FunctionType
 from copy import deepcopy
 import contextlib
+from concurrent.futures import ThreadPoolExecutor
 from vpltools.supported_languages import (
     SupportedLanguages, 
     SupportedLanguageProgram,
@@ -14,10 +21,25 @@ from vpltools.supported_languages import (
     NoProgramError, 
     OBJECT_REPRESENTING_PROGRAM_IN_LANGUAGE
 )
-from vpltools.basic_tests import run_basic_tests
+from vpltools.basic_tests import run_basic_tests, run_static_basic_tests, is_static_basic_test
 from vpltools.make_vpl_evaluate_cases import make_cases_file_from_list, GradeReduction
+from vpltools.session import get_session, discover_tests, iterate_tests
+from vpltools.manifest import get_manifest, case_attributes
+from vpltools.directory_index import get_directory_index, language_of, SUPPORTED_EXTENSIONS
+from vpltools.resultstore import hash_paths, vpltools_version, environment_fingerprint
+from vpltools.durations import DurationHistory, order_shortest_first
+from vpltools.sandbox import SandboxedModule, SandboxError, DEFAULT_IMPORT_TIMEOUT, DEFAULT_CALL_TIMEOUT
+from vpltools.calls import measure_call, describe_call, time_limit, CallTimeoutError, CallUsage
+from vpltools.complexity import best_times, fit_growth_exponent_robust, describe_growth
+from vpltools.differential import input_random, shrink
+from dataclasses import asdict
 
 __unittest = True
+
+# Written to SOURCE_DIR_NAME by the first case to fail when fail_fast applies.
+# __main__, which pre_vpl_run.sh runs before each evaluation, removes it.
+FAILED_CASE_MARKER = ".vpltools_failed_case"
+
 # TODO: Remove student_program_name attribute. It's confusing. Call it student_program_base_name
 class VPLTestCase(unittest.TestCase):
     '''
@@ -37,6 +59,15 @@ class VPLTestCase(unittest.TestCase):
                               not run on Instructor solutions.
         - include_pylint    : (Python submissions only) boolean flag indicating if a
                               Pylint case should be added to vpl_evaluate.cases.
+        - pylint_checks     : the PyLint checks (e.g. "unused-import") that case enables,
+                              and no others. None enables them all. See lint.py.
+        - isolated_workspace: boolean flag. When set, programs are compiled and run in a
+                              private copy of the directory, so that several runs can
+                              share one directory. See setUpClass.
+        - fail_fast         : boolean flag. With GradeReduction.AbsoluteReduction, stops
+                              grading at the first failure. See use_fail_fast.
+        - sandbox_student_module: boolean flag. When set, the student's Python program is
+                              imported in a child process, with time limits. See sandbox.py.
     '''
     # NOTE: This class includes several mutable (e.g., list) class attributes.
     # Subclasses are meant to override the default values as needed. When subclasses
@@ -77,6 +108,66 @@ class VPLTestCase(unittest.TestCase):
     run_basic_tests = []
 
     include_pylint = False
+    pylint_checks: list[str] | None = None
+
+    # Set to the socket of an evaluation server (python3 -m vpltools serve --socket ...)
+    # to have vpl_evaluate.cases run each test through it, with vpltools.client.
+    evaluation_server_socket: str | None = None
+
+    # Set to True to have vpl_evaluate.cases run each test with vpltools.records, which
+    # prints a JSON record of its outcome, and to pass each case on that record, rather
+    # than on unittest's text. See python3 -m vpltools evaluate.
+    result_records = False
+
+    # Set to True (or set the VPLTOOLS_ISOLATED_WORKSPACE environment variable to 1)
+    # to compile, run and write output files in a private workspace.
+    isolated_workspace = False
+
+    # Set to True, with GradeReduction.AbsoluteReduction, to skip every case after the
+    # first to fail, in production. The grade is already 0 by then.
+    fail_fast = False
+
+    # Set to True to import student Python programs in a child process (see sandbox.py),
+    # so that they can't hang or change the test process. Calls are limited to
+    # sandbox_call_timeout seconds (which can't be None when sandboxed), and to
+    # sandbox_cpu_seconds of CPU time each, and the child's address space to
+    # sandbox_memory_limit bytes.
+    sandbox_student_module = False
+    sandbox_import_timeout = DEFAULT_IMPORT_TIMEOUT
+    sandbox_call_timeout: float | None = DEFAULT_CALL_TIMEOUT
+    sandbox_cpu_seconds: float | None = None
+    sandbox_memory_limit: int | None = None
+
+    # Used by assertScalesLike. Each program runs scaling_warmup times untimed on each
+    # input size, then scaling_repeats times, and the best time is kept. A run longer
+    # than scaling_time_limit seconds is stopped. The student's growth exponent may
+    # exceed the key's by scaling_tolerance.
+    scaling_input_sizes = (250, 500, 1000, 2000, 4000)
+    scaling_repeats = 5
+    scaling_warmup = 1
+    scaling_time_limit = 10.0
+    scaling_tolerance = 0.5
+
+    # Used by assertUsageLike. The student's program may use budget_time_factor times the
+    # CPU time of the key's, and budget_memory_factor times its peak memory. Each program
+    # is run until about budget_timing_seconds have been spent on it (at most
+    # budget_max_repeats times), and its best run is compared.
+    budget_time_factor = 3.0
+    budget_memory_factor = 2.0
+    budget_timing_seconds = 1.0
+    budget_max_repeats = 10
+
+    # Used by differential_test. differential_inputs inputs are compared, unless
+    # differential_budget_seconds run out first. Input number i is drawn from a
+    # random.Random seeded with differential_seed and i, so every run tries the same
+    # inputs. Programs run in subprocesses are run differential_jobs inputs at a time
+    # (by default, one per CPU), and stopped after differential_timeout seconds.
+    differential_inputs = 100
+    differential_budget_seconds = 30.0
+    differential_seed: int | str = 0
+    differential_timeout = 5.0
+    differential_jobs: int | None = None
+    differential_shrink_attempts = 200
 
     # Default settings for running in a "development environment"
     verbose = True
@@ -129,6 +220,13 @@ class VPLTestCase(unittest.TestCase):
         if cls.this_dir_name_override is not None:
             cls.THIS_DIR_NAME = cls.this_dir_name_override
 
+        # Where the tests are, and where vpl_evaluate.cases is written. THIS_DIR_NAME
+        # is changed to a private workspace when isolated_workspace is set.
+        cls.SOURCE_DIR_NAME = cls.THIS_DIR_NAME
+        # Compiled programs, imported modules and the workspace are shared with
+        # every other class whose tests are in the same directory.
+        cls.session = get_session(cls.SOURCE_DIR_NAME)
+
 
     @classmethod
     def in_production_environment(cls):
@@ -137,19 +235,35 @@ class VPLTestCase(unittest.TestCase):
         - asking if the username is of the format used by the vpl jail server
         - asking if we are in that user's home directory
         If both of these are true, we convict on circumstantial evidence., and
+        Tools which run the tests as VPL would, like the roster grader, say so
+        by setting the VPLTOOLS_PRODUCTION environment variable to 1.
         '''
+        if os.getenv("VPLTOOLS_PRODUCTION") == "1":
+            return True
         return ((username := os.getenv("USER")) is not None 
                 and (match := re.search('p[0-9]+', username)) is not None 
                 and os.getcwd() == f"/home/{match.group(0)}")
     
 
+    @classmethod
+    def use_isolated_workspace(cls) -> bool:
+        return cls.isolated_workspace or os.getenv("VPLTOOLS_ISOLATED_WORKSPACE") == "1"
+
+
     @classmethod
     def setUpClass(cls):
         '''
         Locates student and key modules, compiling if necessary.
         Imports python modules, and runs basic tests on student modules.
+
+        With an isolated workspace, THIS_DIR_NAME is a new directory of hard links
+        to the source files in SOURCE_DIR_NAME, and copies of the rest. Key files are unmasked, programs compiled
+        and output files written there, so concurrent runs in the same directory
+        can't see each other's files. It is shared by the classes in the directory,
+        and deleted when the session (see session.py) finishes.
         '''
         cls.set_this_dir_name()
+        cls.session.class_set_up(cls, VPLTestCase)
 
         if cls.in_production_environment():
             # TODO: use fewer flags, just refer to whether or not we are in production 
@@ -164,54 +278,100 @@ class VPLTestCase(unittest.TestCase):
             cls.make_pre_vpl_run_sh_file = True
             cls.production_environment = False
 
-        if cls.key_source_files is None:
-            warnings.warn("key_source_files unspecified! Assuming no key program. \nInitialize this class attribute to an empty list to silence this warning.")
-            cls.key_source_files: list[str] = []
-
-        cls.files_renamed = [] # mutable class attributes to be modified need to be set here, not directly in class scope.
-        cls.student_program = cls.compile_student_program()
-        cls.key_program = cls.compile_key_program()
-
-        cls.subprocess_run_options = {
-            "cwd"           : cls.THIS_DIR_NAME, # Needed for programs to write their output files to the right place.
-            "env"           : deepcopy(os.environ), # Shallow copy = env changes persist to next TestCase class.
-            "capture_output": True, 
-            "text"          : True,
-            # "timeout"       : 15,
-            # "check"         : True, # Raise CalledProcessError on non-zero exit code. 
-            # ^^ Removed, so that subclasses have error handling, reporting responsibility.
-            #    This package should not be noticed. As the penguins say; "You didn't see anything..."
-        }
-        # Add current directory to PATH, so we can find our compiled binaries.
-        cls.subprocess_run_options["env"].update({ "PATH" : os.environ["PATH"] + ":" + cls.THIS_DIR_NAME })
-
-        # Add this as a class attribute, so others can find it; e.g. to use pexpect.spawn.
-        cls.program_execution_env = cls.subprocess_run_options["env"]
-
-        # If the student program is a Python program, import it as a module.
-        cls.student_py_module = cls.import_as_py_module(cls.student_program, cls.run_basic_tests)
-        cls.key_py_module = cls.import_as_py_module(cls.key_program)
+        if cls.use_fail_fast():
+            # Checked before anything is compiled or imported: skipping that is the point.
+            cls.fingerprint = cls.submission_fingerprint()
+            if (failed_case := cls.earlier_failure()) is not None:
+                cls.session.class_torn_down(cls) # unittest doesn't tear down a class which isn't set up.
+                raise unittest.SkipTest(cls.fail_fast_skip_reason(failed_case))
+
+        try:
+            if cls.use_isolated_workspace():
+                cls.THIS_DIR_NAME = cls.session.get_workspace()
+
+            if cls.key_source_files is None:
+                warnings.warn("key_source_files unspecified! Assuming no key program. \nInitialize this class attribute to an empty list to silence this warning.")
+                cls.key_source_files: list[str] = []
+
+            cls.files_renamed = [] # mutable class attributes to be modified need to be set here, not directly in class scope.
+            cls.student_program = cls.compile_student_program()
+            cls.key_program = cls.compile_key_program()
+
+            cls.subprocess_run_options = {
+                "cwd"           : cls.THIS_DIR_NAME, # Needed for programs to write their output files to the right place.
+                "env"           : deepcopy(os.environ), # Shallow copy = env changes persist to next TestCase class.
+                "capture_output": True, 
+                "text"          : True,
+                # "timeout"       : 15,
+                # "check"         : True, # Raise CalledProcessError on non-zero exit code. 
+                # ^^ Removed, so that subclasses have error handling, reporting responsibility.
+                #    This package should not be noticed. As the penguins say; "You didn't see anything..."
+            }
+            # Add current directory to PATH, so we can find our compiled binaries.
+            cls.subprocess_run_options["env"].update({ "PATH" : os.environ["PATH"] + ":" + cls.THIS_DIR_NAME })
+
+            # Add this as a class attribute, so others can find it; e.g. to use pexpect.spawn.
+            cls.program_execution_env = cls.subprocess_run_options["env"]
+
+            # If the student program is a Python program, import it as a module.
+            cls.student_py_module = cls.import_as_py_module(cls.student_program, cls.run_basic_tests, cls.sandbox_student_module)
+            cls.key_py_module = cls.import_as_py_module(cls.key_program)
+        except Exception:
+            if cls.use_fail_fast():
+                cls.record_failure(f"{cls.__module__}.{cls.__qualname__}")
+            cls.session.class_torn_down(cls)
+            raise
 
         return super().setUpClass()
 
 
     @classmethod
-    def import_as_py_module(cls, program: SupportedLanguageProgram | None, tests_to_run: list[FunctionType] = []):
+    def import_as_py_module(cls, program: SupportedLanguageProgram | None, tests_to_run: list[FunctionType] = [],
+                            sandboxed: bool = False):
         '''
         Returns a module object if program is a Python program, None otherwise. 
         None will also be returned if the import fails for any reason. This can happen 
         if a Python script which expects arguments (which will not be supplied during import).
-        Runs each of the basic tests supplied.
+        Runs each of the basic tests supplied: the static ones before the import,
+        whether or not it succeeds, and the others on the imported module.
+        If sandboxed, returns a SandboxedModule instead, on which only static
+        basic tests can run.
         '''
         if not isinstance(program, PythonProgram):
             return None
         
-        # Pipe any output received during import of student file into the null device.
-        null_dev = open(os.devnull, "w")
-
         # When importing the 
         student_file_name = os.path.splitext(program.executable_name)[0]
 
+        module_path = os.path.join(cls.THIS_DIR_NAME, program.executable_name)
+        run_static_basic_tests(module_path, tests_to_run)
+        tests_to_run = [ test_function for test_function in tests_to_run if not is_static_basic_test(test_function) ]
+
+        # Another class in this directory may have imported it already (in a sandbox, if this one does).
+        if module_path in cls.session.modules and (
+                sandboxed == isinstance(module := cls.session.modules[module_path], SandboxedModule) or module is None):
+            if module is not None:
+                cls.student_program_name = student_file_name
+                if not isinstance(module, SandboxedModule):
+                    run_basic_tests(module, tests_to_run)
+            return module
+
+        if sandboxed:
+            if tests_to_run:
+                warnings.warn(f"Only static basic tests run on sandboxed modules. Skipping {', '.join(test.__name__ for test in tests_to_run)}.")
+            try:
+                module = SandboxedModule(module_path, student_file_name, cls.sandbox_import_timeout,
+                                         cls.sandbox_call_timeout, cls.sandbox_memory_limit, cls.sandbox_cpu_seconds)
+            except SandboxError:
+                module = None
+            cls.session.modules[module_path] = module
+            if module is not None:
+                cls.student_program_name = student_file_name
+            return module
+
+        # Pipe any output received during import of student file into the null device.
+        null_dev = open(os.devnull, "w")
+
         cwd_parts = os.getcwd().split(os.sep)
         module_path_parts = cls.THIS_DIR_NAME.split(os.sep)
 
@@ -223,14 +383,19 @@ class VPLTestCase(unittest.TestCase):
 
         with contextlib.redirect_stdout(null_dev): # I don't want any output from student modules when importing.
             try:
-                module = importlib.import_module(".".join(module_path_parts))
+                if cls.THIS_DIR_NAME != cls.SOURCE_DIR_NAME:
+                    module = cls.import_from_workspace(student_file_name)
+                else:
+                    module = importlib.import_module(".".join(module_path_parts))
             except ModuleNotFoundError:
                 module = importlib.import_module(module_path_parts[-1])
             except: # In ANY part of the import fails, then return None.
                 null_dev.close()
+                cls.session.modules[module_path] = None
                 return None
 
         null_dev.close()
+        cls.session.modules[module_path] = module
         cls.student_program_name = student_file_name # change default name if we're in Python # TODO MOVE ME TO program creation logic
         
         run_basic_tests(module, tests_to_run)
@@ -240,17 +405,65 @@ class VPLTestCase(unittest.TestCase):
     
 
     @classmethod
-    def find_student_files(cls) -> list[str]:
-        # if override_THIS_DIR_NAME is not None:
-            # cls.THIS_DIR_NAME = override_THIS_DIR_NAME
-        return [ file for file in os.listdir(cls.THIS_DIR_NAME) 
-                if file not in cls.key_source_files 
-                    and file not in cls.ignore_files
-                    and file not in cls.VPL_SYSTEM_FILES
-                    and file != cls.THIS_FILE_NAME
+    def import_from_workspace(cls, module_name: str):
+        '''
+        Imports module_name from the workspace, rather than from the source directory.
+        The module is only in sys.modules while it runs (some code, like dataclasses,
+        looks itself up there), so any module of the same name imported elsewhere,
+        e.g. from the source directory, is left as it was.
+        '''
+        spec = importlib.util.spec_from_file_location(module_name, os.path.join(cls.THIS_DIR_NAME, module_name + ".py"))
+        module = importlib.util.module_from_spec(spec)  # type: ignore
+        previous_module = sys.modules.get(module_name)
+        sys.modules[module_name] = module
+        sys.path.insert(0, cls.THIS_DIR_NAME) # For any modules the imported one imports.
+        try:
+            spec.loader.exec_module(module)                 # type: ignore
+        finally:
+            sys.path.remove(cls.THIS_DIR_NAME)
+            if previous_module is None:
+                del sys.modules[module_name]
+            else:
+                sys.modules[module_name] = previous_module
+        return module
+
+
+    @classmethod
+    def find_student_files(cls, directory: str | None = None) -> list[str]:
+        '''
+        Returns the names of the files in directory (by default, THIS_DIR_NAME)
+        which are not part of the tests, and so must have been submitted.
+        '''
+        excluded_files = { *cls.key_source_files, *cls.ignore_files, *cls.VPL_SYSTEM_FILES, cls.THIS_FILE_NAME }
+        excluded_extensions = (*cls.NON_EXECUTABLE_EXTENSIONS, *cls.ignore_extensions)
+        return [ file for file in get_directory_index(directory or cls.THIS_DIR_NAME).files
+                if file not in excluded_files
                     and not file.startswith("__")
-                    and not any(file.endswith(nee) for nee in cls.NON_EXECUTABLE_EXTENSIONS)
-                    and not any(file.endswith(ife) for ife in cls.ignore_extensions)]
+                    and not file.endswith(excluded_extensions) ]
+
+
+    @classmethod
+    def result_cache_key(cls) -> str:
+        '''
+        Returns a hash of everything this class's tests depend on: vpltools, the
+        files beside the tests (the test modules, the key's and the student's files,
+        and fixtures such as databases), and their environment (Python, the compilers
+        for those files, PATH and VPLTOOLS_* variables; see resultstore.py). Files which
+        the tests write, like compiled programs and output files, are left out. The
+        runner reuses a test's outcome while this is unchanged (see runner.py).
+        '''
+        cls.set_this_dir_name()
+        written_prefixes = (f"{cls.key_program_name}_", f"{cls.student_program_name}_",
+                            cls.key_outfile_name, cls.student_outfile_name)
+        files = [ file for file in get_directory_index(cls.SOURCE_DIR_NAME).files
+                  if file not in cls.VPL_SYSTEM_FILES
+                      and not file.startswith(("__", "."))
+                      and not (file.startswith(written_prefixes) and language_of(file) is None) ]
+        hasher = hashlib.sha256(f"vpltools {vpltools_version()}\0{cls.__module__}.{cls.__qualname__}\0".encode())
+        hash_paths(hasher, [ os.path.join(cls.SOURCE_DIR_NAME, file) for file in files ], cls.SOURCE_DIR_NAME)
+        extensions = { os.path.splitext(file.removesuffix(cls.mask_extension))[1] for file in files }
+        hasher.update(environment_fingerprint(extensions).encode())
+        return hasher.hexdigest()
 
 
     @classmethod
@@ -267,7 +480,7 @@ class VPLTestCase(unittest.TestCase):
             cls.student_program_name,
             unmask_hidden_files=False
         )
-        student_program.compile(cls.THIS_DIR_NAME, recompile=recompile)
+        student_program = cls.compile_shared(student_program, recompile)
 
         if student_program.language not in cls.permitted_student_languages:
             raise NoProgramError(f"{student_program.language.name} is not permitted for this assignment. Options are: {', '.join(pl.name for pl in cls.permitted_student_languages)}")
@@ -278,6 +491,19 @@ class VPLTestCase(unittest.TestCase):
         return student_program
 
 
+    @classmethod
+    def compile_shared(cls, program: SupportedLanguageProgram, recompile=False) -> SupportedLanguageProgram:
+        '''
+        Compiles program, unless another class in this session already has,
+        and returns the session's copy of it.
+        '''
+        key = (cls.THIS_DIR_NAME, program.executable_name, tuple(program.source_files))
+        if recompile or key not in cls.session.programs:
+            program.compile(cls.THIS_DIR_NAME, recompile=recompile)
+            cls.session.programs[key] = program
+        return cls.session.programs[key]
+
+
     @classmethod
     def compile_key_program(cls, recompile=False) -> SupportedLanguageProgram | None:
         '''
@@ -295,7 +521,7 @@ class VPLTestCase(unittest.TestCase):
             unmask_hidden_files=True
         )
         if key_program is not None:
-            key_program.compile(cls.THIS_DIR_NAME, recompile=recompile)
+            key_program = cls.compile_shared(key_program, recompile)
             if not cls.production_environment:
                 print("Key program:", *key_program.source_files)
 
@@ -332,30 +558,24 @@ class VPLTestCase(unittest.TestCase):
             raise NoProgramError("Program not found!")
 
         current_program_lang: SupportedLanguages = None         # type: ignore
-        current_program_class: SupportedLanguageProgram = None  # type: ignore
         source_files = []
         
         if unmask_hidden_files:
             cls.unmask_hidden_files(file_list)
 
-        for file in file_list:
-            for supported_lang, lang_program_class in OBJECT_REPRESENTING_PROGRAM_IN_LANGUAGE.items():
-                if current_program_lang is not None and current_program_lang != supported_lang:
-                    continue # We're already found our language, and this is not it.
-
-                if current_program_lang is None and file.endswith(supported_lang.value.extension):
-                    current_program_lang = supported_lang
-                    current_program_class = lang_program_class
-                    source_files.append(file)
-
-                elif current_program_lang is not None and file.endswith(current_program_lang.value.extension):
-                    source_files.append(file)
+        # The first file in a supported language decides the language. Other files in it are sources too.
+        for file in filter(lambda file: file.endswith(SUPPORTED_EXTENSIONS), file_list):
+            file_lang = language_of(file)
+            if file_lang is not None and current_program_lang in (None, file_lang):
+                current_program_lang = file_lang
+                source_files.append(file)
 
         # Call constructor for detected program class.
-        if current_program_class is None:
+        if current_program_lang is None:
             raise FileNotFoundError(f"No submission found, or couldn't infer programming language! Found files: {file_list}")
         
         executable_name += "_" + os.path.splitext(source_files[0])[0]
+        current_program_class = OBJECT_REPRESENTING_PROGRAM_IN_LANGUAGE[current_program_lang]
         return current_program_class(cls.THIS_DIR_NAME, executable_name, source_files, output_file_name) # type: ignore
 
 
@@ -370,22 +590,67 @@ class VPLTestCase(unittest.TestCase):
             return
 
         print("\nMaking pre_vpl_run.sh.......", end="")
-        pre_run_sh_path = os.path.join(cls.THIS_DIR_NAME, "pre_vpl_run.sh")
-        # Get contents of existing pre_vpl_run.sh
-        try:
-            with open(pre_run_sh_path, "r") as pre_run_fo:
-                old_pre_run_contents = pre_run_fo.read()
-        except FileNotFoundError:
-            old_pre_run_contents = None # If it doesn't exist, create it.
-        
-        if old_pre_run_contents != cls.pre_vpl_run_sh_contents: # Compare to None is always False
-            with open(pre_run_sh_path, "w") as pre_run_fo:
-                pre_run_fo.write(cls.pre_vpl_run_sh_contents)
-        else:
+        # The manifest remembers what it last wrote, so an unchanged file isn't read back.
+        manifest = get_manifest(cls.SOURCE_DIR_NAME)
+        if not manifest.write_if_changed("pre_vpl_run.sh", cls.pre_vpl_run_sh_contents):
             print("no changes...", end="")
+        manifest.save()
         print("done.")
 
 
+    @classmethod
+    def use_fail_fast(cls) -> bool:
+        '''
+        A single failed case costs the whole grade with AbsoluteReduction, so once
+        one has failed, there is nothing to gain from compiling, importing and
+        running anything else. Only in production: during development, every
+        failure is worth seeing.
+        '''
+        return (cls.fail_fast
+                and cls.grade_reduction == GradeReduction.AbsoluteReduction
+                and getattr(cls, "production_environment", False))
+
+
+    @classmethod
+    def submission_fingerprint(cls) -> str:
+        '''
+        A hash of the submitted source files, so that a failure recorded for one
+        submission is never taken for a failure of another.
+        '''
+        hasher = hashlib.sha256()
+        source_files = [ file for file in cls.find_student_files(cls.SOURCE_DIR_NAME) if file.endswith(SUPPORTED_EXTENSIONS) ]
+        hash_paths(hasher, [ os.path.join(cls.SOURCE_DIR_NAME, file) for file in source_files ], cls.SOURCE_DIR_NAME)
+        return hasher.hexdigest()
+
+
+    @classmethod
+    def earlier_failure(cls) -> str | None:
+        '''
+        Returns the id of the case which failed earlier in this evaluation, if any.
+        '''
+        try:
+            with open(os.path.join(cls.SOURCE_DIR_NAME, FAILED_CASE_MARKER)) as marker_fo:
+                fingerprint, test_id = marker_fo.read().split("\n", 1)
+        except (OSError, ValueError):
+            return None
+        return test_id.strip() if fingerprint == cls.fingerprint else None
+
+
+    @classmethod
+    def record_failure(cls, test_id: str) -> None:
+        '''
+        Records test_id as the case which failed, unless another got there first.
+        '''
+        with contextlib.suppress(FileExistsError):
+            with open(os.path.join(cls.SOURCE_DIR_NAME, FAILED_CASE_MARKER), "x") as marker_fo:
+                marker_fo.write(f"{cls.fingerprint}\n{test_id}\n")
+
+
+    @staticmethod
+    def fail_fast_skip_reason(failed_case: str) -> str:
+        return f"{failed_case} failed, so this submission's grade is already 0."
+
+
     @classmethod
     def remask_hidden_files(cls) -> None:
         while cls.files_renamed:
@@ -397,35 +662,98 @@ class VPLTestCase(unittest.TestCase):
 
 
     @classmethod
-    def make_vpl_evaluate_cases(cls) -> None:
+    def make_vpl_evaluate_cases(cls, include_pylint: bool | None = None, pylint_files: list[str] | None = None) -> None:
         '''
-        Writes the vpl_evaluate.cases, unless 
+        Writes the vpl_evaluate.cases, unless make_vpl_evaluate_cases_file is False.
+        include_pylint defaults to whether the student program is Python and
+        include_pylint is set, and pylint_files to the student program's files.
         '''
         if not cls.make_vpl_evaluate_cases_file:
             return
         
-        test_suite = unittest.defaultTestLoader.discover(cls.THIS_DIR_NAME)
-        vpl_test_tuples = cls.makeVPLTestTuples(test_suite)
+        if include_pylint is None:
+            include_pylint = cls.include_pylint and isinstance(cls.student_program, PythonProgram)
+        if include_pylint and not pylint_files:
+            pylint_files = cls.student_program.source_files
+        # Only the test modules which have changed since the manifest was written are imported.
+        manifest = get_manifest(cls.SOURCE_DIR_NAME)
+        vpl_test_tuples, test_attributes = manifest.test_tuples(), manifest.attributes
+        if vpl_test_tuples is None:
+            test_suite = discover_tests(cls.SOURCE_DIR_NAME)
+            vpl_test_tuples = cls.makeVPLTestTuples(test_suite)
+            test_attributes = { (test.__module__, type(test).__name__, test._testMethodName): case_attributes(test)
+                                for test in iterate_tests(test_suite) }
+        if cls.fail_fast and cls.grade_reduction == GradeReduction.AbsoluteReduction:
+            vpl_test_tuples = cls.order_cheapest_first(vpl_test_tuples)
         make_cases_file_from_list(
-            cls.THIS_DIR_NAME,
+            cls.SOURCE_DIR_NAME,
             vpl_test_tuples,
-            cls.include_pylint if isinstance(cls.student_program, PythonProgram) else False,
+            include_pylint,
             cls.verbose,
-            cls.grade_reduction
+            cls.grade_reduction,
+            cls.evaluation_server_socket,
+            pylint_files,
+            cls.pylint_checks,
+            cls.result_records,
+            manifest,
+            test_attributes
         )
+        manifest.save()
+
+
+    @classmethod
+    def order_cheapest_first(cls, vpl_test_tuples: list[tuple[str, str, str]],
+                             history: DurationHistory | None = None) -> list[tuple[str, str, str]]:
+        '''
+        Orders the cases quickest first, as timed by earlier runs (e.g. python3 -m
+        vpltools test), so that with fail_fast, VPL reaches a failure as soon as it can.
+        '''
+        history = history or DurationHistory()
+        order = order_shortest_first([ history.expected_for_test(".".join(test_tuple)) for test_tuple in vpl_test_tuples ])
+        return [ vpl_test_tuples[index] for index in order ]
 
 
     @classmethod
     def tearDownClass(cls):
         '''
         Find all names of unittest.TestCase test_* methods, and write them to 
-        a file in the same directory as the subclass of this.
+        a file in the same directory as the subclass of this. The file describes
+        every class in the directory, so it is written just once, when the 
+        session finishes (when its last class is torn down), with the settings
+        of the last class torn down.
         '''
         cls.make_pre_vpl_run_sh()
         cls.remask_hidden_files()        
-        cls.make_vpl_evaluate_cases()
+        if cls.make_vpl_evaluate_cases_file:
+            cls.session.cases_file_writer = cls
+            cls.session.include_pylint = cls.include_pylint and isinstance(cls.student_program, PythonProgram)
+            cls.session.pylint_files = cls.student_program.source_files if cls.session.include_pylint else []
+
+        cls.THIS_DIR_NAME = cls.SOURCE_DIR_NAME
+        cls.session.class_torn_down(cls)
  
         return super().tearDownClass()
+
+
+    def run(self, result=None):
+        '''
+        With fail_fast (see use_fail_fast), skips this test if an earlier case has
+        failed, and otherwise records its failure for the cases after it.
+        '''
+        if result is None or not type(self).use_fail_fast():
+            return super().run(result)
+
+        if (failed_case := type(self).earlier_failure()) is not None:
+            result.startTest(self)
+            result.addSkip(self, self.fail_fast_skip_reason(failed_case))
+            result.stopTest(self)
+            return result
+
+        problems_before = len(result.failures) + len(result.errors)
+        super().run(result)
+        if len(result.failures) + len(result.errors) > problems_before:
+            type(self).record_failure(self.id())
+        return result
     
 
     @classmethod
@@ -460,6 +788,8 @@ class VPLTestCase(unittest.TestCase):
         '''
         Execute the student's program in a subprocess, providing the given arguments, and 
         input string. Uses the environment of the calling VPLTestCase subclass.
+        With measure_usage=True, returns a process_usage.MeasuredProcess, whose usage
+        holds the run's CPU time, peak memory and wall time.
         '''
         if self.student_program is None:
             raise NoProgramError("Student program not found!")
@@ -490,6 +820,7 @@ class VPLTestCase(unittest.TestCase):
         '''
         Execute the key program in a subprocess, providing the given arguments, and 
         input string. Uses the environment of the calling VPLTestCase subclass.
+        Takes measure_usage, as run_student_program does.
         '''
         if self.key_program is None:
             raise NoProgramError("Key program not found!")
@@ -512,13 +843,294 @@ class VPLTestCase(unittest.TestCase):
         return key_process
 
 
-# This saves the vpltools user an import, allowing them to write the idiom
-# if __name__ == "__main__":
-#     vpltools.main()
-# 
-# Instead of this:
-# if __name__ == "__main__":
-#     unittest.main()
+    def call_student(self, function_name: str, *args, timeout: float | None = None, max_memory: int | None = None, **kwargs):
+        '''
+        Calls function_name in the student's Python module, and returns its result.
+        Fails the test if the call takes longer than timeout seconds (by default,
+        sandbox_call_timeout), or uses more than max_memory bytes. What it cost is
+        recorded with the test's outcome (see calls.py).
+        '''
+        return self.call_measured("student", self.student_py_module, function_name, args, kwargs, timeout, max_memory)
+
+
+    def call_key(self, function_name: str, *args, timeout: float | None = None, max_memory: int | None = None, **kwargs):
+        '''
+        Calls function_name in the key's Python module, as call_student does.
+        '''
+        return self.call_measured("key", self.key_py_module, function_name, args, kwargs, timeout, max_memory)
+
+
+    def call_measured(self, program: str, module, function_name: str, args: tuple, kwargs: dict,
+                      timeout: float | None, max_memory: int | None):
+        if module is None:
+            self.fail(f"The {program} program could not be imported, so {function_name} can't be called.")
+        if timeout is None:
+            timeout = self.sandbox_call_timeout
+
+        if isinstance(module, SandboxedModule):
+            raised, value, usage = module._measure(function_name, args, kwargs, timeout, max_memory)
+        else:
+            raised, value, usage = measure_call(getattr(module, function_name), args, kwargs, timeout, max_memory)
+        usage.call = f"{program} {describe_call(function_name, args, kwargs)}"
+        self.__dict__.setdefault("call_usages", []).append(asdict(usage))
+        if raised and isinstance(value, CallTimeoutError):
+            self.fail(msg=str(value))
+        if raised:
+            raise value
+        return value
+
+
+    def assertScalesLike(self, generator, function_name: str | None = None, sizes: list[int] | None = None, msg: str | None = None):
+        '''
+        Asserts that the student's running time grows no faster with the size of its input
+        than the key's, e.g. that a sort is O(n log n) if the key's is. generator(size)
+        returns an input of that size: the arguments of function_name (a tuple, or a single
+        argument), or, without function_name, the input string of the programs, or a pair
+        (cli_args, input_string). Each input is copied before every run, untimed.
+
+        The programs take turns on each size in sizes (by default, scaling_input_sizes).
+        Programs run in subprocesses are first timed on generator(1), and that time, which
+        is mostly starting up, is taken from the others. The growth exponent of each is
+        the median slope of log(time) against log(size) (see complexity.py), so a few
+        timings disturbed by other work on the machine don't change the result.
+        '''
+        sizes = list(sizes or self.scaling_input_sizes)
+        inputs = [ generator(size) for size in sizes ]
+        if function_name is None:
+            runs = [ self.timed_program_run(self.run_student_program), self.timed_program_run(self.run_key_program) ]
+            baselines = [ times[0] for times in best_times(runs, [ generator(1) ], self.scaling_repeats, self.scaling_warmup) ]
+        else:
+            for program, module in (("student", self.student_py_module), ("key", self.key_py_module)):
+                if module is None:
+                    self.fail(f"The {program} program could not be imported, so {function_name} can't be timed.")
+            runs = [ self.timed_function_run(self.student_py_module, function_name),
+                     self.timed_function_run(self.key_py_module, function_name) ]
+            baselines = [ 0.0, 0.0 ]
+
+        student_times, key_times = [ [ max(elapsed - baseline, 0.0) for elapsed in times ]
+                                     for times, baseline in zip(best_times(runs, inputs, self.scaling_repeats, self.scaling_warmup), baselines) ]
+        student_exponent = fit_growth_exponent_robust(sizes, student_times)
+        key_exponent = fit_growth_exponent_robust(sizes, key_times)
+        if student_exponent > key_exponent + self.scaling_tolerance:
+            self.fail(msg=msg or (f"Your {function_name or 'program'} is too slow on large inputs.\n"
+                + f"Its running time grows {describe_growth(student_exponent)}, "
+                + f"but it could grow {describe_growth(key_exponent)}.\n"
+                + f"Timed on inputs of sizes {', '.join(map(str, sizes))}."))
+
+
+    def timed_function_run(self, module, function_name: str):
+        '''
+        Returns a run for complexity.best_times, which calls function_name in module.
+        '''
+        function = getattr(module, function_name)
+
+        def run(generated) -> float:
+            args = deepcopy(generated if isinstance(generated, tuple) else (generated,))
+            started = time.perf_counter()
+            try:
+                if isinstance(module, SandboxedModule):
+                    module._call(function_name, args, {}, self.scaling_time_limit)
+                else:
+                    with time_limit(self.scaling_time_limit, function_name):
+                        function(*args)
+            except CallTimeoutError:
+                return math.inf
+            return time.perf_counter() - started
+        return run
+
+
+    def timed_program_run(self, run_program):
+        '''
+        Returns a run for complexity.best_times, which runs a program with run_program.
+        '''
+        def run(generated) -> float:
+            cli_args, input_string = generated if isinstance(generated, tuple) else ([], generated)
+            started = time.perf_counter()
+            try:
+                run_program(list(cli_args), input_string, timeout=self.scaling_time_limit)
+            except subprocess.TimeoutExpired:
+                return math.inf
+            return time.perf_counter() - started
+        return run
+
 
-main = unittest.main
+    def assertUsageLike(self, cli_args: list[str], input_string: str, time_factor: float | None = None,
+                        memory_factor: float | None = None, msg: str | None = None):
+        '''
+        Asserts that the student's program, run with cli_args and input_string, uses at
+        most time_factor times the CPU time of the key's (by default, budget_time_factor),
+        and at most memory_factor times its peak memory (budget_memory_factor). This
+        catches e.g. a submission which is accidentally quadratic, but still correct.
+
+        The key is run first, and how long it takes decides how often both programs are
+        run (see budget_timing_seconds); they take turns, and the best of each program's
+        runs is compared. A student run is stopped once it is far over its budget.
+        '''
+        time_factor = time_factor or self.budget_time_factor
+        memory_factor = memory_factor or self.budget_memory_factor
+        key_runs = [ self.run_key_program(cli_args, input_string, measure_usage=True).usage ]
+        repeats = max(1, min(self.budget_max_repeats, int(self.budget_timing_seconds / max(key_runs[0].wall_seconds, 1e-3))))
+        timeout = 2 * time_factor * key_runs[0].wall_seconds + 1.0
+
+        student_runs = []
+        for repeat in range(repeats):
+            try:
+                student_runs.append(self.run_student_program(cli_args, input_string, timeout=timeout, measure_usage=True).usage)
+            except subprocess.TimeoutExpired:
+                self.fail(msg=msg or (f"Your program took longer than {timeout:.2f} seconds with the arguments "
+                    + f"{cli_args} and the input:\n> {reprlib.repr(input_string)}\n"
+                    + f"The key program took {key_runs[0].wall_seconds:.3f} seconds."))
+            if repeat < repeats - 1:
+                key_runs.append(self.run_key_program(cli_args, input_string, measure_usage=True).usage)
+
+        student_cpu, key_cpu = min(run.cpu_seconds for run in student_runs), min(run.cpu_seconds for run in key_runs)
+        student_rss, key_rss = min(run.max_rss for run in student_runs), min(run.max_rss for run in key_runs)
+        for program, runs, cpu, rss in (("student", student_runs, student_cpu, student_rss), ("key", key_runs, key_cpu, key_rss)):
+            usage = CallUsage(" ".join([ program, "program", *cli_args ]), min(run.wall_seconds for run in runs), cpu, rss)
+            self.__dict__.setdefault("call_usages", []).append(asdict(usage))
+
+        problems = []
+        if student_cpu > time_factor * key_cpu:
+            problems.append(f"It used {student_cpu:.3f} seconds of CPU time, more than {time_factor:g} times "
+                            + f"the {key_cpu:.3f} seconds the key program needed.")
+        if student_rss > memory_factor * key_rss:
+            problems.append(f"It used {student_rss / 2**20:.1f} MiB of memory, more than {memory_factor:g} times "
+                            + f"the {key_rss / 2**20:.1f} MiB the key program needed.")
+        if problems:
+            self.fail(msg=msg or ("Your program is less efficient than it should be, with the arguments "
+                + f"{cli_args} and the input:\n> {reprlib.repr(input_string)}\n"
+                + "\n".join(problems)))
+
+
+    def differential_test(self, generator, function_name: str | None = None, n: int | None = None,
+                          budget_seconds: float | None = None, seed: int | str | None = None, msg: str | None = None):
+        '''
+        Compares the student's program with the key's on n generated inputs (by default,
+        differential_inputs). generator(rng) draws an input from the random.Random rng:
+        the arguments of function_name (a tuple, or a single argument), or, without
+        function_name, the programs' input string, or a pair (cli_args, input_string).
+
+        Programs are run on a batch of inputs at a time, in parallel; functions are called
+        in the modules already imported. At the first input on which the two differ (in
+        output and exit code, or in what the function returns or raises), the input is
+        shrunk (see differential.py), and the test fails, showing the smallest input found
+        on which they still differ. With the same seed, the same inputs are tried, in the
+        same order, every run. If budget_seconds run out first, the inputs left are not
+        tried, with a warning.
+        '''
+        n = n or self.differential_inputs
+        budget_seconds = budget_seconds or self.differential_budget_seconds
+        seed = self.differential_seed if seed is None else seed
+        if function_name is None:
+            if self.student_program is None or self.key_program is None:
+                raise NoProgramError("differential_test needs both a student and a key program!")
+            outcome_of = self.program_outcome
+            jobs = self.differential_jobs or os.cpu_count() or 1
+        else:
+            for program, module in (("student", self.student_py_module), ("key", self.key_py_module)):
+                if module is None:
+                    self.fail(f"The {program} program could not be imported, so {function_name} can't be tested.")
+            outcome_of = lambda program, generated: self.function_outcome(program, function_name, generated)
+            jobs = 1 # Calls share the test process, and only its main thread can time them out.
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(2 * jobs) as pool:
+            run_all = pool.map if jobs > 1 else map
+            for batch_start in range(0, n, jobs):
+                if time.perf_counter() - started > budget_seconds:
+                    warnings.warn(f"differential_test ran out of time after {batch_start} of {n} inputs.")
+                    break
+                inputs = [ generator(input_random(seed, index)) for index in range(batch_start, min(batch_start + jobs, n)) ]
+                outcomes = list(run_all(outcome_of, [ "key", "student" ] * len(inputs), [ generated for generated in inputs for _ in range(2) ]))
+                for offset, generated in enumerate(inputs):
+                    key_outcome, student_outcome = outcomes[2 * offset], outcomes[2 * offset + 1]
+                    if key_outcome != student_outcome:
+                        self.report_difference(outcome_of, function_name, generated, key_outcome, student_outcome,
+                                               f"input {batch_start + offset + 1} of {n}, with seed {seed!r}", msg)
+
+
+    def report_difference(self, outcome_of, function_name: str | None, generated, key_outcome: tuple, student_outcome: tuple,
+                          found: str, msg: str | None):
+        '''
+        Shrinks generated, on which the key's and student's outcomes differ, and fails the test.
+        Smaller inputs only count if the key behaves as it did (e.g. doesn't crash), so that
+        the student is only shown inputs the key accepts.
+        '''
+        def still_differs(candidate) -> bool:
+            key_outcome = outcome_of("key", candidate)
+            return key_outcome[0] == original_key_outcome[0] and outcome_of("student", candidate) != key_outcome
+
+        original_key_outcome = key_outcome
+        smallest, _ = shrink(generated, still_differs, self.differential_shrink_attempts)
+        if smallest is not generated:
+            key_outcome, student_outcome = outcome_of("key", smallest), outcome_of("student", smallest)
+            found += ", then made smaller"
+
+        if function_name is not None:
+            args = smallest if isinstance(smallest, tuple) else (smallest,)
+            call = f"{function_name}({', '.join(map(repr, args))})"
+            self.fail(msg=msg or (f"Your {function_name} differs from the key's when called as {call} ({found}).\n"
+                + f"The key's {describe_outcome(key_outcome)}\n"
+                + f"Yours {describe_outcome(student_outcome)}"))
+
+        cli_args, input_string = smallest if isinstance(smallest, tuple) else ([], smallest)
+        self.fail(msg=msg or (f"Your program differs from the key program with the arguments {list(cli_args)} and the input ({found}):\n"
+            + quote(input_string) + "\n"
+            + f"The key program {describe_outcome(key_outcome)}\n"
+            + f"Your program {describe_outcome(student_outcome)}"))
+
+
+    def program_outcome(self, program: str, generated) -> tuple:
+        '''
+        Runs the student's or key's program on generated, for differential_test, returning its
+        exit code and output.
+        '''
+        cli_args, input_string = generated if isinstance(generated, tuple) else ([], generated)
+        runner = self.student_program if program == "student" else self.key_program
+        try:
+            process = runner.run(list(cli_args), input=input_string, **self.subprocess_run_options, timeout=self.differential_timeout)
+        except subprocess.TimeoutExpired:
+            return ("timed out", self.differential_timeout)
+        return (f"exit code {process.returncode}", process.stdout)
+
+
+    def function_outcome(self, program: str, function_name: str, generated) -> tuple:
+        '''
+        Calls function_name in the student's or key's module with a copy of generated, for
+        differential_test, returning what it returned, or the type of what it raised.
+        '''
+        module = self.student_py_module if program == "student" else self.key_py_module
+        args = deepcopy(generated if isinstance(generated, tuple) else (generated,))
+        try:
+            if isinstance(module, SandboxedModule):
+                value = module._call(function_name, args, {}, self.differential_timeout)
+            else:
+                with time_limit(self.differential_timeout, function_name):
+                    value = getattr(module, function_name)(*args)
+        except CallTimeoutError:
+            return ("timed out", self.differential_timeout)
+        except Exception as error:
+            return (f"raised {type(error).__name__}", None)
+        return ("returned", value)
+
+
+def describe_outcome(outcome: tuple) -> str:
+    '''
+    Describes an outcome from program_outcome or function_outcome, e.g. "returned [1, 2]".
+    '''
+    kind, detail = outcome
+    if kind == "timed out":
+        return f"took longer than {detail:g} seconds."
+    if kind == "returned":
+        return f"returned {detail!r}."
+    if kind.startswith("raised"):
+        return f"{kind}."
+    return f"finished with {kind}, and printed:\n" + quote(detail)
+
+
+def quote(text: str) -> str:
+    '''
+    Returns text with each line marked by "> ", as messages show input and output.
+    '''
+    return "> " + text.removesuffix("\n").replace("\n", "\n> ")
 
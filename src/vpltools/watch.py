@@ -0,0 +1,341 @@
+'''
+watch.py -- rerunning tests as an assignment is developed.
+
+    python3 -m vpltools watch <dir> [--poll-interval SECONDS]
+
+Runs every test in dir, then waits for files in it, or in its subdirectories, to
+change, and reruns only the test classes affected by each change. (Classes, not
+single tests, since a class compiles and imports what its tests use when it is
+set up.) Everything stays loaded between runs: vpltools and its dependencies,
+unchanged test, student and key modules, compiled programs, and SQL fixture
+databases (cached by script contents). Changes are noticed with inotify where it
+is available, and by polling otherwise. Files changed while the tests run are
+queued for the next rerun, except those the tests write themselves.
+'''
+import os
+import sys
+import time
+import select
+import ctypes
+import ctypes.util
+import argparse
+import tempfile
+import unittest
+
+from vpltools.vpl_test_case import VPLTestCase
+from vpltools.session import get_session, iterate_tests
+
+__unittest = True
+
+# From <sys/inotify.h>: a file was written and closed, moved in or out, created or deleted.
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+# Editors often write a file in several steps; wait for them to finish.
+SETTLE_SECONDS = 0.05
+
+IGNORED_EXTENSIONS = (".pyc", ".class", ".swp", ".swx", "~")
+
+
+def open_inotify():
+    '''
+    Returns libc and a new inotify file descriptor, or None where inotify isn't available.
+    '''
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        inotify_fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if inotify_fd < 0:
+        return None
+    return libc, inotify_fd
+
+
+def watched_directories(directory: str) -> list[str]:
+    '''
+    Returns directory and its subdirectories, except ignored ones (e.g. __pycache__).
+    '''
+    directories = []
+    for dir_path, dir_names, _ in os.walk(directory):
+        dir_names[:] = [ dir_name for dir_name in dir_names if not is_ignored(dir_name) ]
+        directories.append(dir_path)
+    return directories
+
+
+class DirectoryWatcher:
+    '''
+    Waits for files in a directory, or its subdirectories, to change. Which files
+    changed is found by comparing snapshots, so events only need to wake the
+    watcher up. Events which arrive while nobody is waiting (e.g. during a run)
+    stay queued, and wake the next wait at once.
+    '''
+    def __init__(self, directory: str, poll_interval: float = 0.5, use_inotify: bool = True):
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self.libc = None
+        self.inotify_fd = None
+        if use_inotify and (opened := open_inotify()) is not None:
+            self.libc, self.inotify_fd = opened
+            if not self.add_watches():
+                self.close()
+
+
+    def add_watches(self) -> bool:
+        '''
+        Watches the directory and each subdirectory not yet watched (inotify watches
+        aren't recursive). Returns whether the directory itself is watched.
+        '''
+        for directory in watched_directories(self.directory):
+            if self.libc.inotify_add_watch(self.inotify_fd, os.fsencode(directory), WATCH_MASK) < 0 and directory == self.directory:
+                return False
+        return True
+
+
+    def wait(self, timeout: float | None = None) -> None:
+        '''
+        Returns once something in the directory may have changed,
+        or after timeout seconds.
+        '''
+        if self.inotify_fd is None:
+            time.sleep(self.poll_interval if timeout is None else min(timeout, self.poll_interval))
+            return
+
+        ready, _, _ = select.select([ self.inotify_fd ], [], [], timeout)
+        if ready:
+            time.sleep(SETTLE_SECONDS)
+            try:
+                while os.read(self.inotify_fd, 4096):
+                    pass
+            except BlockingIOError:
+                pass
+            self.add_watches() # Any subdirectories just made.
+
+
+    def close(self) -> None:
+        if self.inotify_fd is not None:
+            os.close(self.inotify_fd)
+            self.inotify_fd = None
+
+
+def is_ignored(file_name: str) -> bool:
+    return (file_name.startswith((".", "__"))
+            or file_name in VPLTestCase.VPL_SYSTEM_FILES
+            or file_name.endswith(IGNORED_EXTENSIONS))
+
+
+def snapshot(directory: str) -> dict[str, tuple[int, int]]:
+    '''
+    Returns the modification time and size of each file in directory and its
+    subdirectories, by path relative to directory.
+    '''
+    files = {}
+    for dir_path in watched_directories(directory):
+        for entry in os.scandir(dir_path):
+            if not is_ignored(entry.name) and entry.is_file():
+                stat = entry.stat()
+                files[os.path.relpath(entry.path, directory)] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+def changed_files(before: dict[str, tuple[int, int]], after: dict[str, tuple[int, int]]) -> set[str]:
+    return { name for name in before.keys() | after.keys() if before.get(name) != after.get(name) }
+
+
+class WatchSession:
+    '''
+    The tests in one directory, loaded once, and rerun class by class as files change.
+    '''
+    def __init__(self, directory: str, stream=sys.stderr):
+        self.directory = os.path.abspath(directory)
+        self.stream = stream
+        self.tests_by_class: dict[type, list[unittest.TestCase]] = {}
+        self.written_by_tests: set[str] | None = None
+        self.load_tests()
+
+
+    def load_tests(self, reload_modules: set[str] = set()) -> None:
+        '''
+        Discovers the tests in the directory, first forgetting the named test
+        modules, so that they are imported again.
+        '''
+        for module_name in reload_modules:
+            sys.modules.pop(module_name, None)
+
+        self.tests_by_class = {}
+        suite = unittest.TestLoader().discover(self.directory, top_level_dir=self.directory)
+        for test in iterate_tests(suite):
+            self.tests_by_class.setdefault(type(test), []).append(test)
+
+
+    @staticmethod
+    def module_file_name(test_class: type) -> str:
+        return os.path.basename(getattr(sys.modules.get(test_class.__module__), "__file__", "") or "")
+
+
+    def files_used_by(self, test_class: type) -> set[str]:
+        '''
+        Returns the names of the files in the directory which test_class's tests depend on:
+        its test module, the student's submission, key files and SQL scripts.
+        '''
+        files_used = { self.module_file_name(test_class) }
+        if issubclass(test_class, VPLTestCase):
+            test_class.set_this_dir_name()
+            key_source_files = test_class.key_source_files or []
+            files_used.update(key_source_files)
+            files_used.update(key_file + test_class.mask_extension for key_file in key_source_files)
+            files_used.update(test_class.find_student_files(self.directory))
+            if (use_database := getattr(test_class, "use_database", None)):
+                files_used.add(use_database)
+            files_used -= self.files_made_by(test_class)
+        return files_used
+
+
+    @staticmethod
+    def files_made_by(test_class: type[VPLTestCase]) -> set[str]:
+        '''
+        Returns the names of the files which running test_class's tests writes:
+        compiled programs, and output files.
+        '''
+        files_made = { test_class.student_outfile_name, test_class.key_outfile_name }
+        for program in (getattr(test_class, "student_program", None), getattr(test_class, "key_program", None)):
+            if program is not None and program.compilationCommand() is not None:
+                files_made.add(program.executable_name)
+        return files_made
+
+
+    def affected_classes(self, changed: set[str]) -> list[type]:
+        '''
+        Returns the test classes which depend on any of the changed files. A change to
+        a file which no class uses directly (e.g. a data file) could affect any of them.
+        '''
+        files_used = { test_class: self.files_used_by(test_class) for test_class in self.tests_by_class }
+        affected = [ test_class for test_class, used in files_used.items() if used & changed ]
+        if changed - set().union(*files_used.values()):
+            return list(self.tests_by_class)
+        return affected
+
+
+    def changed_outside_tests(self, before_run: dict[str, tuple[int, int]], after_run: dict[str, tuple[int, int]]) -> set[str]:
+        '''
+        Returns the files which changed between snapshots taken before and after a run,
+        other than those the tests write: their compiled programs and output files,
+        and whatever else changed during the first run and isn't used by any class.
+        '''
+        changed = changed_files(before_run, after_run)
+        files_made = set().union(*(self.files_made_by(test_class) for test_class in self.tests_by_class
+                                   if issubclass(test_class, VPLTestCase)))
+        if self.written_by_tests is None:
+            self.written_by_tests = changed - set().union(*map(self.files_used_by, self.tests_by_class))
+        return changed - files_made - self.written_by_tests
+
+
+    def forget_changed(self, changed: set[str]) -> None:
+        '''
+        Makes sure changed files are used again: Python modules imported from them
+        are forgotten, and programs compiled from them are deleted, to be recompiled.
+        '''
+        changed_paths = { os.path.join(self.directory, name) for name in changed }
+        get_session(self.directory).forget(changed_paths)
+        for module_name, module in list(sys.modules.items()):
+            if getattr(module, "__file__", None) in changed_paths:
+                del sys.modules[module_name]
+
+        for test_class in self.tests_by_class:
+            for program in (getattr(test_class, "student_program", None), getattr(test_class, "key_program", None)):
+                if (program is not None
+                        and program.compilationCommand() is not None
+                        and changed.intersection(program.source_files)):
+                    executable_path = os.path.join(self.directory, program.executable_name)
+                    if os.path.isfile(executable_path):
+                        os.remove(executable_path)
+
+
+    def rerun(self, changed: set[str]) -> unittest.TestResult | None:
+        '''
+        Reloads and reruns whatever the changed files affect. Returns None if nothing was.
+        '''
+        changed_test_modules = { test_class.__module__ for test_class in self.tests_by_class
+                                if self.module_file_name(test_class) in changed }
+        new_test_modules = { name for name in changed
+                            if name.startswith("test") and name.endswith(".py")
+                                and name not in { self.module_file_name(tc) for tc in self.tests_by_class } }
+        self.forget_changed(changed)
+        if changed_test_modules or new_test_modules:
+            self.load_tests(changed_test_modules)
+
+        affected = self.affected_classes(changed)
+        if not affected:
+            return None
+        return self.run(affected)
+
+
+    def run(self, test_classes: list[type] | None = None) -> unittest.TestResult:
+        '''
+        Runs the tests of test_classes (by default, all of them).
+        '''
+        suite = unittest.TestSuite()
+        for test_class in self.tests_by_class if test_classes is None else test_classes:
+            suite.addTests(self.tests_by_class[test_class])
+        result = unittest.TextTestRunner(stream=self.stream, verbosity=1).run(suite)
+        get_session(self.directory).finish() # Writes vpl_evaluate.cases now, rather than when watching stops.
+        return result
+
+
+def watch(directory: str, poll_interval: float = 0.5, use_inotify: bool = True) -> None:
+    '''
+    Runs the tests in directory, then reruns those affected by each change, until interrupted.
+    '''
+    directory = os.path.abspath(directory)
+    sys.dont_write_bytecode = True # Bytecode only records modification times to the second.
+    fixture_cache = None
+    if not os.getenv("VPLTOOLS_FIXTURE_CACHE"):
+        fixture_cache = tempfile.TemporaryDirectory(prefix="vpltools_fixtures_")
+        os.environ["VPLTOOLS_FIXTURE_CACHE"] = fixture_cache.name
+
+    session = WatchSession(directory)
+    watcher = DirectoryWatcher(directory, poll_interval, use_inotify)
+    print(f"Watching {directory}", "with inotify." if watcher.inotify_fd is not None else "by polling.")
+    try:
+        before_run = snapshot(directory)
+        session.run()
+        files = snapshot(directory)
+        # Files changed during a run by the tests themselves (e.g. output files) aren't news,
+        # but any other file the instructor changed meanwhile is, and is queued.
+        pending = session.changed_outside_tests(before_run, files)
+        while True:
+            if not pending:
+                watcher.wait()
+                current_files = snapshot(directory)
+                pending = changed_files(files, current_files)
+                files = current_files
+                if not pending:
+                    continue
+
+            started = time.perf_counter()
+            print(f"\n{time.strftime('%H:%M:%S')} Changed: {', '.join(sorted(pending))}")
+            before_run = files
+            session.rerun(pending)
+            files = snapshot(directory)
+            pending = session.changed_outside_tests(before_run, files)
+            print(f"Rerun in {time.perf_counter() - started:.2f}s. Waiting for changes...")
+
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+        if fixture_cache is not None:
+            fixture_cache.cleanup()
+
+
+def main(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(prog="python3 -m vpltools watch",
+        description="Rerun the tests in a directory whenever the files they use change.")
+    parser.add_argument("directory", help="directory containing the tests")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="seconds between checks, when polling")
+    parser.add_argument("--poll", action="store_true", help="poll, even if inotify is available")
+    args = parser.parse_args(argv)
+    watch(args.directory, args.poll_interval, use_inotify=not args.poll)
@@ -0,0 +1,110 @@
+'''
+workspace.py -- private directories in which to run tests against a submission,
+so that nothing a test or a student's program does can change the originals.
+'''
+import os
+import stat
+import shutil
+import tempfile
+
+from vpltools.resultstore import cache_dir
+from vpltools.supported_languages import LANGUAGE_FOR_EXTENSION
+
+__unittest = True
+
+# Files which the tests only read, so can be linked rather than copied: programs in
+# any supported language, C and C++ headers, and those masked with ".save" (see VPLTestCase).
+SOURCE_EXTENSIONS = (*LANGUAGE_FOR_EXTENSION, ".h", ".hpp")
+LINKED_EXTENSIONS = (*SOURCE_EXTENSIONS, *(extension + ".save" for extension in SOURCE_EXTENSIONS))
+
+# Made beside a test directory, when vpltools' cache is on another file system.
+# Without an __init__.py, unittest's discovery doesn't look inside it.
+WORKSPACES_DIR_NAME = ".vpltools_workspaces"
+
+
+def workspaces_dir(source_dir: str) -> str | None:
+    '''
+    Returns a directory on source_dir's file system to make workspaces in, so that
+    files can be linked into them: vpltools' cache directory, if it is on the same
+    one, and otherwise a hidden directory beside source_dir. None if neither will do.
+    '''
+    source_dir = os.path.abspath(source_dir)
+    device = os.stat(source_dir).st_dev
+    for directory in (os.path.join(cache_dir(), "workspaces"),
+                      os.path.join(os.path.dirname(source_dir), WORKSPACES_DIR_NAME)):
+        try:
+            os.makedirs(directory, exist_ok=True)
+            if os.stat(directory).st_dev == device:
+                return directory
+            os.rmdir(directory)
+        except OSError:
+            pass
+    return None
+
+
+def make_workspace(prefix: str = "vpltools_", near: str | None = None) -> str:
+    '''
+    Creates and returns the path to a new, empty workspace directory: on the same
+    file system as the directory near, where possible, and otherwise in /tmp.
+    '''
+    if near is not None and (directory := workspaces_dir(near)) is not None:
+        try:
+            return tempfile.mkdtemp(prefix=prefix, dir=directory)
+        except OSError:
+            pass # e.g. removed by another run's remove_workspace.
+    return tempfile.mkdtemp(prefix=prefix)
+
+
+def copy_into_workspace(workspace: str, source_dir: str, names: list[str] | None = None) -> None:
+    '''
+    Copies the named files and directories (by default, all of them)
+    from source_dir into workspace, replacing any with the same name.
+    '''
+    for name in os.listdir(source_dir) if names is None else names:
+        source_path = os.path.join(source_dir, name)
+        workspace_path = os.path.join(workspace, name)
+        if os.path.isdir(source_path):
+            shutil.copytree(source_path, workspace_path, dirs_exist_ok=True)
+        else:
+            shutil.copy2(source_path, workspace_path)
+
+
+def remove_workspace(workspace: str) -> None:
+    shutil.rmtree(workspace, ignore_errors=True)
+    if os.path.basename(os.path.dirname(workspace)) == WORKSPACES_DIR_NAME:
+        try:
+            os.rmdir(os.path.dirname(workspace)) # Unless another run's workspace is in it.
+        except OSError:
+            pass
+
+
+def is_read_only(mode: int) -> bool:
+    return not mode & (stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH)
+
+
+def link_into_workspace(workspace: str, source_dir: str, link_extensions: tuple[str, ...] = LINKED_EXTENSIONS) -> None:
+    '''
+    Fills workspace with the files in source_dir, recreating its subdirectories.
+    Source files (those ending in link_extensions: test modules, and submitted and
+    key programs) and read-only files (e.g. data files made so with chmod a-w) are
+    hard linked, which is cheap however large they are. Renaming, deleting or
+    creating files in the workspace leaves source_dir untouched, but writing into a
+    linked file would change the original, so every other file (writable data
+    files, databases, outputs) is copied. Files are also copied where they can't
+    be linked, e.g. across file systems (see make_workspace).
+    '''
+    for entry in os.scandir(source_dir):
+        workspace_path = os.path.join(workspace, entry.name)
+        if entry.name == "__pycache__":
+            continue
+        if entry.is_dir():
+            os.makedirs(workspace_path, exist_ok=True)
+            link_into_workspace(workspace_path, entry.path, link_extensions)
+            continue
+        if not entry.name.endswith(link_extensions) and not is_read_only(entry.stat().st_mode):
+            shutil.copy2(entry.path, workspace_path)
+            continue
+        try:
+            os.link(entry.path, workspace_path)
+        except OSError:
+            shutil.copy2(entry.path, workspace_path)
@@ -0,0 +1,137 @@
+import os
+import sys
+import stat
+import tempfile
+import unittest
+from vpltools.manifest import CasesManifest, RACY_MODIFICATION_NS
+
+__unittest = True
+
+TEST_MODULE = '''import unittest
+
+class {class_name}(unittest.TestCase):
+{methods}
+'''
+
+
+class TestCasesManifest(unittest.TestCase):
+    '''
+    Lists the tests of modules in a temporary directory through a manifest, read afresh for each listing.
+    '''
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.manifest_dir = os.path.join(self.directory, ".manifests")
+        self.write_module("test_manifest_alpha.py", "TestAlpha", [ "test_one", "test_two" ])
+        self.write_module("test_manifest_beta.py", "TestBeta", [ "test_three" ])
+        self.addCleanup(self.forget_modules)
+
+    def forget_modules(self):
+        for name in [ "test_manifest_alpha", "test_manifest_beta", "manifest_base", "test_manifest_gamma" ]:
+            sys.modules.pop(name, None)
+        if self.directory in sys.path:
+            sys.path.remove(self.directory)
+
+    def write_module(self, file_name: str, class_name: str, methods: list[str]):
+        self.write_file(file_name, TEST_MODULE.format(class_name=class_name,
+                        methods="".join(f"    def {method}(self):\n        pass\n" for method in methods)))
+
+    def write_file(self, file_name: str, contents: str):
+        path = os.path.join(self.directory, file_name)
+        with open(path, "w") as file_fo:
+            file_fo.write(contents)
+        # Old enough that the manifest trusts its modification time.
+        old = os.stat(path).st_mtime_ns - 2 * RACY_MODIFICATION_NS
+        os.utime(path, ns=(old, old))
+
+    def list_tests(self):
+        manifest = CasesManifest(self.directory, self.manifest_dir)
+        tests = manifest.test_tuples()
+        manifest.save()
+        return tests
+
+    def test_lists_tests_in_discovery_order(self):
+        self.assertEqual(self.list_tests(), [ ("test_manifest_alpha", "TestAlpha", "test_one"),
+                                              ("test_manifest_alpha", "TestAlpha", "test_two"),
+                                              ("test_manifest_beta", "TestBeta", "test_three") ])
+
+    def test_unchanged_modules_not_imported(self):
+        first = self.list_tests()
+        self.forget_modules()
+        self.assertEqual(self.list_tests(), first)
+        self.assertNotIn("test_manifest_alpha", sys.modules)
+
+    def test_changed_module_discovered_again(self):
+        self.list_tests()
+        self.forget_modules()
+        self.write_module("test_manifest_beta.py", "TestBeta", [ "test_three", "test_four" ])
+        self.assertEqual(self.list_tests()[2:], [ ("test_manifest_beta", "TestBeta", "test_four"),
+                                                  ("test_manifest_beta", "TestBeta", "test_three") ])
+        self.assertNotIn("test_manifest_alpha", sys.modules)
+        self.assertIn("test_manifest_beta", sys.modules)
+
+    def test_removed_module_forgotten(self):
+        self.list_tests()
+        os.remove(os.path.join(self.directory, "test_manifest_beta.py"))
+        self.assertEqual([ module for module, _, _ in self.list_tests() ], [ "test_manifest_alpha" ] * 2)
+
+    def test_packages_left_to_unittest(self):
+        os.mkdir(os.path.join(self.directory, "more_tests"))
+        open(os.path.join(self.directory, "more_tests", "__init__.py"), "w").close()
+        self.assertIsNone(self.list_tests())
+
+    def test_changed_base_class_discovered_again(self):
+        self.write_module("manifest_base.py", "Base", [ "test_inherited" ])
+        self.write_file("test_manifest_gamma.py", "from manifest_base import Base\n\nclass TestGamma(Base):\n    pass\n")
+        self.assertIn(("test_manifest_gamma", "TestGamma", "test_inherited"), self.list_tests())
+        self.forget_modules()
+        self.write_module("manifest_base.py", "Base", [ "test_renamed" ])
+        tests = self.list_tests()
+        self.assertIn(("test_manifest_gamma", "TestGamma", "test_renamed"), tests)
+        self.assertNotIn(("test_manifest_gamma", "TestGamma", "test_inherited"), tests)
+        self.assertNotIn("test_manifest_alpha", sys.modules)
+
+    def test_changed_data_file_discovered_again(self):
+        self.write_file("rows.txt", "one\n")
+        self.write_file("test_manifest_gamma.py", "import os, unittest\n\nclass TestGamma(unittest.TestCase):\n    pass\n\n"
+                        + "with open(os.path.join(os.path.dirname(__file__), 'rows.txt')) as rows_fo:\n    rows = rows_fo.read().split()\n\n"
+                        + "for row in rows:\n"
+                        + "    setattr(TestGamma, f'test_{row}', lambda self: None)\n")
+        self.assertEqual(self.list_tests()[-1], ("test_manifest_gamma", "TestGamma", "test_one"))
+        self.forget_modules()
+        self.write_file("rows.txt", "one\ntwo\n")
+        self.assertEqual(self.list_tests()[-1], ("test_manifest_gamma", "TestGamma", "test_two"))
+
+    def test_case_attributes_recorded(self):
+        self.write_file("test_manifest_gamma.py", "import unittest\n\nclass TestGamma(unittest.TestCase):\n"
+                        + "    result_records = True\n\n    def test_five(self):\n        pass\n")
+        self.list_tests()
+        self.forget_modules()
+        manifest = CasesManifest(self.directory, self.manifest_dir)
+        manifest.test_tuples()
+        self.assertNotIn("test_manifest_gamma", sys.modules)
+        self.assertEqual(manifest.attributes[("test_manifest_gamma", "TestGamma", "test_five")], { "result_records": True })
+        self.assertEqual(manifest.attributes[("test_manifest_alpha", "TestAlpha", "test_one")], {})
+
+    def test_write_if_changed(self):
+        manifest = CasesManifest(self.directory, self.manifest_dir)
+        path = os.path.join(self.directory, "pre_vpl_run.sh")
+        self.assertTrue(manifest.write_if_changed("pre_vpl_run.sh", "echo one\n"))
+        os.chmod(path, 0o755)
+        self.assertFalse(manifest.write_if_changed("pre_vpl_run.sh", "echo one\n"))
+        self.assertTrue(manifest.write_if_changed("pre_vpl_run.sh", "echo two\n"))
+        with open(path) as file_fo:
+            self.assertEqual(file_fo.read(), "echo two\n")
+        self.assertTrue(os.stat(path).st_mode & stat.S_IXUSR) # Replaced, keeping its permissions.
+        self.assertEqual([ name for name in os.listdir(self.directory) if name.endswith(".tmp") ], [])
+
+    def test_edited_file_rewritten(self):
+        manifest = CasesManifest(self.directory, self.manifest_dir)
+        manifest.write_if_changed("vpl_evaluate.cases", "Case = test_one\n")
+        with open(os.path.join(self.directory, "vpl_evaluate.cases"), "w") as file_fo:
+            file_fo.write("Case = edited\n")
+        self.assertTrue(manifest.write_if_changed("vpl_evaluate.cases", "Case = test_one\n"))
+
+if __name__ == "__main__":
+    unittest.main()
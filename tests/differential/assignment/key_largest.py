@@ -0,0 +1,21 @@
+import sys
+
+
+def total(numbers):
+    return sum(numbers)
+
+
+def mode(numbers):
+    '''
+    The most frequent of numbers, or the smallest of those which are most frequent.
+    '''
+    return min(numbers, key=lambda number: (-numbers.count(number), number))
+
+
+def main():
+    numbers = [ int(word) for word in sys.stdin.read().split() ]
+    print(max(numbers) if numbers else "no numbers")
+
+
+if __name__ == "__main__":
+    main()
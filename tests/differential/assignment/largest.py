@@ -0,0 +1,35 @@
+'''
+A submission with two mistakes: mode breaks ties by order, not value, and main
+assumes the largest number isn't negative.
+'''
+import sys
+
+
+def total(numbers):
+    result = 0
+    for number in numbers:
+        result += number
+    return result
+
+
+def mode(numbers):
+    counts = {}
+    for number in numbers:
+        counts[number] = counts.get(number, 0) + 1
+    return max(counts, key=counts.get)
+
+
+def main():
+    numbers = [ int(word) for word in sys.stdin.read().split() ]
+    if not numbers:
+        print("no numbers")
+        return
+    largest = 0
+    for number in numbers:
+        if number > largest:
+            largest = number
+    print(largest)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import types
+import vpltools
+
+__unittest = True
+
+
+def numbers(rng) -> list[int]:
+    return [ rng.randint(-9, 9) for _ in range(rng.randint(1, 8)) ]
+
+
+def numbers_input(rng) -> str:
+    return "".join(f"{number}\n" for number in numbers(rng))
+
+
+class TestLargest(vpltools.VPLTestCase):
+    '''
+    Compares the student's functions and program with the key's on generated inputs.
+    See ../test_differential.py.
+    '''
+    key_source_files = [ "key_largest.py" ]
+    ignore_files = []
+    student_py_module: types.ModuleType
+    key_py_module: types.ModuleType
+
+    def test_same_as_key(self):
+        self.differential_test(numbers, "total")
+
+    def test_tie_found_and_made_smaller(self):
+        with self.assertRaises(AssertionError) as context:
+            self.differential_test(numbers, "mode")
+        self.assertRegex(str(context.exception), r"Your mode differs from the key's when called as mode\(\[0, -1\]\) \(input \d+ of 100, with seed 0, then made smaller\).\n"
+                                                 + r"The key's returned -1.\nYours returned 0.")
+
+    def test_program_difference_found_and_made_smaller(self):
+        with self.assertRaises(AssertionError) as context:
+            self.differential_test(numbers_input)
+        self.assertRegex(str(context.exception), r"with the arguments \[\] and the input \(input \d+ of 100, with seed 0, then made smaller\):\n"
+                                                 + r"> (-\d)\nThe key program finished with exit code 0, and printed:\n> \1\n"
+                                                 + r"Your program finished with exit code 0, and printed:\n> 0$")
+
+    def test_same_inputs_every_run(self):
+        messages = []
+        for _ in range(2):
+            with self.assertRaises(AssertionError) as context:
+                self.differential_test(numbers, "mode", seed=7)
+            messages.append(str(context.exception))
+        self.assertIn("with seed 7", messages[0])
+        self.assertEqual(messages[0], messages[1])
+
+    def test_budget(self):
+        with self.assertWarnsRegex(UserWarning, "ran out of time after 0 of 100 inputs"):
+            self.differential_test(numbers, "mode", budget_seconds=1e-9)
+
+
+class TestLargestInParallel(TestLargest):
+    '''
+    The same tests, running the programs on three inputs at a time.
+    '''
+    differential_jobs = 3
+
+if __name__ == "__main__":
+    vpltools.main()
@@ -0,0 +1,29 @@
+import unittest
+from vpltools.differential import input_random, shrink, shrink_candidates
+
+__unittest = True
+
+
+class TestShrinking(unittest.TestCase):
+    '''
+    Checks how inputs are drawn and made smaller. ./assignment compares whole programs.
+    '''
+    def test_inputs_depend_only_on_seed_and_number(self):
+        self.assertEqual(input_random(3, 5).random(), input_random(3, 5).random())
+        self.assertNotEqual(input_random(3, 5).random(), input_random(3, 6).random())
+        self.assertNotEqual(input_random(3, 5).random(), input_random(4, 5).random())
+
+    def test_candidates(self):
+        self.assertEqual(list(shrink_candidates(-7)), [ 0, -3, -6 ])
+        self.assertEqual(list(shrink_candidates(0)), [])
+        self.assertEqual(list(shrink_candidates("a\nb\n"))[:3], [ "", "b\n", "a\n" ])
+        self.assertEqual(list(shrink_candidates([ 4, 2 ])), [ [], [ 2 ], [ 4 ], [ 0, 2 ], [ 2, 2 ], [ 3, 2 ], [ 4, 0 ], [ 4, 1 ] ])
+        self.assertEqual(list(shrink_candidates((True, "x"))), [ (False, "x"), (True, "") ])
+
+    def test_shrink(self):
+        # Fails on any list holding a number over 10, and an odd number.
+        differs = lambda numbers: any(number > 10 for number in numbers) and any(number % 2 for number in numbers)
+        smallest, attempts = shrink([ 3, 40, 8, 17, 6, 2 ], differs, 1000)
+        self.assertEqual(smallest, [ 17 ]) # Halving 17, or taking 1 from it, no longer differs.
+        self.assertLess(attempts, 1000)
+        self.assertEqual(shrink([ 3, 40 ], differs, 0), ([ 3, 40 ], 0))
@@ -0,0 +1,48 @@
+import os
+import tempfile
+import unittest
+import vpltools
+from vpltools.directory_index import get_directory_index, language_of
+
+__unittest = True
+
+class TestDirectoryIndex(unittest.TestCase):
+    '''
+    The index of a directory of many data files, and a few source files.
+    '''
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        for file_name in [ f"data_{i}.csv" for i in range(1000) ] + [ "notes.md", "main.c", "helpers.c", "other.py" ]:
+            open(os.path.join(self.directory.name, file_name), "w").close()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_index_sees_new_files(self):
+        self.assertNotIn("late.py", get_directory_index(self.directory.name).files)
+        open(os.path.join(self.directory.name, "late.py"), "w").close()
+        self.assertIn("late.py", get_directory_index(self.directory.name).files)
+
+    def test_language_of(self):
+        self.assertEqual(language_of("main.c"), vpltools.SupportedLanguages.C)
+        self.assertEqual(language_of("main.cpp"), vpltools.SupportedLanguages.CPP)
+        self.assertIsNone(language_of("data.csv"))
+
+    def test_first_language_found_is_used(self):
+        class TestIndexed(vpltools.VPLTestCase):
+            key_source_files = []
+            ignore_files = []
+            ignore_extensions = [ ".csv", ".md" ]
+        TestIndexed.THIS_DIR_NAME = self.directory.name
+        TestIndexed.THIS_FILE_NAME = "test_indexed.py"
+
+        student_files = TestIndexed.find_student_files()
+        self.assertEqual(sorted(student_files), [ "helpers.c", "main.c", "other.py" ])
+
+        program = TestIndexed.detectLanguageAndMakeProgram(student_files, "student_program", "student_outfile")
+        first_language = language_of(next(file for file in student_files if language_of(file) is not None))
+        self.assertEqual(program.language, first_language)
+        self.assertEqual(len(program.source_files), 2 if first_language == vpltools.SupportedLanguages.C else 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import io
+import os
+import json
+import tempfile
+import unittest
+from vpltools.durations import DurationHistory, order_longest_first
+from vpltools.runner import ParallelTestRunner, make_batches
+
+__unittest = True
+
+
+class TestDurationHistory(unittest.TestCase):
+    '''
+    Records durations in a temporary file, and orders jobs by them.
+    '''
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "durations.json")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_recent_durations_count_most(self):
+        history = DurationHistory(self.path)
+        history.record("lab.TestLab.test_slow", 4.0)
+        history.record("lab.TestLab.test_slow", 2.0)
+        self.assertEqual(history.expected("lab.TestLab.test_slow"), 3.0)
+        self.assertIsNone(history.expected("lab.TestLab.test_new"))
+
+    def test_saved_histories_are_merged(self):
+        first, second = DurationHistory(self.path), DurationHistory(self.path)
+        first.record("a", 1.0)
+        second.record("b", 2.0)
+        first.save()
+        second.save()
+        reloaded = DurationHistory(self.path)
+        self.assertEqual((reloaded.expected("a"), reloaded.expected("b")), (1.0, 2.0))
+
+    def test_oldest_entries_dropped(self):
+        history = DurationHistory(self.path, max_entries=2)
+        for key in "abc":
+            history.record(key, 1.0)
+        history.save()
+        with open(self.path) as history_fo:
+            self.assertEqual(sorted(json.load(history_fo)), [ "b", "c" ])
+
+    def test_unreadable_history_is_empty(self):
+        with open(self.path, "w") as history_fo:
+            history_fo.write("not json")
+        self.assertEqual(DurationHistory(self.path).entries, {})
+
+    def test_longest_first(self):
+        order, description = order_longest_first([ 1.0, None, 5.0, 2.0 ], "jobs")
+        self.assertEqual(order, [ 2, 1, 3, 0 ]) # The new job is assumed to take the average, 2.67s.
+        self.assertIn("1 new, assumed to take 2.67s", description)
+        self.assertEqual(order_longest_first([ None, None ], "jobs")[0], [ 0, 1 ])
+
+    def test_runner_starts_slow_batches_first(self):
+        class Lab(unittest.TestCase):
+            def test_fast(self):
+                pass
+
+            def test_slow(self):
+                pass
+
+        tests = [ Lab("test_fast"), Lab("test_slow") ]
+        history = DurationHistory(self.path)
+        history.record(tests[1].id(), 10.0)
+        history.record(tests[0].id(), 0.1)
+        runner = ParallelTestRunner(jobs=2, stream=io.StringIO(), history=history)
+        batches, description = runner.schedule(tests, make_batches(tests, [ 0, 1 ], 2))
+        self.assertEqual(batches, [ [ 1 ], [ 0 ] ])
+        self.assertIn("longest expected first", description)
+
+        report = runner.run(unittest.TestSuite(tests))
+        self.assertIn("longest expected first", report.schedule)
+        self.assertLess(DurationHistory(self.path).expected(tests[1].id()), 10.0)
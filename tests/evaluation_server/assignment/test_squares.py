@@ -0,0 +1,23 @@
+import types
+import vpltools
+
+__unittest = True
+
+class TestSquares(vpltools.VPLTestCase):
+    '''
+    An assignment whose cases are run through an evaluation server, if one is
+    listening on /tmp/vpltools.sock. See ../test_evaluation_server.py.
+    '''
+    key_source_files = []
+    ignore_files = []
+    evaluation_server_socket = "/tmp/vpltools.sock"
+    student_py_module: types.ModuleType
+
+    def test_positive(self):
+        self.assertEqual(self.student_py_module.square(3), 9)
+
+    def test_negative(self):
+        self.assertEqual(self.student_py_module.square(-4), 16)
+
+if __name__ == "__main__":
+    vpltools.main()
@@ -0,0 +1,168 @@
+import os
+import grp
+import sys
+import stat
+import time
+import socket
+import tempfile
+import unittest
+import subprocess
+from vpltools.make_vpl_evaluate_cases import read_cases_file
+from vpltools.records import read_records
+from vpltools.client import request_evaluation
+from vpltools.server import client_environment
+
+__unittest = True
+
+ASSIGNMENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assignment")
+
+HANGING_TEST = '''
+import time
+import unittest
+
+class TestHangs(unittest.TestCase):
+    def test_hangs(self):
+        time.sleep(600)
+'''
+
+
+class TestEvaluationServer(unittest.TestCase):
+    '''
+    Runs the cases of ./assignment through an evaluation server, with vpltools.client.
+    '''
+    @classmethod
+    def setUpClass(cls):
+        cls.socket_dir = tempfile.TemporaryDirectory()
+        cls.socket_path = os.path.join(cls.socket_dir.name, "vpltools.sock")
+        cls.server = subprocess.Popen([ sys.executable, "-m", "vpltools", "serve", "--socket", cls.socket_path, "-j", "1" ],
+                                      stdout=subprocess.PIPE, text=True)
+        cls.server.stdout.readline() # Printed once the server is listening.
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.terminate()
+        cls.server.wait(timeout=10)
+        cls.server.stdout.close()
+        cls.socket_dir.cleanup()
+
+    def run_client(self, *test_ids: str, socket_path: str | None = None) -> subprocess.Popen:
+        return subprocess.Popen([ sys.executable, "-m", "vpltools.client", "--socket", socket_path or self.socket_path, *test_ids ],
+                                cwd=ASSIGNMENT_DIR, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+
+    def test_passing_case(self):
+        client = self.run_client("test_squares.TestSquares.test_positive")
+        output, _ = client.communicate(timeout=60)
+        self.assertEqual(client.returncode, 0, output)
+        self.assertRegex(output, r"(?m)^OK$")
+
+    def test_failing_case(self):
+        client = self.run_client("test_squares.TestSquares.test_missing")
+        output, _ = client.communicate(timeout=60)
+        self.assertEqual(client.returncode, 1, output)
+        self.assertIn("has no attribute 'test_missing'", output)
+        self.assertNotRegex(output, r"(?m)^OK$")
+
+    def test_requests_wait_their_turn(self):
+        clients = [ self.run_client("test_squares.TestSquares.test_positive", "test_squares.TestSquares.test_negative")
+                    for _ in range(4) ]
+        for client in clients:
+            output, _ = client.communicate(timeout=60)
+            self.assertEqual(client.returncode, 0, output)
+            self.assertIn("Ran 2 tests", output)
+
+    def test_unittest_runs_cases_without_a_server(self):
+        client = self.run_client("test_squares.TestSquares.test_positive", socket_path=os.path.join(self.socket_dir.name, "absent.sock"))
+        output, _ = client.communicate(timeout=60)
+        self.assertEqual(client.returncode, 0, output)
+        self.assertRegex(output, r"(?m)^OK$")
+
+    def test_records_through_server(self):
+        records = subprocess.run([ sys.executable, "-m", "vpltools.records", "--socket", self.socket_path,
+                                   "test_squares.TestSquares.test_positive" ],
+                                 cwd=ASSIGNMENT_DIR, capture_output=True, text=True, timeout=60)
+        self.assertEqual(records.returncode, 0, records.stderr)
+        [ outcome ] = read_records(records.stdout)
+        self.assertEqual(outcome.status, "pass")
+        self.assertIsNotNone(outcome.cpu_seconds) # Measured by the server's child.
+
+    def test_socket_group_and_mode(self):
+        group = grp.getgrgid(os.getgid()).gr_name
+        socket_path = os.path.join(self.socket_dir.name, "shared.sock")
+        server = subprocess.Popen([ sys.executable, "-m", "vpltools", "serve", "--socket", socket_path, "-j", "1",
+                                    "--group", group, "--mode", "660" ], stdout=subprocess.PIPE, text=True)
+        try:
+            server.stdout.readline() # Printed once the server is listening.
+            status = os.stat(socket_path)
+            self.assertEqual(stat.S_IMODE(status.st_mode), 0o660)
+            self.assertEqual(status.st_gid, os.getgid())
+        finally:
+            server.terminate()
+            server.wait(timeout=10)
+            server.stdout.close()
+        self.assertEqual(stat.S_IMODE(os.stat(self.socket_path).st_mode), 0o600) # The default.
+
+    def test_client_environment_allowed(self):
+        self.assertEqual(client_environment({ "USER": "p1234", "LC_ALL": "C", "VPLTOOLS_PRODUCTION": "1", "VPL_MAXTIME": "60",
+                                              "PATH": "/tmp/evil", "LD_PRELOAD": "evil.so", "PYTHONPATH": "/tmp",
+                                              "VPLTOOLS_FIXTURE_CACHE": "/tmp/fixtures" }),
+                         { "USER": "p1234", "LC_ALL": "C", "VPLTOOLS_PRODUCTION": "1", "VPL_MAXTIME": "60" })
+
+    def test_client_imports_no_sql_drivers(self):
+        imported = subprocess.run([ sys.executable, "-c", "import sys, vpltools.client; print(sorted({ 'pandas', 'mariadb' } & set(sys.modules)))" ],
+                                  capture_output=True, text=True, timeout=60)
+        self.assertEqual(imported.stdout.strip(), "[]", imported.stderr)
+
+    def test_cases_run_through_client(self):
+        cases = read_cases_file(os.path.join(ASSIGNMENT_DIR, "vpl_evaluate.cases"))
+        self.assertIn("-m vpltools.client --socket /tmp/vpltools.sock", cases[0].program_arguments)
+        self.assertEqual([ case.unittest_id for case in cases ],
+                         [ "test_squares.TestSquares.test_negative", "test_squares.TestSquares.test_positive" ])
+
+
+class TestEvaluationServerTimeout(unittest.TestCase):
+    '''
+    A request which doesn't finish in time, or is never sent, gives up its place to the next.
+    '''
+    @classmethod
+    def setUpClass(cls):
+        cls.temporary_dir = tempfile.TemporaryDirectory()
+        cls.socket_path = os.path.join(cls.temporary_dir.name, "vpltools.sock")
+        with open(os.path.join(cls.temporary_dir.name, "test_hangs.py"), "w") as test_fo:
+            test_fo.write(HANGING_TEST)
+        cls.server = subprocess.Popen([ sys.executable, "-m", "vpltools", "serve", "--socket", cls.socket_path,
+                                        "-j", "1", "--timeout", "2" ], stdout=subprocess.PIPE, text=True)
+        cls.server.stdout.readline() # Printed once the server is listening.
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.terminate()
+        cls.server.wait(timeout=10)
+        cls.server.stdout.close()
+        cls.temporary_dir.cleanup()
+
+    def assert_next_request_served(self):
+        client = subprocess.run([ sys.executable, "-m", "vpltools.records", "--socket", self.socket_path,
+                                  "test_squares.TestSquares.test_positive" ],
+                                cwd=ASSIGNMENT_DIR, capture_output=True, text=True, timeout=60)
+        self.assertEqual(client.returncode, 0, client.stderr)
+        self.assertEqual([ outcome.status for outcome in read_records(client.stdout) ], [ "pass" ])
+
+    def test_hanging_request_killed(self):
+        started = time.monotonic()
+        previous_dir = os.getcwd()
+        os.chdir(self.temporary_dir.name) # The request runs the tests in the client's directory.
+        try:
+            replies = request_evaluation(self.socket_path, [ "test_hangs.TestHangs.test_hangs" ])
+        finally:
+            os.chdir(previous_dir)
+        with replies:
+            self.assertEqual(replies.read(), "") # Killed before sending anything.
+        self.assertLess(time.monotonic() - started, 30)
+        self.assert_next_request_served()
+
+    def test_silent_client_disconnected(self):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            connection.connect(self.socket_path)
+            connection.settimeout(30)
+            self.assertEqual(connection.recv(1), b"") # Closed by the server, without a reply.
+        self.assert_next_request_served()
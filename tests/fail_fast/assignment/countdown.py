@@ -0,0 +1,2 @@
+def countdown(start: int) -> list[int]:
+    return list(range(start, 0, -1))
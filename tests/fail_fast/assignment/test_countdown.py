@@ -0,0 +1,28 @@
+import types
+import vpltools
+
+__unittest = True
+
+class TestCountdown(vpltools.VPLTestCase):
+    '''
+    An all-or-nothing assignment, graded with fail_fast. See ../test_fail_fast.py.
+    '''
+    key_source_files = []
+    ignore_files = []
+    fail_fast = True
+    student_py_module: types.ModuleType
+
+    def test_from_one(self):
+        self.assertEqual(self.student_py_module.countdown(1), [ 1 ])
+
+    def test_from_three(self):
+        self.assertEqual(self.student_py_module.countdown(3), [ 3, 2, 1 ])
+
+    def test_from_zero(self):
+        self.assertEqual(self.student_py_module.countdown(0), [])
+
+    def test_negative(self):
+        self.assertEqual(self.student_py_module.countdown(-2), [])
+
+if __name__ == "__main__":
+    vpltools.main()
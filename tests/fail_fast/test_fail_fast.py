@@ -0,0 +1,98 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import subprocess
+from vpltools.grader import run_case_program
+from vpltools.durations import DurationHistory
+from vpltools.make_vpl_evaluate_cases import read_cases_file
+from vpltools.vpl_test_case import VPLTestCase, FAILED_CASE_MARKER
+
+__unittest = True
+
+ASSIGNMENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assignment")
+
+# Wrong for every start but 0, and logs each time it is imported.
+BROKEN_COUNTDOWN = '''
+with open("imports.log", "a") as log_fo:
+    log_fo.write("imported\\n")
+
+def countdown(start):
+    return list(range(start))
+'''
+
+
+class TestFailFast(unittest.TestCase):
+    '''
+    Runs the cases of ./assignment one process at a time, as VPL does, against
+    copies of the assignment with a broken submission.
+    '''
+    def setUp(self):
+        self.workspace = tempfile.TemporaryDirectory()
+        self.addCleanup(self.workspace.cleanup)
+        self.evaluation_dir = os.path.join(self.workspace.name, "home")
+        shutil.copytree(ASSIGNMENT_DIR, self.evaluation_dir, ignore=shutil.ignore_patterns("__pycache__"))
+        self.write_submission(BROKEN_COUNTDOWN)
+        self.env = { **os.environ, "VPLTOOLS_PRODUCTION": "1" }
+
+    def write_submission(self, source: str) -> None:
+        with open(os.path.join(self.evaluation_dir, "countdown.py"), "w") as countdown_fo:
+            countdown_fo.write(source)
+
+    def evaluate(self) -> list[tuple[bool, str]]:
+        subprocess.run([ sys.executable, "-m", "vpltools", self.evaluation_dir ], cwd=self.evaluation_dir, env=self.env,
+                       capture_output=True) # As pre_vpl_run.sh does, ignoring how it exits.
+        cases = read_cases_file(os.path.join(self.evaluation_dir, "vpl_evaluate.cases"))
+        return [ run_case_program(case, self.evaluation_dir, self.env, timeout=60) for case in cases ]
+
+    def imports(self) -> int:
+        with open(os.path.join(self.evaluation_dir, "imports.log")) as log_fo:
+            return len(log_fo.readlines())
+
+    def test_cases_after_a_failure_are_skipped(self):
+        results = self.evaluate()
+        first_failed = [ passed for passed, _ in results ].index(False)
+        for passed, output in results[first_failed + 1:]:
+            self.assertIn("OK (skipped=1)", output)
+        self.assertEqual(self.imports(), first_failed + 1) # Later cases never imported the submission.
+
+    def test_each_evaluation_starts_afresh(self):
+        self.evaluate()
+        self.assertTrue(os.path.exists(os.path.join(self.evaluation_dir, FAILED_CASE_MARKER)))
+        imports_before = self.imports()
+        self.evaluate()
+        self.assertEqual(self.imports(), 2 * imports_before)
+
+    def test_failure_of_another_submission_ignored(self):
+        self.evaluate()
+        shutil.copy(os.path.join(ASSIGNMENT_DIR, "countdown.py"), self.evaluation_dir)
+        cases = read_cases_file(os.path.join(self.evaluation_dir, "vpl_evaluate.cases"))
+        for case in cases: # Without pre_vpl_run.sh, so the marker is still there.
+            passed, output = run_case_program(case, self.evaluation_dir, self.env, timeout=60)
+            self.assertTrue(passed, output)
+            self.assertNotIn("skipped", output)
+
+    def test_single_process_run_stops_at_first_failure(self):
+        process = subprocess.run([ sys.executable, "-m", "unittest", "-v", "test_countdown" ], cwd=self.evaluation_dir,
+                                 env=self.env, capture_output=True, text=True)
+        self.assertIn("FAILED (failures=1, skipped=3)", process.stderr)
+        self.assertIn("failed, so this submission's grade is already 0", process.stderr)
+        self.assertEqual(self.imports(), 1)
+
+    def test_only_in_production(self):
+        del self.env["VPLTOOLS_PRODUCTION"]
+        process = subprocess.run([ sys.executable, "-m", "unittest", "test_countdown" ], cwd=self.evaluation_dir,
+                                 env=self.env, capture_output=True, text=True)
+        self.assertIn("FAILED (failures=2)", process.stderr)
+        self.assertFalse(os.path.exists(os.path.join(self.evaluation_dir, FAILED_CASE_MARKER)))
+
+    def test_cheapest_cases_first(self):
+        history = DurationHistory(os.path.join(self.workspace.name, "durations.json"))
+        history.record("assignment.test_countdown.TestCountdown.test_from_one", 2.0)
+        history.record("test_countdown.TestCountdown.test_from_zero", 0.5)
+        history.record("test_countdown.TestCountdown.test_negative", 3.0)
+        tuples = [ ("test_countdown", "TestCountdown", name)
+                   for name in ("test_from_one", "test_from_three", "test_from_zero", "test_negative") ]
+        self.assertEqual([ name for _, _, name in VPLTestCase.order_cheapest_first(tuples, history) ],
+                         [ "test_from_zero", "test_from_three", "test_from_one", "test_negative" ]) # test_from_three takes the average.
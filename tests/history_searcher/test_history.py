@@ -0,0 +1,21 @@
+import vpltools
+
+__unittest = True
+
+class TestTerminalTutorial(vpltools.HistorySearcher):
+    '''
+    Tests that plain, regular expression, and whitespace insensitive commands
+    are all found in a single pass over the history file.
+    '''
+    commands_to_find = [
+        "pwd",
+        "mkdir lab1",
+        "cat notes.txt",
+        vpltools.RegexCommand(r"^cp\s+\S+\s+\S+$"),
+        vpltools.RegexCommand(r"^rm\s+-r"),
+        vpltools.WhitespaceInsensitiveCommand("ls -la"),
+        vpltools.WhitespaceInsensitiveCommand("echo  \"hello\" >  notes.txt"),
+    ]
+
+if __name__ == "__main__":
+    vpltools.main()
@@ -0,0 +1,8 @@
+import sys
+
+def shout(text):
+    return text.upper() + "!"
+
+if __name__ == "__main__":
+    with open(sys.argv[1], "w") as outfile:
+        outfile.write(shout(sys.stdin.read()))
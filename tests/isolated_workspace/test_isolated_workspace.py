@@ -0,0 +1,46 @@
+import os
+import sys
+import types
+import vpltools
+
+__unittest = True
+
+class TestIsolatedWorkspace(vpltools.VPLTestCase):
+    '''
+    Programs are run, and key files unmasked, in a private workspace,
+    leaving the directory containing this file as it was.
+    '''
+    key_source_files = [ "key_shout.py.save" ]
+    ignore_files = [ "greeting.txt" ]
+    isolated_workspace = True
+    student_py_module: types.ModuleType
+    key_py_module: types.ModuleType
+
+    def test_workspace_is_private(self):
+        self.assertNotEqual(self.THIS_DIR_NAME, self.SOURCE_DIR_NAME)
+        self.assertTrue(os.path.exists(os.path.join(self.THIS_DIR_NAME, "key_shout.py")))
+        self.assertFalse(os.path.exists(os.path.join(self.SOURCE_DIR_NAME, "key_shout.py")))
+
+    def test_modules_imported_from_workspace(self):
+        self.assertEqual(os.path.dirname(self.student_py_module.__file__), self.THIS_DIR_NAME)
+        self.assertEqual(self.student_py_module.shout("hi"), self.key_py_module.shout("hi"))
+
+    def test_output_files_written_to_workspace(self):
+        self.run_student_program([ "student_outfile" ], input_string="hello")
+        with open(os.path.join(self.THIS_DIR_NAME, "student_outfile")) as outfile:
+            self.assertEqual(outfile.read(), "HELLO!")
+        self.assertFalse(os.path.exists(os.path.join(self.SOURCE_DIR_NAME, "student_outfile")))
+
+    def test_data_files_copied_not_linked(self):
+        with open(os.path.join(self.THIS_DIR_NAME, "greeting.txt"), "a") as greeting:
+            greeting.write("changed\n")
+        with open(os.path.join(self.SOURCE_DIR_NAME, "greeting.txt")) as greeting:
+            self.assertEqual(greeting.read(), "hello\n")
+        self.assertTrue(os.path.samefile(os.path.join(self.THIS_DIR_NAME, "shout.py"),
+                                         os.path.join(self.SOURCE_DIR_NAME, "shout.py")))
+
+    def test_module_not_left_in_sys_modules(self):
+        self.assertIsNot(sys.modules.get("shout"), self.student_py_module)
+
+if __name__ == "__main__":
+    vpltools.main()
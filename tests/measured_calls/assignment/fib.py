@@ -0,0 +1,19 @@
+def fib(n):
+    return n if n < 2 else fib(n - 1) + fib(n - 2)
+
+
+def grow(length):
+    return len([ 0 ] * length)
+
+
+def spin():
+    while True:
+        pass
+
+
+def stubborn_spin():
+    while True:
+        try:
+            spin()
+        except Exception:
+            pass
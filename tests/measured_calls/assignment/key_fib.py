@@ -0,0 +1,5 @@
+def fib(n):
+    previous, current = 1, 0
+    for _ in range(n):
+        previous, current = current, previous + current
+    return current
@@ -0,0 +1,51 @@
+import types
+import vpltools
+import tracemalloc
+from vpltools.calls import CallMemoryError
+
+__unittest = True
+
+class TestFib(vpltools.VPLTestCase):
+    '''
+    Calls student and key functions with limits. See ../test_measured_calls.py.
+    '''
+    key_source_files = [ "key_fib.py" ]
+    ignore_files = []
+    student_py_module: types.ModuleType
+    key_py_module: types.ModuleType
+
+    def test_same_as_key(self):
+        for n in [ 0, 1, 10 ]:
+            self.assertEqual(self.call_student("fib", n), self.call_key("fib", n))
+
+    def test_runaway_call_fails(self):
+        with self.assertRaisesRegex(AssertionError, "spin took longer than 0.2 seconds"):
+            self.call_student("spin", timeout=0.2)
+
+    def test_timeout_not_caught_by_call(self):
+        with self.assertRaisesRegex(AssertionError, "stubborn_spin took longer than 0.2 seconds"):
+            self.call_student("stubborn_spin", timeout=0.2)
+
+    def test_memory_limit(self):
+        self.assertEqual(self.call_student("grow", 10, max_memory=10**6), 10)
+        with self.assertRaises(CallMemoryError):
+            self.call_student("grow", 10**6, max_memory=10**6)
+
+    def test_usage_recorded(self):
+        self.call_student("fib", 18)
+        usage = self.call_usages[-1]
+        self.assertEqual(usage["call"], "student fib(18)")
+        self.assertGreater(usage["cpu_seconds"], 0)
+        self.assertGreaterEqual(usage["wall_seconds"], usage["cpu_seconds"] * 0.5)
+        self.assertIsNotNone(usage["peak_memory"])
+        self.assertFalse(tracemalloc.is_tracing()) # Only calls with a memory limit are traced.
+
+
+class TestFibSandboxed(TestFib):
+    '''
+    The same tests, with the student's module in a sandbox.
+    '''
+    sandbox_student_module = True
+
+if __name__ == "__main__":
+    vpltools.main()
@@ -0,0 +1,28 @@
+import io
+import os
+import unittest
+from vpltools.runner import ParallelTestRunner
+from vpltools.session import discover_tests
+
+__unittest = True
+
+ASSIGNMENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assignment")
+
+
+class TestMeasuredCalls(unittest.TestCase):
+    '''
+    Checks that the cost of calls made by the tests in ./assignment reaches the run report.
+    '''
+    @classmethod
+    def setUpClass(cls):
+        cls.stream = io.StringIO()
+        cls.report = ParallelTestRunner(jobs=1, stream=cls.stream).run(discover_tests(ASSIGNMENT_DIR))
+
+    def test_calls_kept_with_outcomes(self):
+        self.assertTrue(self.report.wasSuccessful(), self.stream.getvalue())
+        [ outcome ] = [ outcome for outcome in self.report.outcomes if outcome.test_id.endswith("TestFib.test_same_as_key") ]
+        self.assertEqual([ usage["call"] for usage in outcome.calls ],
+                         [ "student fib(0)", "key fib(0)", "student fib(1)", "key fib(1)", "student fib(10)", "key fib(10)" ])
+
+    def test_costliest_calls_summarised(self):
+        self.assertRegex(self.stream.getvalue(), r"Slowest of \d+ measured calls:\n  [\d.]+s wall, [\d.?s]+ CPU, .* peak: student (stubborn_)?spin\(\), in test_\w+")
@@ -0,0 +1,58 @@
+'''
+Times MultiPatternMatcher against the loop HistorySearcher used before it
+("command in contents" for each command), on random histories the size of a
+terminal tutorial's: hundreds of commands, tens of thousands of lines.
+
+    cd tests; python -m multipattern.benchmark
+'''
+import random
+import time
+from vpltools.multipattern import MultiPatternMatcher
+
+__unittest = True
+
+WORDS = [ "ls", "cd", "cat", "grep", "-l", "-a", "docs", "src", "echo", "hello", "mkdir", "rm", "-rf",
+          "tmp", "pwd", "man", "less", "head", "tail", "-n", "10", "find", ".", "-name", "*.py" ]
+
+# (lines of history, commands to find)
+SIZES = [ (10_000, 100), (30_000, 300), (30_000, 800), (100_000, 800) ]
+
+
+def random_lab(num_lines: int, num_commands: int, seed: int = 0) -> tuple[list[str], list[str]]:
+    '''
+    Returns random history lines, and commands to find: num_commands which may
+    or may not have been run, and 100 which never were.
+    '''
+    generator = random.Random(seed)
+    def random_command(min_words: int, max_words: int) -> str:
+        return " ".join(generator.choice(WORDS) for _ in range(generator.randint(min_words, max_words)))
+
+    lines = [ random_command(1, 6) for _ in range(num_lines) ]
+    commands = list(dict.fromkeys(random_command(2, 4) for _ in range(4 * num_commands)))[:num_commands]
+    return lines, commands + [ f"never_run_{i} --flag" for i in range(100) ]
+
+
+def benchmark(num_lines: int, num_commands: int) -> tuple[float, float, bool]:
+    '''
+    Returns the seconds taken by the "in" loop and by MultiPatternMatcher, and
+    whether they found the same commands.
+    '''
+    lines, commands = random_lab(num_lines, num_commands)
+    contents = "\n".join(lines) + "\n"
+
+    start = time.perf_counter()
+    found_by_loop = [ command in contents for command in commands ]
+    loop_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    found_by_matcher = MultiPatternMatcher(commands).feed_lines(lines)
+    matcher_seconds = time.perf_counter() - start
+    return loop_seconds, matcher_seconds, found_by_loop == found_by_matcher
+
+
+if __name__ == "__main__":
+    print(f"{'lines':>8} {'commands':>9} {'in loop':>9} {'matcher':>9}")
+    for num_lines, num_commands in SIZES:
+        loop_seconds, matcher_seconds, same = benchmark(num_lines, num_commands)
+        print(f"{num_lines:>8} {num_commands + 100:>9} {loop_seconds * 1000:>7.1f}ms {matcher_seconds * 1000:>7.1f}ms"
+              + ("" if same else "  DIFFERENT RESULTS"))
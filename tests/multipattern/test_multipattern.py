@@ -0,0 +1,79 @@
+import random
+import re
+import unittest
+from vpltools.history import HistoryCommand, HistoryEntry, HistoryMatcher
+from vpltools.multipattern import MultiPatternMatcher, RegexCommand, WhitespaceInsensitiveCommand
+from . import benchmark
+
+__unittest = True
+
+class TestMultiPatternMatcher(unittest.TestCase):
+    '''
+    Checks the single pass against matching each pattern on its own.
+    '''
+    def test_same_as_in_loop(self):
+        '''
+        Plain patterns, whitespace and line breaks included, are found where
+        "in" finds them, whichever batches the lines arrive in.
+        '''
+        generator = random.Random(0)
+        pieces = [ "a", "b", "ab", " ", "  ", "\t", "\xa0" ]
+        for _ in range(2000):
+            lines = [ "".join(generator.choices(pieces, k=generator.randint(0, 5))) for _ in range(generator.randint(1, 12)) ]
+            patterns = [ "".join(generator.choices(pieces + [ "\n" ], k=generator.randint(1, 5))) for _ in range(6) ]
+            batch_size = generator.choice([ 1, 2, 3, 1024 ])
+            with self.subTest(lines=lines, patterns=patterns, batch_size=batch_size):
+                matcher = MultiPatternMatcher(patterns)
+                first_lines = {}
+                for start in range(0, len(lines), batch_size):
+                    for pattern_id, line_index in matcher.feed_batch(lines[start:start + batch_size]).items():
+                        first_lines[pattern_id] = start + line_index
+
+                expected = {}
+                for pattern_id, pattern in enumerate(patterns):
+                    for line_index in range(len(lines)):
+                        if pattern in "\n".join(lines[:line_index + 1]) + "\n":
+                            expected[pattern_id] = line_index
+                            break
+                self.assertEqual(first_lines, expected)
+
+    def test_commands_spanning_lines(self):
+        matcher = MultiPatternMatcher([ "cd lab1\nls", WhitespaceInsensitiveCommand("pwd ls"), "ls\ncd" ])
+        self.assertEqual(matcher.feed_lines([ "cd  lab1", "cd lab1", "ls", "pwd" ]), [ True, False, False ])
+        self.assertEqual(matcher.feed_lines([ "   ls -l" ]), [ True, True, False ])
+
+    def test_regexes_alternated(self):
+        regexes = [ RegexCommand(r"^cp\s"), RegexCommand("LS", re.IGNORECASE), RegexCommand("rm # comment", re.VERBOSE),
+                    RegexCommand(r"(echo) \1"), RegexCommand("(?i)^PWD") ]
+        matcher = MultiPatternMatcher(regexes)
+        self.assertEqual(sorted(matcher.grouped_regexes), [ 0, 1, 2 ])
+        self.assertEqual(sorted(matcher.pending_regexes), [ 3, 4 ])
+        self.assertEqual(matcher.feed_batch([ "cp a b; ls", "pwd", "echo echo", "ls -l; rm x" ]), { 0: 0, 1: 0, 4: 1, 3: 2, 2: 3 })
+        self.assertIsNone(matcher.combined_regex)
+
+    def test_found_patterns_discarded(self):
+        matcher = MultiPatternMatcher([ "ls", "cat" ])
+        matcher.feed_line("ls")
+        self.assertEqual(matcher.automaton.search("ls cat"), { 1 })
+
+    def test_no_match_across_break(self):
+        entries = [ HistoryEntry("cd lab1", 1, 100), HistoryEntry("pwd", 2, 50), HistoryEntry("ls", 3, 100) ]
+        self.assertEqual(HistoryMatcher([ "cd lab1\nls" ], earliest_timestamp=100).feed_entries(entries), [ None ])
+        self.assertEqual(HistoryMatcher([ "cd lab1\npwd" ]).feed_entries(entries), [ entries[1] ])
+
+    def test_prerequisite_in_same_batch(self):
+        mkdir = HistoryCommand("mkdir", ("lab1",))
+        matcher = HistoryMatcher([ HistoryCommand("cd", ("lab1",), after=mkdir), "mkdir lab1" ])
+        entries = [ HistoryEntry("cd lab1", 1), HistoryEntry("mkdir lab1", 2), HistoryEntry("cd lab1", 3) ]
+        self.assertEqual(matcher.feed_entries(entries), [ entries[2], entries[1] ])
+
+
+class TestBenchmark(unittest.TestCase):
+    '''
+    The benchmark's sizes: both approaches must agree (see benchmark.py for the timings).
+    '''
+    def test_same_results_as_in_loop(self):
+        for num_lines, num_commands in benchmark.SIZES:
+            with self.subTest(num_lines=num_lines, num_commands=num_commands):
+                *_, same = benchmark.benchmark(num_lines, num_commands)
+                self.assertTrue(same)
@@ -0,0 +1,38 @@
+import os
+import types
+import vpltools
+
+__unittest = True
+
+class TestHalving(vpltools.VPLTestCase):
+    '''
+    An assignment used to test the parallel runner. See ../test_parallel_runner.py.
+    '''
+    key_source_files = []
+    ignore_files = []
+    student_py_module: types.ModuleType
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        print(f"TestHalving set up in process {os.getpid()}")
+
+    def test_even(self):
+        self.assertEqual(self.student_py_module.halve(8), 4)
+
+    def test_odd(self):
+        self.assertEqual(self.student_py_module.halve(7), 3.5)
+
+    def test_negative(self):
+        self.assertEqual(self.student_py_module.halve(-2), -1)
+
+    def test_zero(self):
+        self.assertEqual(self.student_py_module.halve(0), 0)
+
+    @vpltools.serial
+    def test_in_main_process(self):
+        print(f"test_in_main_process ran in process {os.getpid()}")
+        self.assertEqual(self.student_py_module.halve(1), 0.5)
+
+if __name__ == "__main__":
+    vpltools.main()
@@ -0,0 +1,67 @@
+import io
+import os
+import re
+import unittest
+from unittest import mock
+from collections import Counter
+from vpltools.outcomes import run_tests
+from vpltools import VPLTestCase
+from vpltools.session import discover_tests
+from vpltools.runner import ParallelTestRunner, pop_jobs_option
+
+__unittest = True
+
+ASSIGNMENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assignment")
+
+
+class TestParallelRunner(unittest.TestCase):
+    '''
+    Runs the tests of ./assignment in two worker processes.
+    '''
+    @classmethod
+    def setUpClass(cls):
+        cls.cases_file_writers = []
+        def make_vpl_evaluate_cases(writer_class, *args, **kwargs):
+            cls.cases_file_writers.append(writer_class.__name__)
+        with mock.patch.object(VPLTestCase, "make_vpl_evaluate_cases", classmethod(make_vpl_evaluate_cases)):
+            cls.report = ParallelTestRunner(jobs=2, stream=io.StringIO()).run(discover_tests(ASSIGNMENT_DIR))
+        cls.outcomes = { outcome.test_id: outcome for outcome in cls.report.outcomes }
+
+    def test_same_outcomes_as_serial_run(self):
+        serial_result = run_tests(discover_tests(ASSIGNMENT_DIR))
+        self.assertEqual({ test_id: outcome.status for test_id, outcome in self.outcomes.items() },
+                         { test_id: outcome.status for test_id, outcome in serial_result.outcomes.items() })
+        self.assertTrue(self.report.wasSuccessful())
+
+    def test_classes_set_up_once_per_process(self):
+        set_up_in = Counter(re.findall(r"TestHalving set up in process (\d+)",
+                                       "".join(outcome.output for outcome in self.report.outcomes)))
+        self.assertGreaterEqual(len(set_up_in), 2) # At least one worker, and this process.
+        self.assertEqual(set(set_up_in.values()), { 1 })
+
+    def test_serial_test_runs_in_this_process(self):
+        [ outcome ] = [ outcome for test_id, outcome in self.outcomes.items() if test_id.endswith(".test_in_main_process") ]
+        self.assertIn(f"ran in process {os.getpid()}", outcome.output)
+
+    def test_cases_file_written_by_this_process(self):
+        self.assertEqual(self.cases_file_writers, [ "TestHalving" ])
+
+    def test_dead_worker_fails_its_test(self):
+        class Crashing(unittest.TestCase):
+            def test_exits(self):
+                os._exit(3)
+
+            def test_passes(self):
+                pass
+
+        suite = unittest.TestSuite([ Crashing("test_exits"), Crashing("test_passes") ])
+        report = ParallelTestRunner(jobs=2, stream=io.StringIO()).run(suite)
+        statuses = { outcome.test_id.rsplit(".", 1)[-1]: outcome for outcome in report.outcomes }
+        self.assertEqual(statuses["test_exits"].status, "error")
+        self.assertIn("exited with code 3", statuses["test_exits"].message)
+        self.assertEqual(statuses["test_passes"].status, "pass")
+
+    def test_jobs_option(self):
+        self.assertEqual(pop_jobs_option([ "test_lab.py", "-j", "3", "-v" ]), (3, [ "test_lab.py", "-v" ]))
+        self.assertEqual(pop_jobs_option([ "test_lab.py", "--jobs=2" ]), (2, [ "test_lab.py" ]))
+        self.assertEqual(pop_jobs_option([ "test_lab.py", "TestLab" ]), (None, [ "test_lab.py", "TestLab" ]))
@@ -0,0 +1,27 @@
+'''
+Counts the distinct numbers in its input: quickly, slowly, or wastefully,
+as its argument says.
+'''
+import sys
+
+
+def count_distinct(numbers, approach):
+    if approach == "slow":
+        seen = []
+        for number in numbers:
+            if number not in seen:
+                seen.append(number)
+        return len(seen)
+    if approach == "wasteful":
+        padding = b"x" * (200 << 20)
+        return len(set(numbers)) + len(padding) * 0
+    return len(set(numbers))
+
+
+def main():
+    numbers = [ int(word) for word in sys.stdin.read().split() ]
+    print(count_distinct(numbers, sys.argv[1]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+import sys
+
+
+def main():
+    print(len({ int(word) for word in sys.stdin.read().split() }))
+
+
+if __name__ == "__main__":
+    main()
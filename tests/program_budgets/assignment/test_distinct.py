@@ -0,0 +1,38 @@
+import vpltools
+from vpltools.process_usage import MeasuredProcess
+
+__unittest = True
+
+NUMBERS = "\n".join(str(number * 7919 % 5000) for number in range(5000))
+
+
+class TestDistinct(vpltools.VPLTestCase):
+    '''
+    Compares the student's CPU time and memory with the key's. See ../test_program_budgets.py.
+    '''
+    key_source_files = [ "key_distinct.py" ]
+    ignore_files = []
+    budget_timing_seconds = 0.3
+
+    def test_usage_returned(self):
+        process = self.run_student_program([ "fast" ], NUMBERS, measure_usage=True)
+        self.assertIsInstance(process, MeasuredProcess)
+        self.assertEqual(process.stdout.strip(), self.run_key_program([], NUMBERS).stdout.strip())
+        self.assertGreater(process.usage.cpu_seconds, 0)
+        self.assertGreater(process.usage.max_rss, 1 << 20)
+        self.assertGreaterEqual(process.usage.wall_seconds, process.usage.user_seconds)
+
+    def test_within_budget(self):
+        self.assertUsageLike([ "fast" ], NUMBERS)
+        self.assertEqual([ usage["call"] for usage in self.call_usages ], [ "student program fast", "key program fast" ])
+
+    def test_quadratic_submission_is_over_budget(self):
+        with self.assertRaisesRegex(AssertionError, r"It used [\d.]+ seconds of CPU time, more than 3 times"):
+            self.assertUsageLike([ "slow" ], NUMBERS)
+
+    def test_wasteful_submission_is_over_budget(self):
+        with self.assertRaisesRegex(AssertionError, r"It used [\d.]+ MiB of memory, more than 2 times"):
+            self.assertUsageLike([ "wasteful" ], NUMBERS)
+
+if __name__ == "__main__":
+    vpltools.main()
@@ -0,0 +1,76 @@
+import os
+import sys
+import time
+import unittest
+import threading
+import subprocess
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+from vpltools.process_usage import run_measured
+
+__unittest = True
+
+
+def python(source: str) -> list[str]:
+    return [ sys.executable, "-c", source ]
+
+
+class TestRunMeasured(unittest.TestCase):
+    '''
+    Runs small Python programs with run_measured. ./assignment compares whole programs with assertUsageLike.
+    '''
+    def test_like_subprocess_run(self):
+        echo = python("import sys; data = sys.stdin.read(); print(data.upper()); sys.exit(len(data))")
+        measured = run_measured(echo, input="abc", capture_output=True, text=True)
+        expected = subprocess.run(echo, input="abc", capture_output=True, text=True)
+        self.assertEqual((measured.returncode, measured.stdout, measured.stderr), (expected.returncode, expected.stdout, expected.stderr))
+        with self.assertRaises(subprocess.CalledProcessError):
+            run_measured(echo, input="abc", capture_output=True, text=True, check=True)
+
+    def test_unread_input(self):
+        process = run_measured(python("print('done')"), input="x" * (1 << 20), capture_output=True, text=True)
+        self.assertEqual(process.stdout, "done\n")
+
+    def test_timeout(self):
+        started = time.perf_counter()
+        with self.assertRaises(subprocess.TimeoutExpired):
+            run_measured(python("import time; time.sleep(30)"), timeout=0.5)
+        self.assertLess(time.perf_counter() - started, 10)
+
+    def test_no_kill_after_reaping(self):
+        '''
+        A timer firing just after the process was reaped mustn't kill whatever process has its pid now.
+        '''
+        timers, late_timeouts = [], []
+        class HeldTimer:
+            def __init__(self, interval, function):
+                self.function = function
+                timers.append(self)
+            def start(self):
+                pass
+            def cancel(self):
+                pass
+
+        wait4 = os.wait4
+        def wait4_then_time_out(pid, options):
+            reaped = wait4(pid, options)
+            late_timeouts.append(threading.Thread(target=timers[0].function))
+            late_timeouts[0].start()
+            return reaped
+
+        with mock.patch("threading.Timer", HeldTimer), mock.patch("os.wait4", wait4_then_time_out), \
+             mock.patch.object(subprocess.Popen, "kill") as kill:
+            process = run_measured(python("pass"), timeout=30)
+            late_timeouts[0].join()
+        kill.assert_not_called()
+        self.assertEqual(process.returncode, 0)
+
+    def test_usage_of_each_process_alone(self):
+        spin = python("import time\nstarted = time.process_time()\nwhile time.process_time() - started < 0.3: pass")
+        allocate = python("data = b'x' * (100 << 20)")
+        with ThreadPoolExecutor(2) as pool:
+            spinning, allocating = pool.map(lambda command: run_measured(command).usage, [ spin, allocate ])
+        self.assertGreaterEqual(spinning.cpu_seconds, 0.3)
+        self.assertLess(allocating.cpu_seconds, 0.3)
+        self.assertGreater(allocating.max_rss, 100 << 20)
+        self.assertLess(spinning.max_rss, 100 << 20)
@@ -0,0 +1,15 @@
+"""Greets whoever runs it."""
+import os
+
+
+def greet(name):
+    return f"Hello, {name}!"
+
+
+def main():
+    """Reads a name, and greets it."""
+    print(greet(input()))
+
+
+if __name__ == "__main__":
+    main()
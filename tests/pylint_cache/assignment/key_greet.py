@@ -0,0 +1,10 @@
+def greet(name):
+    return f"Hello, {name}!"
+
+
+def main():
+    print(greet(input()))
+
+
+if __name__ == "__main__":
+    main()
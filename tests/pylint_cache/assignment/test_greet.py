@@ -0,0 +1,22 @@
+import types
+import vpltools
+
+__unittest = True
+
+
+class TestGreet(vpltools.VPLTestCase):
+    '''
+    Adds a PyLint case, with a few checks, to vpl_evaluate.cases. See ../test_pylint_cache.py.
+    '''
+    key_source_files = [ "key_greet.py" ]
+    ignore_files = []
+    include_pylint = True
+    pylint_checks = [ "unused-import", "missing-function-docstring" ]
+    student_py_module: types.ModuleType
+    key_py_module: types.ModuleType
+
+    def test_greet(self):
+        self.assertEqual(self.student_py_module.greet("Ada"), self.key_py_module.greet("Ada"))
+
+if __name__ == "__main__":
+    vpltools.main()
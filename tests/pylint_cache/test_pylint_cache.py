@@ -0,0 +1,70 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import subprocess
+from vpltools.make_vpl_evaluate_cases import read_cases_file
+from vpltools.resultstore import ResultStore
+from vpltools.lint import lint_report
+from vpltools.grader import run_lint_case
+
+__unittest = True
+
+ASSIGNMENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assignment")
+
+
+class TestPylintCache(unittest.TestCase):
+    '''
+    Runs the PyLint case written for ./assignment, and checks that its report is remembered.
+    '''
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.env = dict(os.environ, XDG_CACHE_HOME=os.path.join(self.directory.name, "cache"))
+        self.workspace = os.path.join(self.directory.name, "workspace")
+        shutil.copytree(ASSIGNMENT_DIR, self.workspace)
+        [ self.case ] = [ case for case in read_cases_file(os.path.join(ASSIGNMENT_DIR, "vpl_evaluate.cases")) if case.lint_arguments ]
+
+    def run_case(self, *python_options: str) -> subprocess.CompletedProcess:
+        return subprocess.run([ sys.executable, *python_options, *self.case.program_arguments.split() ],
+                              cwd=self.workspace, env=self.env, capture_output=True, text=True)
+
+    def test_case_checks_student_with_chosen_checks(self):
+        self.assertEqual(self.case.lint_arguments, [ "--enable", "unused-import,missing-function-docstring", "greet.py" ])
+        process = self.run_case()
+        self.assertIn("greet.py:2:0: W0611: Unused import os (unused-import)", process.stdout)
+        self.assertIn("greet.py:5:0: C0116: Missing function or method docstring (missing-function-docstring)", process.stdout)
+        self.assertNotIn("invalid-name", process.stdout)
+        self.assertFalse(self.case.output_matches(process.stdout))
+
+    def test_unchanged_file_rated_without_pylint(self):
+        first = self.run_case()
+        # -X importtime lists every module imported; PyLint mustn't be among them.
+        second = self.run_case("-X", "importtime")
+        self.assertEqual(second.stdout, first.stdout)
+        self.assertNotRegex(second.stderr, r"\| *pylint\n")
+
+        with open(os.path.join(self.workspace, "greet.py"), "w") as greet_fo:
+            greet_fo.write('"""Greets."""\n\n\ndef greet(name):\n    """Greets name."""\n    return f"Hello, {name}!"\n')
+        third = self.run_case()
+        self.assertIn("rated at 10.00/10", third.stdout)
+        self.assertTrue(self.case.output_matches(third.stdout))
+
+    def test_grader_lints_in_process(self):
+        previous = os.environ.get("XDG_CACHE_HOME")
+        os.environ["XDG_CACHE_HOME"] = self.env["XDG_CACHE_HOME"]
+        self.addCleanup(lambda: os.environ.pop("XDG_CACHE_HOME") if previous is None else os.environ.update(XDG_CACHE_HOME=previous))
+        passed, report = run_lint_case(self.case, self.workspace)
+        self.assertFalse(passed)
+        self.assertEqual(report, self.run_case().stdout)
+
+    def test_configuration_is_part_of_the_key(self):
+        store = ResultStore(os.path.join(self.directory.name, "store"))
+        default = lint_report([ "greet.py" ], self.workspace, [ "unused-import" ], store=store)
+        with open(os.path.join(self.workspace, "pylintrc"), "w") as rc_fo:
+            rc_fo.write("[MESSAGES CONTROL]\ndisable=unused-import\n")
+        configured = lint_report([ "greet.py" ], self.workspace, store=store)
+        self.assertIn("unused-import", default)
+        self.assertNotIn("unused-import", configured)
+        self.assertIn("missing-function-docstring", configured)
@@ -0,0 +1,11 @@
+def exercise1():
+    # 1. Matching Decimal Numbers:
+    return r"^-?([0-9]{3},?)*[0-9]{0,3}\.?[0-9]*e?[0-9]*$"
+
+def exercise2():
+    # 2. Matching Phone Numbers
+    return r"[0-9]?\s?\(?([0-9]{3})\)?(-|\s)?[0-9]{3}(-|\s)?[0-9]{4}"
+
+def exercise5():
+    # 5. Matching Specific Filenames
+    return r"(\w+)\.(jpg|png|gif)$"
@@ -0,0 +1,89 @@
+import unittest
+from unittest import mock
+import vpltools
+
+__unittest = True # Keep, to silence tracebacks.
+
+class TestRegexTables(vpltools.RegexTestCase):
+    '''
+    Tests table-driven evaluation: each table is matched in one pass, with
+    either one VPL case per table, or one per row (for partial credit).
+    '''
+    key_source_files = []
+    ignore_files = []
+    table_workers = 2
+    rows_per_table_worker = 3
+
+    match_tables = [
+        vpltools.MatchTable("exercise1", full_match=True, targets=[
+            vpltools.MatchTarget("3.14529"),
+            vpltools.MatchTarget("-255.34"),
+            vpltools.MatchTarget("128"),
+            vpltools.MatchTarget("1.9e10"),
+            vpltools.MatchTarget("123,340.00"),
+            vpltools.MatchTarget("720p", expect_no_match=True),
+        ]),
+        vpltools.MatchTable("exercise2", credit_per_row=True, targets=[
+            vpltools.MatchTarget("415-555-1234", "415-555-1234", "415"),
+            vpltools.MatchTarget("(416)555-3456", "(416)555-3456", "416"),
+            vpltools.MatchTarget("202 555 4567", "202 555 4567", "202"),
+            vpltools.MatchTarget("1 416 555 9292", "1 416 555 9292", "416"),
+        ]),
+        vpltools.MatchTable("exercise5", targets=[
+            vpltools.MatchTarget(".bash_profile", None, None, expect_no_match=True),
+            vpltools.MatchTarget("img0912.jpg", None, "img0912"),
+            vpltools.MatchTarget("updated_img0912.png", None, "updated_img0912"),
+            vpltools.MatchTarget("favicon.gif", None, "favicon"),
+            vpltools.MatchTarget("mg0912.jpg.tmp", None, None),
+        ]),
+    ]
+
+    def test_mismatches_are_all_reported(self):
+        table = vpltools.MatchTable("exercise5", targets=[
+            vpltools.MatchTarget("img0912.jpg", None, "img"),
+            vpltools.MatchTarget("favicon.gif", None, "favicon"),
+            vpltools.MatchTarget("notes.txt", None, "notes"),
+        ])
+        self.table_results.pop(table.exercise, None)
+        messages = self.evaluate_table(table)
+        self.table_results.pop(table.exercise)
+        self.assertIsNotNone(messages[0])
+        self.assertIn("('img0912', 'jpg')", messages[0])
+        self.assertIsNone(messages[1])
+        self.assertIsNotNone(messages[2])
+
+    def test_empty_table(self):
+        table = vpltools.MatchTable("exercise_none", targets=[])
+        self.assertEqual(self.evaluate_table(table), [])
+        self.table_results.pop(table.exercise)
+
+    def test_single_row_matched_alone(self):
+        table = self.match_tables[1]
+        self.assertEqual(self.match_rows(table, [ 3 ]), [ self.evaluate_table(table)[3] ])
+
+    def test_efficient_pattern(self):
+        self.assertPatternEfficient(self.student_py_module.exercise5(), r"(\w+)\.(?:jpg|png|gif)$")
+
+    def test_one_slow_timing_ignored(self):
+        def linear_but_disturbed(pattern, method, texts):
+            times = [ len(text) * 1e-6 for text in texts ]
+            times[-1] *= 20 # e.g. a garbage collection during the longest match.
+            return times
+
+        with mock.patch.object(self, "time_pattern", side_effect=linear_but_disturbed):
+            self.assertPatternEfficient(r"(a+)+$", r"a+$")
+
+    def test_invalid_pattern_fails(self):
+        with self.assertRaisesRegex(AssertionError, "isn't a valid regular expression"):
+            self.assertPatternEfficient(r"(\w+\.(?:jpg|png", r"(\w+)\.(?:jpg|png|gif)$")
+
+    @unittest.expectedFailure
+    def test_inefficient_pattern(self):
+        '''
+        Should fail, because the time taken by (a+)+$ grows exponentially.
+        '''
+        self.efficiency_time_limit = 0.2
+        self.assertPatternEfficient(r"(a+)+$", r"a+$")
+
+if __name__ == "__main__":
+    vpltools.main()
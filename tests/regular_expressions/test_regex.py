@@ -1,5 +1,8 @@
+import time
 import vpltools
 import types
+from unittest import mock
+from vpltools import regextest
 __unittest = True # Keep, to silence tracebacks.
 
 g_source_files = [ ]
@@ -18,6 +21,7 @@ class test_match_decimal_numbers(vpltools.RegexTestCase):
     key_source_files = g_source_files
     ignore_files = g_ignore_files
     student_py_module: types.ModuleType # "declaring" like this silences linter warnings.
+    match_time_limit = 0.5
 # ------------- EXERCISE 1 ---------------------------------------------------------------
 
     def test_simple(self):
@@ -231,6 +235,46 @@ class test_match_decimal_numbers(vpltools.RegexTestCase):
         inst = vpltools.MatchTarget("market://search/angry%20birds", None, "market")
         self.match_and_capture_text(self.student_py_module.exercise8(), inst) 
 
+# ------------- CATASTROPHIC BACKTRACKING ------------------------------------------------
+
+    def test_pattern_too_slow(self):
+        '''
+        Should fail with "Pattern too slow!", instead of hanging.
+        '''
+        inst = vpltools.MatchTarget("a" * 64 + "!")
+        with self.assertRaisesRegex(AssertionError, "too slow"):
+            self.match_text(r"(a+)+$", inst)
+
+    def test_worker_survives_bad_pattern(self):
+        '''
+        A stub exercise which returns None raises TypeError, and later matches still work.
+        '''
+        with self.assertRaises(TypeError):
+            self.match_text(None, vpltools.MatchTarget("3.14529"))
+        self.match_text(self.student_py_module.exercise1(), vpltools.MatchTarget("3.14529"))
+
+    def test_worker_startup_not_timed(self):
+        '''
+        A worker which is slow to start (as with the spawn start method) doesn't make its first match too slow.
+        '''
+        def slow_to_start(connection, cache_size):
+            time.sleep(2 * self.match_time_limit)
+            worker_loop(connection, cache_size)
+
+        worker_loop = regextest.regex_worker_loop
+        worker = regextest.RegexWorker(cache_size=4)
+        try:
+            with mock.patch.object(regextest, "regex_worker_loop", slow_to_start):
+                self.assertIsNotNone(worker.match(r"\d+", "fullmatch", "128", self.match_time_limit))
+        finally:
+            worker.stop()
+
+    def test_cached_pattern_after_timeout(self):
+        inst = vpltools.MatchTarget("3.14529")
+        with self.assertRaises(AssertionError):
+            self.match_text(r"(\d+)+x", vpltools.MatchTarget("1" * 64))
+        self.match_text(self.student_py_module.exercise1(), inst)
+
 
 if __name__ == "__main__":
     vpltools.main()
@@ -0,0 +1,27 @@
+import types
+import unittest
+import vpltools
+
+__unittest = True
+
+class TestTriple(vpltools.VPLTestCase):
+    '''
+    An assignment used to test the runner's result cache. See ../test_result_cache.py.
+    '''
+    key_source_files = []
+    ignore_files = []
+    student_py_module: types.ModuleType
+
+    def test_positive(self):
+        print("tripled 4")
+        self.assertEqual(self.student_py_module.triple(4), 12)
+
+    def test_zero(self):
+        self.assertEqual(self.student_py_module.triple(0), 0)
+
+    @unittest.expectedFailure
+    def test_string(self):
+        self.assertEqual(self.student_py_module.triple("ab"), "ab")
+
+if __name__ == "__main__":
+    vpltools.main()
@@ -0,0 +1,116 @@
+import io
+import os
+import tempfile
+import unittest
+import contextlib
+from unittest import mock
+from vpltools.session import discover_tests
+from vpltools.resultstore import ResultStore
+from vpltools.runner import ParallelTestRunner, pop_rerun_option, main
+from vpltools.vpl_test_case import VPLTestCase
+
+__unittest = True
+
+ASSIGNMENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assignment")
+
+
+class TestResultCache(unittest.TestCase):
+    '''
+    Runs the tests of ./assignment with a result store, twice or more.
+    '''
+    def setUp(self):
+        store_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(store_dir.cleanup)
+        self.store = ResultStore(store_dir.name)
+
+    def run_assignment(self):
+        stream = io.StringIO()
+        report = ParallelTestRunner(jobs=1, stream=stream, result_store=self.store).run(discover_tests(ASSIGNMENT_DIR))
+        return { outcome.test_id.rsplit(".", 1)[-1]: outcome for outcome in report.outcomes }, stream.getvalue()
+
+    def change_file(self, name: str, contents: str):
+        path = os.path.join(ASSIGNMENT_DIR, name)
+        if os.path.exists(path):
+            with open(path) as file_fo:
+                original = file_fo.read()
+            self.addCleanup(self.write_file, path, original)
+        else:
+            self.addCleanup(os.remove, path)
+        with open(path, "a") as file_fo:
+            file_fo.write(contents)
+
+    @staticmethod
+    def write_file(path: str, contents: str):
+        with open(path, "w") as file_fo:
+            file_fo.write(contents)
+
+    def test_unchanged_tests_reused(self):
+        first, first_report = self.run_assignment()
+        second, second_report = self.run_assignment()
+        self.assertFalse(any(outcome.reused for outcome in first.values()))
+        self.assertTrue(all(outcome.reused for outcome in second.values()))
+        self.assertEqual({ name: outcome.status for name, outcome in second.items() },
+                         { "test_positive": "pass", "test_zero": "pass", "test_string": "expected_failure" })
+        self.assertIn("tripled 4", second["test_positive"].output)
+        self.assertNotIn("Reused", first_report)
+        self.assertIn("Reused 3 of 3 outcomes", second_report)
+
+    def test_changed_submission_rerun(self):
+        self.run_assignment()
+        self.change_file("triple.py", "\n# Changed.\n")
+        outcomes, _ = self.run_assignment()
+        self.assertFalse(any(outcome.reused for outcome in outcomes.values()))
+
+    def test_new_fixture_file_rerun(self):
+        self.run_assignment()
+        self.change_file("numbers.txt", "1 2 3\n")
+        outcomes, _ = self.run_assignment()
+        self.assertFalse(any(outcome.reused for outcome in outcomes.values()))
+
+    def test_errors_not_stored(self):
+        class Erroring(unittest.TestCase):
+            @classmethod
+            def result_cache_key(cls):
+                return "unchanged"
+
+            def test_errors(self):
+                raise OSError("The machine is busy.")
+
+            def test_passes(self):
+                pass
+
+        runner = ParallelTestRunner(jobs=1, stream=io.StringIO(), result_store=self.store)
+        runner.run(unittest.TestSuite([ Erroring("test_errors"), Erroring("test_passes") ]))
+        report = runner.run(unittest.TestSuite([ Erroring("test_errors"), Erroring("test_passes") ]))
+        self.assertEqual([ (outcome.status, outcome.reused) for outcome in report.outcomes ], [ ("error", False), ("pass", True) ])
+
+    def test_single_job_main_reuses_outcomes(self):
+        cache_home = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_home.cleanup)
+
+        def run_main(*options: str):
+            argv = [ "test_lab.py", *options, "discover", "-s", ASSIGNMENT_DIR, "-t", ASSIGNMENT_DIR ]
+            with mock.patch.dict(os.environ, { "XDG_CACHE_HOME": cache_home.name }), contextlib.redirect_stderr(io.StringIO()):
+                program = main(module=None, argv=argv, jobs=1, exit=False)
+            return [ outcome.reused for outcome in program.result.outcomes ]
+
+        self.assertEqual(run_main(), [ False ] * 3)
+        self.assertEqual(run_main(), [ True ] * 3)
+        self.assertEqual(run_main("--rerun"), [ False ] * 3)
+        with mock.patch.object(VPLTestCase, "in_production_environment", return_value=True):
+            self.assertEqual(run_main(), [ False ] * 3)
+
+    def test_changed_environment_rerun(self):
+        self.run_assignment()
+        with mock.patch.dict(os.environ, { "PATH": os.pathsep.join([ "/opt/other-compilers", os.getenv("PATH", "") ]) }):
+            outcomes, _ = self.run_assignment()
+        self.assertFalse(any(outcome.reused for outcome in outcomes.values()))
+        outcomes, _ = self.run_assignment()
+        self.assertTrue(all(outcome.reused for outcome in outcomes.values()))
+
+    def test_rerun_option(self):
+        self.assertEqual(pop_rerun_option([ "test_lab.py", "--rerun", "-v" ]), (True, [ "test_lab.py", "-v" ]))
+        self.assertEqual(pop_rerun_option([ "test_lab.py", "-v" ]), (False, [ "test_lab.py", "-v" ]))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,23 @@
+import types
+import vpltools
+
+__unittest = True
+
+class TestTotal(vpltools.VPLTestCase):
+    '''
+    An assignment whose cases pass on JSON records. See ../test_result_records.py.
+    '''
+    key_source_files = []
+    ignore_files = []
+    result_records = True
+    student_py_module: types.ModuleType
+
+    def test_empty(self):
+        self.assertEqual(self.student_py_module.total([]), 0)
+
+    def test_several(self):
+        print('"passed": true')
+        self.assertEqual(self.student_py_module.total([ 1, 2, 3 ]), 6)
+
+if __name__ == "__main__":
+    vpltools.main()
@@ -0,0 +1,103 @@
+import io
+import os
+import sys
+import json
+import unittest
+import tempfile
+import subprocess
+from vpltools.outcomes import TestOutcome
+from vpltools.records import outcome_record, read_records, record_tests, MAX_MESSAGE_LENGTH
+from vpltools.make_vpl_evaluate_cases import read_cases_file, get_vpl_eval_path
+
+__unittest = True
+
+ASSIGNMENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assignment")
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(sys.modules["vpltools"].__file__)))
+
+
+# A submission which tries to pass by printing what a passing record contains, around python3 -m unittest's redirection.
+PRINTING_TEST_MODULE = '''import os
+import sys
+import subprocess
+import unittest
+
+class TestPrinting(unittest.TestCase):
+    def test_prints(self):
+        sys.__stdout__.write('"passed": true\\n')
+        sys.__stdout__.flush()
+        sys.__stderr__.write('"passed": true\\n')
+        os.write(1, b'"passed": true\\n')
+        subprocess.run([ sys.executable, "-c", "print('\\"passed\\": true')" ])
+        self.fail("Wrong total.")
+'''
+
+
+def run_vpltools(*arguments: str, directory: str = ASSIGNMENT_DIR) -> subprocess.CompletedProcess:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [ SRC_DIR, env.get("PYTHONPATH") ]))
+    return subprocess.run([ sys.executable, "-m", *arguments ], cwd=directory, env=env,
+                          capture_output=True, text=True, timeout=60)
+
+
+class TestResultRecords(unittest.TestCase):
+    def test_record(self):
+        outcome = TestOutcome("test_lab.TestLab.test_sum", "fail", "x" * (MAX_MESSAGE_LENGTH + 10), 0.5,
+                              output="Printed", cpu_seconds=0.25, max_rss=1 << 20)
+        record = outcome_record(outcome)
+        self.assertEqual(record["status"], "fail")
+        self.assertFalse(record["passed"])
+        self.assertEqual((record["duration"], record["cpu_seconds"], record["max_rss"]), (0.5, 0.25, 1 << 20))
+        self.assertTrue(record["message"].endswith("... (10 more characters)"))
+        self.assertNotIn("output", record)
+
+    def test_read_records_skips_other_lines(self):
+        output = 'Stu program: lab.py\n{"test_id": "t.T.m", "status": "pass", "passed": true}\n{"not": "a record"}\n{broken\n'
+        [ outcome ] = read_records(output)
+        self.assertEqual((outcome.test_id, outcome.status), ("t.T.m", "pass"))
+
+    def test_record_tests(self):
+        class Failing(unittest.TestCase):
+            def test_fails(self):
+                print('"passed": true')
+                self.fail("Wrong total.")
+
+        stream = io.StringIO()
+        self.assertFalse(record_tests([ Failing("test_fails") ], stream))
+        [ line ] = stream.getvalue().splitlines()
+        record = json.loads(line)
+        self.assertEqual((record["status"], record["passed"]), ("fail", False))
+        self.assertIn("Wrong total.", record["message"])
+        self.assertNotIn('"passed": true', line) # What the test printed can't pass the case.
+        self.assertGreaterEqual(record["cpu_seconds"], 0)
+        self.assertGreater(record["max_rss"], 0)
+
+    def test_cases_match_records(self):
+        cases = read_cases_file(get_vpl_eval_path(ASSIGNMENT_DIR))
+        self.assertEqual([ case.unittest_id for case in cases ], [ "test_total.TestTotal.test_empty", "test_total.TestTotal.test_several" ])
+        process = run_vpltools(*cases[1].program_arguments.split()[1:])
+        self.assertEqual(process.returncode, 0, process.stderr)
+        [ outcome ] = read_records(process.stdout)
+        self.assertEqual(outcome.status, "pass")
+        self.assertTrue(cases[1].output_matches(process.stdout))
+        self.assertFalse(cases[1].output_matches(process.stdout.replace("true", "false")))
+
+    def test_printing_to_file_descriptors_cannot_pass(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, "test_printing.py"), "w") as module_fo:
+                module_fo.write(PRINTING_TEST_MODULE)
+            process = run_vpltools("vpltools.records", "test_printing.TestPrinting.test_prints", directory=directory)
+        self.assertEqual(process.returncode, 1)
+        self.assertNotIn('"passed": true', process.stdout + process.stderr)
+        [ outcome ] = read_records(process.stdout)
+        self.assertEqual(outcome.status, "fail")
+        self.assertIn("Wrong total.", outcome.message)
+
+    def test_evaluate(self):
+        process = run_vpltools("vpltools", "evaluate", ".")
+        self.assertEqual(process.returncode, 0, process.stderr)
+        self.assertRegex(process.stdout, r"ok   test_empty: [\d.]+s wall, [\d.]+s in tests, [\d.]+s CPU, [\d.]+ MiB peak")
+        self.assertIn("Passed 2 of 2 cases", process.stdout)
+        self.assertIn("Grade: 100", process.stdout)
+
+if __name__ == "__main__":
+    unittest.main()
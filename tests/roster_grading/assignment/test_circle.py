@@ -0,0 +1,25 @@
+import types
+import vpltools
+
+__unittest = True
+
+class TestCircle(vpltools.VPLTestCase):
+    '''
+    An assignment used to test the roster grader. See ../test_roster_grader.py.
+    '''
+    key_source_files = [ "key_circle.py" ]
+    ignore_files = []
+    grade_reduction = vpltools.GradeReduction.LinearReduction
+    student_py_module: types.ModuleType
+    key_py_module: types.ModuleType
+
+    def test_area(self):
+        for radius in [ 0, 1, 2.5 ]:
+            self.assertAlmostEqual(self.student_py_module.circle_area(radius), self.key_py_module.circle_area(radius))
+
+    def test_perimeter(self):
+        for radius in [ 0, 1, 2.5 ]:
+            self.assertAlmostEqual(self.student_py_module.circle_perimeter(radius), self.key_py_module.circle_perimeter(radius))
+
+if __name__ == "__main__":
+    vpltools.main()
@@ -0,0 +1,7 @@
+import math
+
+def circle_area(radius):
+    return math.pi * radius ** 2
+
+def circle_perimeter(radius):
+    return math.pi * radius ** 2
@@ -0,0 +1,5 @@
+def circle_area(radius):
+    while True:
+        pass
+
+circle_area(1)
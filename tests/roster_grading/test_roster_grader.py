@@ -0,0 +1,78 @@
+import os
+import csv
+import tempfile
+import unittest
+import vpltools
+from vpltools.grader import grade_roster, write_gradebook
+from vpltools.resultstore import ResultStore
+from vpltools.durations import DurationHistory
+
+__unittest = True
+
+THIS_DIR_NAME = os.path.dirname(os.path.abspath(__file__))
+
+@vpltools.serial # cy's submission loops until it times out, so it mustn't compete for the CPU.
+class TestRosterGrader(unittest.TestCase):
+    '''
+    Grades the submissions in submissions/ against the tests in assignment/.
+    '''
+    @classmethod
+    def setUpClass(cls):
+        cls.store_dir = tempfile.TemporaryDirectory()
+        cls.results_store = ResultStore(cls.store_dir.name)
+        cls.history_dir = tempfile.TemporaryDirectory()
+        cls.history = DurationHistory(os.path.join(cls.history_dir.name, "durations.json"))
+        cls.cases, grades = grade_roster(
+            os.path.join(THIS_DIR_NAME, "assignment"),
+            os.path.join(THIS_DIR_NAME, "submissions"),
+            jobs=3,
+            timeout=5,
+            results_store=cls.results_store,
+            history=cls.history)
+        cls.grades = { graded.submission: graded for graded in grades }
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.store_dir.cleanup()
+        cls.history_dir.cleanup()
+
+    def test_correct_submission(self):
+        self.assertEqual(self.grades["ada"].grade, 100)
+        self.assertEqual(self.grades["ada"].cases_passed, [ True, True ])
+
+    def test_partly_correct_submission(self):
+        self.assertEqual(self.grades["bob"].grade, 50)
+        self.assertEqual(self.grades["bob"].cases_passed, [ True, False ])
+        self.assertIn("AssertionError", self.grades["bob"].case_messages[1])
+
+    def test_submission_which_times_out(self):
+        self.assertEqual(self.grades["cy"].grade, 0)
+        self.assertIn("Timed out", self.grades["cy"].error)
+
+    def test_identical_submission_reused(self):
+        self.assertFalse(self.grades["ada"].reused)
+        self.assertTrue(self.grades["dee"].reused)
+        self.assertEqual(self.grades["dee"].cases_passed, self.grades["ada"].cases_passed)
+
+    def test_only_complete_runs_stored(self):
+        # ada (and so dee) and bob, but not cy, which timed out.
+        self.assertEqual(len([ name for name in os.listdir(self.store_dir.name) if name.endswith(".json") ]), 2)
+
+    def test_durations_recorded(self):
+        # dee is ada's double, so isn't run.
+        self.assertEqual(len(DurationHistory(self.history.path).entries), 3)
+        self.assertGreaterEqual(self.grades["cy"].duration, 5)
+
+    def test_gradebook(self):
+        with tempfile.TemporaryDirectory() as gradebook_dir:
+            gradebook_path = os.path.join(gradebook_dir, "gradebook.csv")
+            write_gradebook(gradebook_path, self.cases, sorted(self.grades.values(), key=lambda g: g.submission))
+            with open(gradebook_path, newline="") as gradebook_fo:
+                rows = list(csv.reader(gradebook_fo))
+
+        self.assertEqual(rows[0], [ "submission", "grade", "test_area", "test_perimeter", "error" ])
+        self.assertEqual(rows[1], [ "ada", "100", "1", "1", "" ])
+        self.assertEqual(rows[2], [ "bob", "50", "1", "0", "" ])
+
+if __name__ == "__main__":
+    unittest.main()
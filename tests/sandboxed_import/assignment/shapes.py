@@ -0,0 +1,29 @@
+import math
+
+# Changes global state when imported, which only the sandbox's process sees.
+math.pi = 3
+
+
+class ShapeError(ValueError):
+    pass
+
+
+def area_of_circle(radius):
+    if radius < 0:
+        raise ValueError("A radius can't be negative.")
+    return math.pi * radius ** 2
+
+
+def area_of_square(side):
+    if side < 0:
+        raise ShapeError("A side can't be negative.")
+    print(f"Square of side {side}")
+    return side * side
+
+
+def spin():
+    while True:
+        pass
+
+
+SIDES = { "triangle": 3, "square": 4 }
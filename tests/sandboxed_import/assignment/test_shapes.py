@@ -0,0 +1,47 @@
+import io
+import math
+import types
+import contextlib
+import vpltools
+from vpltools.sandbox import SandboxError, SandboxTimeoutError
+
+__unittest = True
+
+class TestShapes(vpltools.VPLTestCase):
+    '''
+    Tests a student module imported in a sandbox. See ../test_sandbox.py.
+    '''
+    key_source_files = []
+    ignore_files = []
+    sandbox_student_module = True
+    sandbox_call_timeout = 2
+    student_py_module: types.ModuleType
+
+    def test_area_of_circle(self):
+        self.assertEqual(self.student_py_module.area_of_circle(2), 12)
+
+    def test_tests_see_their_own_math(self):
+        self.assertNotEqual(math.pi, 3)
+
+    def test_exceptions_are_raised_here(self):
+        with self.assertRaisesRegex(ValueError, "can't be negative"):
+            self.student_py_module.area_of_circle(-1)
+        with self.assertRaisesRegex(SandboxError, "ShapeError: A side can't be negative"):
+            self.student_py_module.area_of_square(-1)
+
+    def test_output_is_printed_here(self):
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            self.assertEqual(self.student_py_module.area_of_square(3), 9)
+        self.assertEqual(output.getvalue(), "Square of side 3\n")
+
+    def test_runaway_call_fails(self):
+        with self.assertRaisesRegex(SandboxTimeoutError, "spin took longer than 2 seconds"):
+            self.student_py_module.spin()
+        self.assertEqual(self.student_py_module.area_of_square(2), 4) # In a new child.
+
+    def test_values_are_copied(self):
+        self.assertEqual(self.student_py_module.SIDES, { "triangle": 3, "square": 4 })
+        self.assertFalse(hasattr(self.student_py_module, "area_of_triangle"))
+
+if __name__ == "__main__":
+    vpltools.main()
@@ -0,0 +1,68 @@
+import os
+import time
+import tempfile
+import unittest
+from vpltools.sandbox import SandboxedModule, SandboxError, SandboxTimeoutError
+
+__unittest = True
+
+
+class TestSandbox(unittest.TestCase):
+    '''
+    Imports misbehaving modules, written to a temporary directory, in sandboxes.
+    '''
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def sandbox(self, source: str, **limits) -> SandboxedModule:
+        path = os.path.join(self.directory.name, "submission.py")
+        with open(path, "w") as source_fo:
+            source_fo.write(source)
+        return SandboxedModule(path, "submission", **limits)
+
+    def test_input_at_import_fails_at_once(self):
+        started = time.perf_counter()
+        with self.assertRaisesRegex(SandboxError, "EOFError"):
+            self.sandbox("name = input('Your name? ')\n")
+        self.assertLess(time.perf_counter() - started, 5)
+
+    def test_endless_import_times_out(self):
+        with self.assertRaisesRegex(SandboxError, "took longer than 0.5 seconds"):
+            self.sandbox("while True:\n    pass\n", import_timeout=0.5)
+
+    def test_memory_limit(self):
+        sandbox = self.sandbox("def grow():\n    return len(bytearray(1 << 30))\n", memory_limit=1 << 30)
+        with self.assertRaises(MemoryError):
+            sandbox.grow()
+
+    def test_objects_of_student_classes_stay_in_the_sandbox(self):
+        sandbox = self.sandbox("class Point:\n    pass\n\ndef origin():\n    return Point()\n")
+        with self.assertRaisesRegex(SandboxError, "Point is defined by the submission"):
+            sandbox.origin()
+
+    def test_exiting_process(self):
+        sandbox = self.sandbox("import os\n\ndef leave():\n    os._exit(4)\n\ndef stay():\n    return 'here'\n")
+        with self.assertRaisesRegex(SandboxError, "exited with code 4 during leave"):
+            sandbox.leave()
+        self.assertEqual(sandbox.stay(), "here")
+
+    def test_call_timeout(self):
+        sandbox = self.sandbox("import time\n\ndef nap(seconds):\n    time.sleep(seconds)\n    return seconds\n", call_timeout=0.5)
+        with self.assertRaises(SandboxTimeoutError):
+            sandbox.nap(30)
+        self.assertEqual(sandbox.nap(0), 0)
+
+    def test_cpu_limit_for_each_call(self):
+        sandbox = self.sandbox("def spin(seconds):\n    import time\n    end = time.process_time() + seconds\n"
+                               + "    while time.process_time() < end:\n        pass\n    return seconds\n",
+                               call_timeout=30, cpu_seconds=1)
+        self.assertEqual(sandbox.spin(0.6), 0.6)
+        self.assertEqual(sandbox.spin(0.6), 0.6)
+        with self.assertRaisesRegex(SandboxTimeoutError, "spin used more than 1 seconds of CPU time"):
+            sandbox.spin(30)
+        self.assertEqual(sandbox.spin(0), 0)
+
+    def test_no_call_timeout_rejected(self):
+        with self.assertRaisesRegex(ValueError, "needs a call timeout"):
+            self.sandbox("def nap():\n    pass\n", call_timeout=None)
@@ -0,0 +1,15 @@
+def sort_numbers(numbers):
+    return sorted(numbers)
+
+
+def sort_words(words):
+    return sorted(words)
+
+
+def main():
+    numbers = [ int(line) for line in open(0).read().split() ]
+    print(*sort_numbers(numbers))
+
+
+if __name__ == "__main__":
+    main()
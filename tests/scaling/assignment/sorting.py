@@ -0,0 +1,39 @@
+'''
+A submission which sorts numbers quickly, and words slowly.
+'''
+
+def sort_numbers(numbers):
+    if len(numbers) < 2:
+        return list(numbers)
+    middle = len(numbers) // 2
+    left, right = sort_numbers(numbers[:middle]), sort_numbers(numbers[middle:])
+    merged = []
+    i = j = 0
+    while i < len(left) and j < len(right):
+        if left[i] <= right[j]:
+            merged.append(left[i])
+            i += 1
+        else:
+            merged.append(right[j])
+            j += 1
+    return merged + left[i:] + right[j:]
+
+
+def sort_words(words):
+    for i in range(1, len(words)):
+        word = words[i]
+        j = i - 1
+        while j >= 0 and words[j] > word:
+            words[j + 1] = words[j]
+            j -= 1
+        words[j + 1] = word
+    return words
+
+
+def main():
+    numbers = [ int(line) for line in open(0).read().split() ]
+    print(*sort_numbers(numbers))
+
+
+if __name__ == "__main__":
+    main()
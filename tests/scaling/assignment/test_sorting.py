@@ -0,0 +1,52 @@
+import types
+import random
+import vpltools
+
+__unittest = True
+
+
+def random_numbers(size: int) -> list[int]:
+    return random.Random(size).sample(range(10 * size), size)
+
+
+def random_words(size: int) -> list[str]:
+    generator = random.Random(size)
+    return [ "".join(generator.choices("abcdefgh", k=8)) for _ in range(size) ]
+
+
+class TestSorting(vpltools.VPLTestCase):
+    '''
+    Compares how the student's sorts scale with the key's. See ../test_scaling.py.
+    '''
+    key_source_files = [ "key_sorting.py" ]
+    ignore_files = []
+    student_py_module: types.ModuleType
+    key_py_module: types.ModuleType
+
+    def test_merge_sort_scales_like_key(self):
+        self.assertScalesLike(random_numbers, "sort_numbers")
+
+    def test_insertion_sort_is_too_slow(self):
+        with self.assertRaisesRegex(AssertionError, r"Your sort_words is too slow on large inputs.\nIts running time grows like n\^(1.[6-9]|2)"):
+            self.assertScalesLike(random_words, "sort_words", sizes=[ 200, 400, 800, 1600 ])
+
+
+class TestSortingSandboxed(TestSorting):
+    '''
+    The same tests, with the student's module in a sandbox.
+    '''
+    sandbox_student_module = True
+
+
+class TestSortingProgram(vpltools.VPLTestCase):
+    '''
+    Times the student's and key's programs, run in subprocesses.
+    '''
+    key_source_files = [ "key_sorting.py" ]
+    ignore_files = []
+
+    def test_program_scales_like_key(self):
+        self.assertScalesLike(lambda size: "\n".join(map(str, random_numbers(size))), sizes=[ 2000, 4000, 8000, 16000 ])
+
+if __name__ == "__main__":
+    vpltools.main()
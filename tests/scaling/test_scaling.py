@@ -0,0 +1,45 @@
+import math
+import unittest
+from vpltools.complexity import best_times, fit_growth_exponent, fit_growth_exponent_robust
+
+__unittest = True
+
+
+class TestScaling(unittest.TestCase):
+    '''
+    Checks the statistics behind assertScalesLike. ./assignment times real sorts with it.
+    '''
+    def test_one_disturbed_timing_is_ignored(self):
+        sizes = [ 1000, 2000, 4000, 8000, 16000 ]
+        costs = [ size * 1e-6 for size in sizes ]
+        costs[1] *= 20 # e.g. another process had the CPU for a while.
+        self.assertAlmostEqual(fit_growth_exponent_robust(sizes, costs), 1.0)
+        self.assertLess(fit_growth_exponent(sizes, costs), 0.8)
+        self.assertEqual(fit_growth_exponent_robust(sizes, costs[:-1] + [ math.inf ]), math.inf)
+
+    def test_fits_check_their_input_alike(self):
+        for fit in (fit_growth_exponent, fit_growth_exponent_robust):
+            with self.subTest(fit=fit.__name__):
+                with self.assertRaisesRegex(ValueError, "at least two"):
+                    fit([ 1000 ], [ 0.001 ])
+                with self.assertRaisesRegex(ValueError, "at least two"):
+                    fit([ 1000, 2000 ], [ 0.001 ])
+                self.assertEqual(fit([ 1000, 2000 ], [ 0.0, math.inf ]), math.inf)
+                self.assertAlmostEqual(fit([ 1000, 2000 ], [ 0.0, 0.002 ]), 0.0) # A zero time counts as the smallest.
+
+    def test_best_times(self):
+        calls = []
+
+        def run(name, cost):
+            def timed(size):
+                calls.append((name, size))
+                return cost(size)
+            return timed
+
+        noisy = iter([ 5, 1, 3, 7, 2, 9 ])
+        times = best_times([ run("a", lambda size: next(noisy)), run("b", lambda size: math.inf if size > 1 else 0.5) ],
+                           [ 1, 2 ], repeats=2, warmup=1)
+        self.assertEqual(times, [ [ 1, 2 ], [ 0.5, math.inf ] ])
+        # Warmed up, then taking turns; b stops once it is stopped.
+        self.assertEqual(calls, [ ("a", 1), ("b", 1), ("a", 1), ("b", 1), ("a", 1), ("b", 1),
+                                  ("a", 2), ("b", 2), ("a", 2), ("a", 2) ])
@@ -0,0 +1,45 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import subprocess
+
+__unittest = True
+
+SHARED_SESSION_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "shared_session")
+
+# Runs the tests in the directory given, and leaves without running atexit handlers,
+# as a process killed, or forked by a test runner, would.
+RUN_AND_LEAVE = """
+import os, sys, unittest
+unittest.main(module=None, argv=[ "unittest", "discover", "-s", sys.argv[1], "-t", sys.argv[1] ], exit=False)
+sys.stdout.flush()
+sys.stderr.flush()
+os._exit(0)
+"""
+
+
+class TestSessionFinish(unittest.TestCase):
+    '''
+    Runs a copy of the shared_session assignment in a process which never exits normally.
+    '''
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        for file_name in ("greet.py", "test_shared_session.py"):
+            shutil.copy2(os.path.join(SHARED_SESSION_DIR, file_name), self.directory.name)
+
+    def run_and_leave(self) -> subprocess.CompletedProcess:
+        return subprocess.run([ sys.executable, "-c", RUN_AND_LEAVE, self.directory.name ],
+                              capture_output=True, text=True)
+
+    def test_cases_file_written_when_last_class_torn_down(self):
+        run = self.run_and_leave()
+        self.assertIn("OK", run.stderr)
+        cases_path = os.path.join(self.directory.name, "vpl_evaluate.cases")
+        self.assertTrue(os.path.exists(cases_path), run.stdout + run.stderr)
+        with open(cases_path) as cases_fo:
+            cases = cases_fo.read()
+        self.assertIn("test_greet", cases)
+        self.assertIn("test_shares_program_and_module", cases)
@@ -0,0 +1,33 @@
+import types
+import vpltools
+
+__unittest = True
+
+class TestFirstPart(vpltools.VPLTestCase):
+    '''
+    The first of two classes testing the same submission.
+    '''
+    key_source_files = []
+    ignore_files = []
+    student_py_module: types.ModuleType
+
+    def test_greet(self):
+        self.assertEqual(self.student_py_module.greet("Ada"), "Hello, Ada!")
+
+
+class TestSecondPart(vpltools.VPLTestCase):
+    '''
+    The second class reuses the program found, and the module imported, for the first.
+    '''
+    key_source_files = []
+    ignore_files = []
+    student_py_module: types.ModuleType
+
+    def test_shares_program_and_module(self):
+        self.assertEqual(len(self.session.programs), 1)
+        if hasattr(TestFirstPart, "student_program"): # Unless this test is run on its own.
+            self.assertIs(self.student_program, TestFirstPart.student_program)
+            self.assertIs(self.student_py_module, TestFirstPart.student_py_module)
+
+if __name__ == "__main__":
+    vpltools.main()
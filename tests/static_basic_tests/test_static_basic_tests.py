@@ -0,0 +1,133 @@
+import os
+import tempfile
+import textwrap
+import unittest
+from vpltools.basic_tests import (
+    BASIC_TESTS,
+    BasicTestFailedError,
+    has_no_global_variables,
+    defines_main_function,
+    has_recursion,
+    forbids_imports,
+    limits_loop_nesting,
+    run_static_basic_tests,
+)
+from vpltools.source_analysis import parse_source
+
+__unittest = True
+
+# Waits for input, and then fails, if it is ever imported.
+WELL_BEHAVED_BUT_UNIMPORTABLE = '''
+import math
+
+answer = input("Your answer? ")
+raise SystemExit("imported")
+
+def main():
+    for row in range(3):
+        print([ math.factorial(column) for column in range(row) ])
+
+def factorial(n):
+    return 1 if n < 2 else n * factorial(n - 1)
+
+if __name__ == "__main__":
+    total = 0
+    main()
+'''
+
+
+class TestStaticBasicTests(unittest.TestCase):
+    '''
+    Runs the static basic tests on sources written to a temporary directory.
+    '''
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def parse(self, source: str):
+        return parse_source(self.write(source))
+
+    def write(self, source: str, name: str = "student.py") -> str:
+        path = os.path.join(self.directory.name, name)
+        with open(path, "w") as source_fo:
+            source_fo.write(textwrap.dedent(source))
+        return path
+
+    def test_nothing_is_imported(self):
+        path = self.write(WELL_BEHAVED_BUT_UNIMPORTABLE.replace('answer = input("Your answer? ")\n', ""))
+        run_static_basic_tests(path, [ defines_main_function, has_recursion, limits_loop_nesting(2), forbids_imports("os") ])
+
+    def test_global_variables(self):
+        self.assertIn("'answer' assigned on line 4", self.failure_of(has_no_global_variables, WELL_BEHAVED_BUT_UNIMPORTABLE))
+        self.assertTrue(has_no_global_variables(self.parse('''
+            import math
+            __author__ = "A. Student"
+            square = lambda x: x * x
+            def main():
+                result = 1
+            if __name__ == "__main__":
+                main()
+        ''')))
+        for binding in ("x: int = 1", "x += 1", "for x in range(3): pass", "with open('f') as x: pass", "if True:\n    a, *x = []"):
+            with self.subTest(binding=binding):
+                self.assertIn("'", self.failure_of(has_no_global_variables, binding))
+
+    def test_main_function(self):
+        self.assertTrue(defines_main_function(self.parse("def main():\n    pass\n")))
+        self.assertIn("requires a main function", self.failure_of(defines_main_function, "class Game:\n    def main(self):\n        pass\n"))
+
+    def test_recursion(self):
+        self.assertEqual(self.parse(WELL_BEHAVED_BUT_UNIMPORTABLE).recursive_functions, { "factorial" })
+        mutual = self.parse('''
+            def is_even(n):
+                return n == 0 or is_odd(n - 1)
+            def is_odd(n):
+                return n != 0 and is_even(n - 1)
+            class Tree:
+                def size(self):
+                    return 1 + sum(child.size() for child in self.children)
+                def depth(self):
+                    return 1 + max(self.depth_of(child) for child in self.children)
+                def depth_of(self, child):
+                    return child.depth()
+        ''')
+        self.assertEqual(mutual.recursive_functions, { "is_even", "is_odd" })
+        self.assertIn("no function calls itself", self.failure_of(has_recursion, "def f(n):\n    return g(n)\ndef g(n):\n    return n\n"))
+        self.assertNotIn(has_recursion, BASIC_TESTS) # Only for assignments which ask for it.
+
+    def test_forbidden_imports(self):
+        check = forbids_imports("os", "subprocess")
+        self.assertTrue(check(self.parse("import osmosis\nfrom math import sqrt\n")))
+        for statement in ("import os.path", "from os import path", "import subprocess as sp",
+                          "def f():\n    import os", "__import__('os')", "importlib.import_module('subprocess')"):
+            with self.subTest(statement=statement):
+                self.assertIn("is forbidden", self.failure_of(check, statement))
+
+    def test_loop_nesting(self):
+        self.assertEqual(self.parse(WELL_BEHAVED_BUT_UNIMPORTABLE).deepest_loop, (2, 9))
+        self.assertTrue(limits_loop_nesting(1)(self.parse('''
+            for row in range(3):
+                def show(row):
+                    for column in range(row):
+                        print(column)
+        ''')))
+        self.assertIn("Found 3 nested loops, the innermost on line 5", self.failure_of(limits_loop_nesting(2), '''
+            while True:
+                for row in range(3):
+                    total = sum(row * column
+                                for column in range(row))
+        '''))
+
+    def test_parsed_once_per_contents(self):
+        first = self.parse("def main():\n    pass\n")
+        self.assertIs(parse_source(self.write("def main():\n    pass\n", "copy.py")), first)
+        self.assertIsNot(self.parse("def main():\n    return\n"), first)
+
+    def test_syntax_error(self):
+        with self.assertRaisesRegex(BasicTestFailedError, "could not be read"):
+            run_static_basic_tests(self.write("def main(:\n"), [ defines_main_function ])
+
+    def failure_of(self, check, source: str) -> str:
+        with self.assertRaises(BasicTestFailedError) as context:
+            check(self.parse(source))
+        return str(context.exception)
@@ -0,0 +1,111 @@
+import io
+import os
+import sys
+import time
+import tempfile
+import unittest
+from vpltools.watch import WatchSession, DirectoryWatcher, snapshot, changed_files
+
+__unittest = True
+
+TEST_MODULE = '''
+import vpltools
+
+class TestWatchedLab(vpltools.VPLTestCase):
+    key_source_files = []
+    ignore_files = [ "notes.txt" ]
+
+    def test_double(self):
+        self.assertEqual(self.student_py_module.double(21), 42)
+'''
+
+class TestWatchSession(unittest.TestCase):
+    '''
+    Reruns the tests of a small assignment, written to a temporary directory, as its files change.
+    '''
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.write("test_watched_lab.py", TEST_MODULE)
+        self.write("watched_answer.py", "def double(x):\n    return 2 * x\n")
+        self.write("notes.txt", "")
+        self.session = WatchSession(self.directory.name, stream=io.StringIO())
+
+    def tearDown(self):
+        # Each test writes modules with the same names to a new directory.
+        for module_name in [ "test_watched_lab", "watched_answer" ]:
+            sys.modules.pop(module_name, None)
+        if self.directory.name in sys.path:
+            sys.path.remove(self.directory.name)
+        self.directory.cleanup()
+
+    def write(self, file_name: str, contents: str) -> None:
+        path = os.path.join(self.directory.name, file_name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as fo:
+            fo.write(contents)
+        # Make sure the change is visible, even where modification times are coarse.
+        os.utime(path, ns=(time.time_ns(), time.time_ns() + 10**9))
+
+    def test_rerun_after_student_change(self):
+        self.assertEqual(self.session.run().failures, [])
+        before = snapshot(self.directory.name)
+        self.write("watched_answer.py", "def double(x):\n    return x + 1\n")
+        changed = changed_files(before, snapshot(self.directory.name))
+        self.assertEqual(changed, { "watched_answer.py" })
+
+        result = self.session.rerun(changed)
+        self.assertEqual(len(result.failures), 1)
+
+    def test_rerun_after_test_module_change(self):
+        self.session.run()
+        self.write("test_watched_lab.py", TEST_MODULE + '''
+    def test_triple(self):
+        self.assertEqual(self.student_py_module.double(1) + 1, 3)
+''')
+        result = self.session.rerun({ "test_watched_lab.py" })
+        self.assertEqual(result.testsRun, 2)
+
+    def test_unrelated_change_reruns_everything(self):
+        self.session.run()
+        self.assertEqual(len(self.session.affected_classes({ "notes.txt" })), 1)
+        self.assertEqual(len(self.session.affected_classes({ "data.csv" })), 1)
+
+    def test_watcher_wakes_on_change(self):
+        watcher = DirectoryWatcher(self.directory.name, poll_interval=0.05)
+        try:
+            self.write("watched_answer.py", "def double(x):\n    return x * 2\n")
+            started = time.perf_counter()
+            watcher.wait(timeout=2)
+            self.assertLess(time.perf_counter() - started, 1)
+        finally:
+            watcher.close()
+
+    def test_watcher_wakes_on_change_in_subdirectory(self):
+        self.write("data/inputs/first.txt", "1\n")
+        watcher = DirectoryWatcher(self.directory.name, poll_interval=0.05)
+        try:
+            before = snapshot(self.directory.name)
+            self.write("data/inputs/first.txt", "2\n")
+            started = time.perf_counter()
+            watcher.wait(timeout=2)
+            self.assertLess(time.perf_counter() - started, 1)
+            self.assertEqual(changed_files(before, snapshot(self.directory.name)), { os.path.join("data", "inputs", "first.txt") })
+        finally:
+            watcher.close()
+
+    def test_changes_during_run_queued(self):
+        before = snapshot(self.directory.name)
+        self.session.run()
+        self.write("results/run.log", "written by the tests")
+        self.assertEqual(self.session.changed_outside_tests(before, snapshot(self.directory.name)), set())
+
+        before = snapshot(self.directory.name)
+        self.session.run()
+        self.write("results/run.log", "written by the tests again")
+        self.write("notes.txt", "edited during the run")
+        self.write("data/table.csv", "a,b\n")
+        self.assertEqual(self.session.changed_outside_tests(before, snapshot(self.directory.name)),
+                         { "notes.txt", os.path.join("data", "table.csv") })
+
+if __name__ == "__main__":
+    unittest.main()
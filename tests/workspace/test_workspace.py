@@ -0,0 +1,43 @@
+import os
+import stat
+import tempfile
+import unittest
+from unittest import mock
+from vpltools.workspace import WORKSPACES_DIR_NAME, make_workspace, link_into_workspace, remove_workspace
+
+__unittest = True
+
+
+class TestWorkspace(unittest.TestCase):
+    '''
+    Makes workspaces for a test directory in a temporary directory.
+    '''
+    def setUp(self):
+        self.parent = tempfile.TemporaryDirectory()
+        self.addCleanup(self.parent.cleanup)
+        self.source_dir = os.path.join(self.parent.name, "Lab1")
+        os.mkdir(self.source_dir)
+        for file_name in ("lab1.py", "table.csv", "scores.csv"):
+            with open(os.path.join(self.source_dir, file_name), "w") as file_fo:
+                file_fo.write(file_name)
+        os.chmod(os.path.join(self.source_dir, "table.csv"), stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+
+    def test_on_same_file_system(self):
+        workspace = make_workspace(near=self.source_dir)
+        self.addCleanup(remove_workspace, workspace)
+        self.assertEqual(os.stat(workspace).st_dev, os.stat(self.source_dir).st_dev)
+
+    def test_beside_directory_when_cache_elsewhere(self):
+        with mock.patch("vpltools.workspace.cache_dir", return_value="/proc/vpltools"):
+            workspace = make_workspace(near=self.source_dir)
+        self.assertEqual(os.path.dirname(workspace), os.path.join(self.parent.name, WORKSPACES_DIR_NAME))
+        remove_workspace(workspace)
+        self.assertEqual(os.listdir(self.parent.name), [ "Lab1" ])
+
+    def test_read_only_files_linked(self):
+        workspace = make_workspace(near=self.source_dir)
+        self.addCleanup(remove_workspace, workspace)
+        link_into_workspace(workspace, self.source_dir)
+        for file_name, linked in (("lab1.py", True), ("table.csv", True), ("scores.csv", False)):
+            with self.subTest(file_name=file_name):
+                self.assertEqual(os.path.samefile(os.path.join(workspace, file_name), os.path.join(self.source_dir, file_name)), linked)
@@ -0,0 +1,25 @@
+import vpltools
+
+__unittest = True
+
+mkdir_lab2 = vpltools.HistoryCommand("mkdir", ("lab2/data",))
+
+class TestZshHistory(vpltools.HistorySearcher):
+    '''
+    Tests structure-aware matching of a zsh extended history file: timestamps,
+    multi-line commands, pipelines, argument matching, and ordering.
+    '''
+    earliest_timestamp = 1760884200
+
+    commands_to_find = [
+        mkdir_lab2,
+        vpltools.HistoryCommand("cd", ("lab2",), exact_args=True, after=mkdir_lab2),
+        vpltools.HistoryCommand("ls", ("-l",)),
+        vpltools.HistoryCommand("wc", ("-l", vpltools.RegexCommand(r"\$f|\.txt$"))),
+        vpltools.HistoryCommand("sort", ("-r",)),
+        vpltools.HistoryCommand("head", ("-n", "3"), exact_args=True),
+        "git commit",
+    ]
+
+if __name__ == "__main__":
+    vpltools.main()